@@ -0,0 +1,290 @@
+# michelin_recipe_generator/async_engine.py
+import asyncio
+import threading
+
+from .metrics import STAGE_SECONDS, REQUESTS_TOTAL
+from .recipe_generator import AsyncSingleFlight, TimedRequest
+
+
+class AsyncRecipeEngine:
+    """
+    asyncio-based recipe generation using the async client of the generator's backend.
+    Reuses the prompts, response cache and recipe processing of a RecipeGenerator, but keeps
+    many generations in flight on one event loop. A single async client (and therefore a
+    single pooled HTTP connection pool) is shared by every request, and a semaphore bounds how
+    many requests run at once.
+    """
+
+    def __init__(self, recipe_generator, max_concurrency=None):
+        """Initialize the engine on top of an existing recipe generator"""
+        self.recipe_generator = recipe_generator
+        self.settings_manager = recipe_generator.settings_manager
+        self.max_concurrency = max_concurrency or self.settings_manager.get_setting("api_settings.max_concurrency", 8)
+        self.client = None
+        self._semaphore = None
+        self.single_flight = AsyncSingleFlight()
+
+        # Optional background loop so threaded callers (e.g. the GUI worker) can submit work
+        self._loop = None
+        self._loop_thread = None
+
+    def setup_api(self):
+        """Set up the async client for the generator's backend with the stored API key"""
+        self.client = self.recipe_generator.backend.create_async_client(self.settings_manager.get_api_key())
+
+    async def awarm_up(self):
+        """Set up the client without blocking the loop (the keyring can be slow) and pre-connect it"""
+        if self.client is None:
+            await self._run_blocking(self.setup_api)
+        if self.client is None:
+            return
+        model = self.settings_manager.get_setting("api_settings.model", "gpt-4")
+        try:
+            await self.recipe_generator.backend.async_warm_up(self.client, model)
+        except Exception as e:
+            print(f"Error warming up API connection: {e}")
+
+    def warm_up(self):
+        """Schedule awarm_up() on the background loop; returns a concurrent.futures.Future"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self.awarm_up(), self._loop)
+
+    async def _ensure_client(self):
+        """Create the client on first use, raising if no API key is available"""
+        if self.client is None:
+            # The keyring lookup can block for seconds, so it runs off the loop
+            await self._run_blocking(self.setup_api)
+        if self.client is None:
+            raise ValueError("OpenAI API key is not set. Please set it in the settings.")
+
+    def _get_semaphore(self):
+        """Get the concurrency semaphore, created lazily so it binds to the running loop"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _run_blocking(self, func, *args):
+        """Run a blocking call (cache lookup, history save) without stalling the event loop"""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, func, *args)
+
+    async def agenerate_recipe(self, params, bypass_cache=False, delta_callback=None):
+        """Generate a recipe based on the provided parameters (async counterpart of generate_recipe)"""
+        await self._ensure_client()
+        generator = self.recipe_generator
+
+        with STAGE_SECONDS.time(stage="prompt"):
+            prompt = generator._construct_prompt(params)
+        model = self.settings_manager.get_setting("api_settings.model", "gpt-4")
+
+        try:
+            cache_key = generator._cache_key(prompt)
+            recipe_text = None
+            if generator._cache_enabled() and not bypass_cache:
+                recipe_text = await self._run_blocking(generator.response_cache.get, cache_key)
+
+            outcome = "cache_hit" if recipe_text else "success"
+            if recipe_text:
+                if delta_callback is not None and not generator._json_mode():
+                    delta_callback(recipe_text)
+            elif generator._coalescing_enabled(bypass_cache):
+                # An identical request already in flight (to the same endpoint) is awaited instead of being sent again
+                recipe_text, shared = await self.single_flight.do(
+                    cache_key, lambda: self._afetch_recipe_text(prompt, cache_key, model, delta_callback)
+                )
+                if shared:
+                    outcome = "coalesced"
+                    if delta_callback is not None and not generator._json_mode():
+                        delta_callback(recipe_text)
+            else:
+                recipe_text = await self._afetch_recipe_text(prompt, cache_key, model, delta_callback)
+
+            with STAGE_SECONDS.time(stage="process"):
+                recipe = generator._process_recipe(recipe_text, params)
+
+            # Save to history if enabled
+            with STAGE_SECONDS.time(stage="history_save"):
+                await self._run_blocking(self.settings_manager.save_recipe_to_history, recipe)
+
+            REQUESTS_TOTAL.inc(model=model, outcome=outcome)
+            return recipe
+
+        except asyncio.CancelledError:
+            REQUESTS_TOTAL.inc(model=model, outcome="cancelled")
+            raise
+        except Exception as e:
+            REQUESTS_TOTAL.inc(model=model, outcome="error")
+            raise Exception(f"Error generating recipe: {str(e)}") from e
+
+    async def _afetch_recipe_text(self, prompt, cache_key, model, delta_callback=None):
+        """Get the recipe text from the API (streamed if enabled) and cache it"""
+        generator = self.recipe_generator
+        if generator._use_streaming():
+            pieces = []
+            async for delta in self._astream_completion(prompt):
+                pieces.append(delta)
+                if delta_callback is not None:
+                    delta_callback(delta)
+            recipe_text = "".join(pieces)
+            if not recipe_text:
+                raise Exception("Failed to process API response: Streamed message content is empty.")
+        else:
+            kwargs = generator._completion_kwargs(prompt)
+            async with self._get_semaphore():
+                # Reserved once a slot is free, so requests still waiting for one hold no budget
+                estimate = generator._reserve_tokens(kwargs)
+                request = TimedRequest(lambda: self.client.chat.completions.create(**kwargs))
+                try:
+                    response = await generator.scheduler.acall(request, estimated_tokens=estimate["total_tokens"])
+                except BaseException:
+                    generator.token_budget.release(estimate)
+                    raise
+
+            seconds = request.elapsed()
+            usage = getattr(response, 'usage', None)
+            try:
+                with STAGE_SECONDS.time(stage="validation"):
+                    recipe_text = generator._extract_recipe_text(response)
+            except Exception:
+                generator._record_usage(estimate, usage, "", seconds)
+                raise
+            generator._record_usage(estimate, usage, recipe_text, seconds)
+
+        if generator._cache_enabled():
+            await self._run_blocking(generator.response_cache.put, cache_key, recipe_text, model)
+        return recipe_text
+
+    async def astream_recipe(self, params, bypass_cache=False):
+        """Yield the recipe text deltas as they arrive (async counterpart of stream_recipe)"""
+        await self._ensure_client()
+        generator = self.recipe_generator
+        prompt = generator._construct_prompt(params)
+
+        cache_key = generator._cache_key(prompt)
+        if generator._cache_enabled() and not bypass_cache:
+            cached_text = await self._run_blocking(generator.response_cache.get, cache_key)
+            if cached_text:
+                yield cached_text
+                return
+
+        pieces = []
+        async for delta in self._astream_completion(prompt):
+            pieces.append(delta)
+            yield delta
+
+        if pieces and generator._cache_enabled():
+            model = self.settings_manager.get_setting("api_settings.model", "gpt-4")
+            await self._run_blocking(generator.response_cache.put, cache_key, "".join(pieces), model)
+
+    async def _astream_completion(self, prompt):
+        """Make a streaming completion request and yield each non-empty content delta"""
+        generator = self.recipe_generator
+        kwargs = generator._completion_kwargs(prompt)
+        async with self._get_semaphore():
+            # Reserved once a slot is free, so requests still waiting for one hold no budget
+            estimate = generator._reserve_tokens(kwargs)
+            request = TimedRequest(lambda: self.client.chat.completions.create(
+                stream=True, stream_options={"include_usage": True}, **kwargs
+            ))
+            # Shares the generator's scheduler and token budget, so limits cover threaded and async requests alike
+            try:
+                stream = await generator.scheduler.acall(request, estimated_tokens=estimate["total_tokens"])
+            except BaseException:
+                generator.token_budget.release(estimate)
+                raise
+
+            usage = None
+            pieces = []
+            ttft = None
+            try:
+                async for chunk in stream:
+                    usage = getattr(chunk, 'usage', None) or usage
+                    content = generator._extract_delta(chunk)
+                    if content:
+                        if ttft is None:
+                            ttft = request.elapsed()
+                        pieces.append(content)
+                        yield content
+            finally:
+                # Closing drops the connection if the consumer stops early or the task is cancelled
+                close = getattr(stream, 'close', None)
+                if close is not None:
+                    await close()
+                generator._record_usage(estimate, usage, "".join(pieces), request.elapsed(), ttft)
+
+    async def agenerate_many(self, params_list, bypass_cache=False):
+        """
+        Generate recipes for many parameter sets concurrently on the running loop.
+        Yields result dicts as they complete, in the same format as RecipeGenerator.generate_many.
+        params_list may be any iterable; at most max_concurrency generations are pending at a time.
+        """
+        async def run_one(index, params):
+            try:
+                recipe = await self.agenerate_recipe(params, bypass_cache=bypass_cache)
+                return {"index": index, "params": params, "recipe": recipe}
+            except Exception as e:
+                return {"index": index, "params": params, "error": str(e)}
+
+        params_iter = enumerate(params_list)
+        pending = set()
+
+        def submit_next():
+            # Pull from the iterable lazily so huge inputs are never materialized at once
+            for index, params in params_iter:
+                pending.add(asyncio.ensure_future(run_one(index, params)))
+                return True
+            return False
+
+        try:
+            for _ in range(self.max_concurrency):
+                if not submit_next():
+                    break
+
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.discard(task)
+                    yield task.result()
+                    submit_next()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def aclose(self):
+        """Close the shared HTTP client"""
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    def start(self):
+        """Start a background event loop thread for submit() (no-op if already running)"""
+        if self._loop is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, name="AsyncRecipeEngine", daemon=True)
+        self._loop_thread.start()
+
+    def submit(self, params, bypass_cache=False, delta_callback=None):
+        """
+        Schedule a generation on the background loop from any thread.
+        Returns a concurrent.futures.Future; cancelling it cancels the underlying request.
+        delta_callback is called on the loop thread.
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(
+            self.agenerate_recipe(params, bypass_cache=bypass_cache, delta_callback=delta_callback),
+            self._loop
+        )
+
+    def shutdown(self, timeout=5):
+        """Close the client and stop the background loop started by start()"""
+        if self._loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.aclose(), self._loop).result(timeout)
+        except Exception as e:
+            print(f"Error closing async client: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join(timeout)
+        self._loop = None
+        self._loop_thread = None
@@ -0,0 +1,387 @@
+# michelin_recipe_generator/backends.py
+import abc
+import asyncio
+import hashlib
+import json
+import time
+import types
+
+from .recipe_parser import parse_recipe
+
+# Seconds to wait for the warm-up request before giving up (the first generation then connects itself)
+WARM_UP_TIMEOUT = 10.0
+
+# Recipes replayed by the fake backend
+CANNED_RECIPES = [
+    """Butter-Poached Lobster with Sauternes Beurre Blanc
+
+A celebration of cold-water lobster inspired by Thomas Keller's precision: gently poached in
+emulsified butter so the meat stays tender, finished with a bright, slightly sweet beurre blanc.
+
+Preparation time: 45 minutes
+Cooking time: 30 minutes
+
+INGREDIENTS:
+For the lobster:
+- 2 live lobsters, about 1½ lb each
+- 1.5 cups unsalted butter, cubed
+- 2 sprigs thyme
+- 1 tsp fleur de sel
+For the beurre blanc:
+- 2 shallots, finely diced
+- 0.5 cup Sauternes
+- 2 tbsp white wine vinegar
+- 0.5 cup cold unsalted butter, cubed
+- Salt to taste
+
+INSTRUCTIONS:
+1. Blanch the lobsters in boiling salted water for 2 minutes, then shock in ice water.
+2. Remove the tail and claw meat, keeping the pieces whole.
+3. Whisk the butter into 3 tbsp simmering water to form a beurre monté and hold it at 60°C.
+4. Poach the tails and claws in the beurre monté with the thyme for 8-10 minutes.
+5. Reduce the shallots, Sauternes and vinegar until almost dry.
+6. Whisk in the cold butter a few cubes at a time off the heat, then strain and season.
+
+PLATING:
+- Slice each tail into medallions and fan them across a warm plate.
+- Spoon the beurre blanc around the lobster and finish with fleur de sel.
+
+CHEF'S NOTES:
+- Never let the beurre monté boil or the emulsion will break.
+- The lobster is done when the flesh turns opaque and just firm.
+
+WINE PAIRING:
+- A Meursault or a mineral Chablis Premier Cru
+
+SUBSTITUTIONS:
+- Lobster: langoustines or large prawns
+- Sauternes: late-harvest Riesling
+
+**Complexity Score: 8/10**
+""",
+    """Seared Scallops with Cauliflower Purée and Brown Butter
+
+Sweet, caramelized scallops set on a silky cauliflower purée, with nutty brown butter and
+capers for contrast - a classic bistro pairing refined for the tasting menu.
+
+Preparation time: 25 minutes
+Cooking time: 20 minutes
+
+INGREDIENTS:
+- 8 large diver scallops, side muscle removed
+- 1 head cauliflower, cut into florets
+- 1 cup whole milk
+- 4 tbsp unsalted butter
+- 1 tbsp capers, rinsed
+- 1 lemon, juiced
+- 2 tbsp grapeseed oil
+- Salt to taste
+
+INSTRUCTIONS:
+1. Simmer the cauliflower in the milk until completely tender, about 15 minutes.
+2. Blend with 1 tbsp butter until smooth, then pass through a fine sieve and season.
+3. Pat the scallops completely dry and season with salt.
+4. Sear in smoking-hot oil for 90 seconds per side without moving them.
+5. Cook the remaining butter until nut-brown, then add the capers and lemon juice.
+
+PLATING:
+- Swipe the purée across each plate and set four scallops on top.
+- Spoon the brown butter and capers over the scallops.
+
+CHEF'S NOTES:
+- Dry scallops are the key to a deep golden crust.
+
+WINE PAIRING:
+- A white Burgundy or an aged Champagne
+
+SUBSTITUTIONS:
+- Scallops: thick halibut medallions
+
+**Complexity Score: 5/10**
+"""
+]
+
+
+def _estimate_tokens(text):
+    """Approximate token count (four characters per token)"""
+    return (len(text) + 3) // 4
+
+
+class ModelBackend(abc.ABC):
+    """
+    Interface for the service that completes recipe prompts.
+    A backend creates OpenAI-style clients (client.chat.completions.create(...) with the same
+    response shapes), so the generator, async engine and scheduler work unchanged on top of it.
+    """
+    name = "base"
+    requires_api_key = True
+
+    @property
+    def endpoint(self):
+        """Identity of the service that answers; responses are cached per endpoint"""
+        return self.name
+
+    @abc.abstractmethod
+    def create_client(self, api_key):
+        """Create a synchronous client (None if the backend cannot be used without a key)"""
+
+    @abc.abstractmethod
+    def create_async_client(self, api_key):
+        """Create an asyncio client (None if the backend cannot be used without a key)"""
+
+    def warm_up(self, client, model):
+        """Open the client's connection before the first request (no-op by default)"""
+
+    async def async_warm_up(self, client, model):
+        """Async counterpart of warm_up"""
+
+
+class OpenAIBackend(ModelBackend):
+    """The OpenAI API"""
+    name = "openai"
+
+    def create_client(self, api_key):
+        if not api_key:
+            return None
+        from openai import OpenAI
+        # Retries are handled by the request scheduler, which also knows about rate limits
+        return OpenAI(api_key=api_key, max_retries=0)
+
+    def create_async_client(self, api_key):
+        if not api_key:
+            return None
+        from openai import AsyncOpenAI
+        return AsyncOpenAI(api_key=api_key, max_retries=0)
+
+    def warm_up(self, client, model):
+        # Looking up the model is the cheapest authenticated request; the TLS connection it
+        # opens stays in the client's pool for the first generation
+        client.with_options(timeout=WARM_UP_TIMEOUT).models.retrieve(model)
+
+    async def async_warm_up(self, client, model):
+        await client.with_options(timeout=WARM_UP_TIMEOUT).models.retrieve(model)
+
+
+class OpenAICompatibleBackend(OpenAIBackend):
+    """Any server speaking the OpenAI chat completions API at base_url (e.g. a local LLM server)"""
+    name = "openai_compatible"
+    requires_api_key = False
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    @property
+    def endpoint(self):
+        # The same model name means a different model on every server
+        return f"{self.name}:{self.base_url.rstrip('/')}"
+
+    def create_client(self, api_key):
+        from openai import OpenAI
+        # Local servers usually ignore the key, but the client insists on having one
+        return OpenAI(api_key=api_key or "not-needed", base_url=self.base_url, max_retries=0)
+
+    def create_async_client(self, api_key):
+        from openai import AsyncOpenAI
+        return AsyncOpenAI(api_key=api_key or "not-needed", base_url=self.base_url, max_retries=0)
+
+
+class FakeBackend(ModelBackend):
+    """
+    Offline backend that replays canned recipes with simulated latency and throughput.
+    The recipe is picked from a hash of the prompt, so the same request always gets the same
+    answer. latency is the time to the first token and tokens_per_second paces the rest
+    (0 means instant). JSON-mode requests get the recipe's structured fields as JSON.
+    """
+    name = "fake"
+    requires_api_key = False
+
+    def __init__(self, latency=0.0, tokens_per_second=0, recipes=None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.recipes = recipes or CANNED_RECIPES
+
+    def create_client(self, api_key=None):
+        return FakeClient(self)
+
+    def create_async_client(self, api_key=None):
+        return AsyncFakeClient(self)
+
+    def completion_text(self, messages, response_format=None):
+        """Get the reply for a request"""
+        prompt = messages[-1]["content"] if messages else ""
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        recipe_text = self.recipes[int.from_bytes(digest[:4], "big") % len(self.recipes)]
+
+        if response_format is not None:
+            structured = parse_recipe(recipe_text).to_dict()
+            structured.pop("sections", None)
+            return json.dumps(structured, ensure_ascii=False)
+        return recipe_text
+
+    def chunks(self, text):
+        """Split a reply into word-sized streaming deltas"""
+        pieces = text.split(" ")
+        return [piece + " " for piece in pieces[:-1]] + [pieces[-1]]
+
+    def delays(self, chunks):
+        """Yield the wait before each chunk so the stream keeps to the configured pace"""
+        start = time.perf_counter()
+        tokens = 0
+        for chunk in chunks:
+            target = self.latency
+            if self.tokens_per_second:
+                target += tokens / self.tokens_per_second
+            tokens += len(chunk) / 4
+            yield max(0.0, start + target - time.perf_counter())
+
+    def total_time(self, text):
+        """Simulated time for a complete (non-streamed) reply"""
+        if not self.tokens_per_second:
+            return self.latency
+        return self.latency + _estimate_tokens(text) / self.tokens_per_second
+
+    def usage(self, messages, text):
+        """Build an OpenAI-style usage object for a request"""
+        prompt_tokens = sum(_estimate_tokens(message.get("content") or "") for message in messages)
+        completion_tokens = _estimate_tokens(text)
+        return types.SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                     total_tokens=prompt_tokens + completion_tokens)
+
+
+def _response(text, usage):
+    """Build an OpenAI-style chat completion response"""
+    message = types.SimpleNamespace(role="assistant", content=text)
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(index=0, message=message, finish_reason="stop")],
+                                 usage=usage)
+
+
+def _chunk(content=None, usage=None):
+    """Build an OpenAI-style stream chunk (the usage chunk has no choices)"""
+    if content is None:
+        return types.SimpleNamespace(choices=[], usage=usage)
+    delta = types.SimpleNamespace(role="assistant", content=content)
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(index=0, delta=delta, finish_reason=None)],
+                                 usage=None)
+
+
+class _FakeStream:
+    """Synchronous stream of chunks, paced by the backend"""
+
+    def __init__(self, backend, text, usage):
+        self.backend = backend
+        self.text = text
+        self.usage = usage
+        self.closed = False
+
+    def __iter__(self):
+        chunks = self.backend.chunks(self.text)
+        for chunk, delay in zip(chunks, self.backend.delays(chunks)):
+            if self.closed:
+                return
+            if delay:
+                time.sleep(delay)
+            yield _chunk(chunk)
+        if self.usage is not None:
+            yield _chunk(usage=self.usage)
+
+    def close(self):
+        self.closed = True
+
+
+class _AsyncFakeStream(_FakeStream):
+    """asyncio stream of chunks, paced by the backend"""
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        chunks = self.backend.chunks(self.text)
+        for chunk, delay in zip(chunks, self.backend.delays(chunks)):
+            if self.closed:
+                return
+            if delay:
+                await asyncio.sleep(delay)
+            yield _chunk(chunk)
+        if self.usage is not None:
+            yield _chunk(usage=self.usage)
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakeCompletions:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def _prepare(self, messages, stream_options, response_format):
+        text = self.backend.completion_text(messages, response_format)
+        usage = self.backend.usage(messages, text)
+        include_usage = bool(stream_options and stream_options.get("include_usage"))
+        return text, usage, include_usage
+
+    def create(self, model=None, messages=(), stream=False, stream_options=None, response_format=None, **kwargs):
+        text, usage, include_usage = self._prepare(messages, stream_options, response_format)
+        if stream:
+            return _FakeStream(self.backend, text, usage if include_usage else None)
+        time.sleep(self.backend.total_time(text))
+        return _response(text, usage)
+
+
+class _AsyncFakeCompletions(_FakeCompletions):
+    async def create(self, model=None, messages=(), stream=False, stream_options=None, response_format=None, **kwargs):
+        text, usage, include_usage = self._prepare(messages, stream_options, response_format)
+        if stream:
+            return _AsyncFakeStream(self.backend, text, usage if include_usage else None)
+        await asyncio.sleep(self.backend.total_time(text))
+        return _response(text, usage)
+
+
+class _FakeModels:
+    def retrieve(self, model):
+        return types.SimpleNamespace(id=model, object="model")
+
+
+class _AsyncFakeModels:
+    async def retrieve(self, model):
+        return types.SimpleNamespace(id=model, object="model")
+
+
+class FakeClient:
+    """Synchronous OpenAI-style client backed by a FakeBackend"""
+
+    def __init__(self, backend):
+        self.chat = types.SimpleNamespace(completions=_FakeCompletions(backend))
+        self.models = _FakeModels()
+
+    def close(self):
+        pass
+
+
+class AsyncFakeClient:
+    """asyncio OpenAI-style client backed by a FakeBackend"""
+
+    def __init__(self, backend):
+        self.chat = types.SimpleNamespace(completions=_AsyncFakeCompletions(backend))
+        self.models = _AsyncFakeModels()
+
+    async def close(self):
+        pass
+
+
+def create_backend(settings_manager):
+    """Create the backend selected by api_settings.backend ("openai", "openai_compatible" or "fake")"""
+    get = settings_manager.get_setting
+    name = get("api_settings.backend", "openai")
+    if name == "fake":
+        return FakeBackend(
+            latency=get("api_settings.fake_latency", 0.5),
+            tokens_per_second=get("api_settings.fake_tokens_per_second", 50)
+        )
+    if name == "openai_compatible":
+        base_url = get("api_settings.base_url", "")
+        if not base_url:
+            raise ValueError("api_settings.base_url must be set to use an OpenAI-compatible backend.")
+        return OpenAICompatibleBackend(base_url)
+    if name != "openai":
+        raise ValueError(f"Unknown model backend: {name}")
+    return OpenAIBackend()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Michelin Star Recipe Generator
+Headless batch mode: generate recipes for every parameter set in a JSONL file
+
+Usage:
+    python -m michelin_recipe_generator.batch params.jsonl -o recipes.jsonl --concurrency 4
+    python -m michelin_recipe_generator.batch --sweep sweep.json -o recipes.jsonl
+
+A sweep file describes parameter axes instead of listing parameter sets; every combination
+with a distinct prompt is generated once:
+
+    {"axes": {"chefs.thomas_keller": [0, 50, 90], "michelin_stars": [1, 2, 3]},
+     "base": {"servings": 2}, "collapse_influence_tiers": false}
+
+With --durable the jobs are kept in a persistent queue, so running the same command again after a
+crash or interruption only generates what is not done yet (--retry-failed also retries failures):
+
+    python -m michelin_recipe_generator.batch menu.jsonl -o recipes.jsonl --durable
+
+A durable batch is refused if the backend, model, temperature, max tokens or output mode changed
+since it was started; give the new run its own --job-name instead.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+
+from .async_engine import AsyncRecipeEngine
+from .backends import FakeBackend, OpenAIBackend, OpenAICompatibleBackend
+from .job_queue import JobQueue
+from .metrics import default_registry
+from .parameter_sweep import ParameterSweep
+from .recipe_generator import RecipeGenerator, TokenBucket, with_default_params
+from .settings_manager import SettingsManager
+
+
+def read_params_file(path):
+    """Yield parameter sets from a JSONL file, one JSON object per line (blank lines are skipped)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                params = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: invalid JSON ({e})") from e
+            if not isinstance(params, dict):
+                raise ValueError(f"{path}:{line_number}: expected a JSON object of recipe parameters")
+            yield with_default_params(params)
+
+
+def read_sweep_file(path):
+    """Load a ParameterSweep from a JSON sweep spec"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            spec = json.load(f)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"{path}: invalid JSON ({e})") from e
+    return ParameterSweep.from_dict(spec)
+
+
+def write_result(result, output):
+    """Write one result line and report it on stderr; returns True for a success"""
+    output.write(json.dumps(result, ensure_ascii=False) + "\n")
+    output.flush() # Results are usable even if the run is interrupted
+
+    if "error" in result:
+        print(f"[{result['index']}] failed: {result['error']}", file=sys.stderr)
+        return False
+
+    print(f"[{result['index']}] {result['recipe'].get('title', 'Untitled Recipe')}", file=sys.stderr)
+    return True
+
+
+def run_batch(recipe_generator, params_iter, output, max_concurrency=4, bypass_cache=False):
+    """Generate recipes concurrently and write one JSON line per result as it completes"""
+    succeeded = 0
+    failed = 0
+
+    for result in recipe_generator.generate_many(params_iter, max_concurrency=max_concurrency,
+                                                 bypass_cache=bypass_cache):
+        if write_result(result, output):
+            succeeded += 1
+        else:
+            failed += 1
+
+    return succeeded, failed
+
+
+async def run_batch_async(engine, params_iter, output, bypass_cache=False):
+    """Same as run_batch, but with every request on one event loop via the async engine"""
+    succeeded = 0
+    failed = 0
+
+    try:
+        async for result in engine.agenerate_many(params_iter, bypass_cache=bypass_cache):
+            if write_result(result, output):
+                succeeded += 1
+            else:
+                failed += 1
+    finally:
+        await engine.aclose()
+
+    return succeeded, failed
+
+
+def run_durable_batch(recipe_generator, job_queue, batch, params_iter, output, max_concurrency=4,
+                      bypass_cache=False, retry_failed=False):
+    """
+    Like run_batch, but through the persistent job queue: jobs finished by an earlier run of the
+    same batch are written out from the queue instead of being generated again.
+    Result indexes are job ids. Returns (done, failed) for the whole batch.
+    Raises ValueError if the batch was started with different generation settings.
+    """
+    job_queue.check_settings(batch, recipe_generator.generation_settings())
+    added, skipped = job_queue.enqueue(batch, params_iter)
+    recovered = job_queue.recover(batch)
+    retried = job_queue.retry_failed(batch) if retry_failed else 0
+    print(f"Job queue: {added} new jobs, {skipped} already queued, {recovered} interrupted jobs resumed, "
+          f"{retried} failed jobs retried.", file=sys.stderr)
+
+    # Recipes from earlier runs first, so the output ends up complete
+    for result in job_queue.results(batch):
+        write_result(dict(result, index=result["job_id"]), output)
+
+    for result in job_queue.run(recipe_generator, batch, max_concurrency=max_concurrency, bypass_cache=bypass_cache):
+        write_result(dict(result, index=result["job_id"]), output)
+
+    counts = job_queue.counts(batch)
+    return counts["done"], counts["failed"]
+
+
+def make_backend(args, settings_manager):
+    """Build the backend chosen on the command line (None to use the settings)"""
+    if args.backend == "fake":
+        return FakeBackend(
+            latency=settings_manager.get_setting("api_settings.fake_latency", 0.5),
+            tokens_per_second=settings_manager.get_setting("api_settings.fake_tokens_per_second", 50)
+        )
+    if args.backend == "openai_compatible" or (args.backend is None and args.base_url):
+        base_url = args.base_url or settings_manager.get_setting("api_settings.base_url", "")
+        if not base_url:
+            raise ValueError("--base-url is required for the openai_compatible backend")
+        return OpenAICompatibleBackend(base_url)
+    if args.backend == "openai":
+        return OpenAIBackend()
+    return None
+
+
+def write_metrics(path):
+    """Dump the metrics registry to a file, in Prometheus format for .prom files and JSON otherwise"""
+    text = default_registry.to_prometheus() if path.endswith(".prom") else default_registry.to_json()
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    except IOError as e:
+        print(f"Error writing metrics: {e}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Michelin star recipes in bulk from a JSONL file of parameter sets.")
+    parser.add_argument("input", help="JSONL file with one recipe parameter object per line (missing keys use the GUI defaults), "
+                                      "or a JSON sweep spec with --sweep")
+    parser.add_argument("-o", "--output", default="-", help="Output JSONL file (default: stdout)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Maximum number of requests in flight (default: 4)")
+    parser.add_argument("--sweep", action="store_true",
+                        help="Treat the input as a parameter sweep spec and generate each distinct prompt once")
+    parser.add_argument("--durable", action="store_true",
+                        help="Keep the jobs in a persistent queue so an interrupted batch can be resumed by running it again")
+    parser.add_argument("--job-name", help="Name of the durable batch (default: the input file's absolute path)")
+    parser.add_argument("--retry-failed", action="store_true", help="With --durable, also retry jobs that failed in earlier runs")
+    parser.add_argument("--bypass-cache", action="store_true", help="Ignore cached responses and call the API for every recipe")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Use the asyncio engine instead of a thread pool")
+    parser.add_argument("--rpm", type=int, help="Requests per minute limit (default: rate_limits setting)")
+    parser.add_argument("--tpm", type=int, help="Tokens per minute limit (default: rate_limits setting)")
+    parser.add_argument("--backend", choices=["openai", "openai_compatible", "fake"],
+                        help="Model backend for this run (default: api_settings.backend)")
+    parser.add_argument("--base-url", help="Server URL for the openai_compatible backend")
+    parser.add_argument("--metrics", help="Write latency/throughput metrics to this file when done "
+                                          "(Prometheus text format if it ends in .prom, otherwise JSON)")
+    args = parser.parse_args(argv)
+    if args.durable and args.use_async:
+        parser.error("--durable runs on the thread pool and cannot be combined with --async")
+
+    settings_manager = SettingsManager()
+    try:
+        recipe_generator = RecipeGenerator(settings_manager, backend=make_backend(args, settings_manager))
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    if recipe_generator.client is None:
+        print("OpenAI API key is not set. Run the desktop app once to store it.", file=sys.stderr)
+        return 2
+
+    # Command-line limits apply to this run only; the saved settings are left alone
+    if args.rpm is not None:
+        recipe_generator.scheduler.request_bucket = TokenBucket(args.rpm)
+    if args.tpm is not None:
+        recipe_generator.scheduler.token_bucket = TokenBucket(args.tpm)
+
+    sweep = None
+    try:
+        if args.sweep:
+            sweep = read_sweep_file(args.input)
+            params_iter = sweep
+        else:
+            params_iter = read_params_file(args.input)
+    except (IOError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    output = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8')
+    try:
+        if args.durable:
+            succeeded, failed = run_durable_batch(
+                recipe_generator,
+                JobQueue.from_settings(settings_manager),
+                args.job_name or os.path.abspath(args.input),
+                params_iter,
+                output,
+                max_concurrency=args.concurrency,
+                bypass_cache=args.bypass_cache,
+                retry_failed=args.retry_failed
+            )
+        elif args.use_async:
+            engine = AsyncRecipeEngine(recipe_generator, max_concurrency=args.concurrency)
+            succeeded, failed = asyncio.run(run_batch_async(
+                engine,
+                params_iter,
+                output,
+                bypass_cache=args.bypass_cache
+            ))
+        else:
+            succeeded, failed = run_batch(
+                recipe_generator,
+                params_iter,
+                output,
+                max_concurrency=args.concurrency,
+                bypass_cache=args.bypass_cache
+            )
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"\nBatch complete: {succeeded} succeeded, {failed} failed.", file=sys.stderr)
+    if sweep is not None:
+        print(f"Sweep: {sweep.generated} combinations, {sweep.duplicates} skipped as duplicate prompts.", file=sys.stderr)
+    usage = recipe_generator.token_budget.summary()["session"]
+    print(f"Tokens used: {usage['prompt_tokens']} prompt + {usage['completion_tokens']} completion "
+          f"over {usage['requests']} requests.", file=sys.stderr)
+
+    if args.metrics:
+        write_metrics(args.metrics)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
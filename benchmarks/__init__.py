@@ -0,0 +1,4 @@
+# Benchmarks for the Michelin Star Recipe Generator
+# Run from the directory containing the package, e.g.:
+#   python -m michelin_recipe_generator.benchmarks.bench_formatter
+#   python -m michelin_recipe_generator.benchmarks.run_benchmarks -o results.json
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Michelin Star Recipe Generator
+Micro-benchmark for the recipe HTML formatter
+
+Formats synthetic recipe texts of increasing size and reports the time per line; a linear
+formatter keeps that figure roughly constant as the input grows.
+
+Usage:
+    python -m michelin_recipe_generator.benchmarks.bench_formatter [--sizes 10000 50000 100000] [--json]
+"""
+
+import argparse
+import json
+import time
+
+from ..recipe_renderer import format_recipe_body
+
+# One repeating block exercising every formatter branch (headers, blocks, both list types, paragraphs)
+SECTION_TEMPLATE = [
+    "INGREDIENTS:",
+    "- 2 tbsp unsalted butter",
+    "- 4 diver scallops, side muscle removed",
+    "- 1 tsp Maldon salt",
+    "",
+    "INSTRUCTIONS:",
+    "1. Pat the scallops completely dry.",
+    "2. Sear in foaming butter for 90 seconds per side.",
+    "3. Rest for one minute before plating.",
+    "Baste continuously while searing to build an even crust.",
+    "CHEF'S NOTES:",
+    "The pan must be smoking hot before the scallops go in.",
+    "WINE PAIRING:",
+    "- A mineral Chablis Premier Cru",
+    "SUBSTITUTIONS:",
+    "- Halibut cheeks work in place of scallops",
+    "",
+]
+
+
+def make_recipe_text(line_count):
+    """Build a synthetic recipe text with roughly line_count lines"""
+    lines = ["Butter-Basted Scallops with Brown Butter Emulsion"]
+    while len(lines) < line_count:
+        lines.extend(SECTION_TEMPLATE)
+    return "\n".join(lines[:line_count])
+
+
+def time_formatter(recipe_text, repeats):
+    """Best-of-N wall time for formatting one text"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        format_recipe_body(recipe_text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes, repeats):
+    """Benchmark each size and return one result dict per size"""
+    results = []
+    for size in sizes:
+        recipe_text = make_recipe_text(size)
+        seconds = time_formatter(recipe_text, repeats)
+        results.append({
+            "benchmark": "format_recipe_body",
+            "lines": size,
+            "bytes": len(recipe_text.encode("utf-8")),
+            "seconds": seconds,
+            "us_per_line": seconds / size * 1e6
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the recipe HTML formatter on large inputs.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 25000, 50000, 100000],
+                        help="Input sizes in lines (default: 10000 25000 50000 100000)")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per size; the fastest is reported (default: 5)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeats)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'lines':>10} {'bytes':>12} {'total ms':>10} {'us/line':>9}")
+    for result in results:
+        print(f"{result['lines']:>10} {result['bytes']:>12} {result['seconds'] * 1000:>10.1f} {result['us_per_line']:>9.2f}")
+
+    # Linear scaling means the per-line cost of the largest input stays close to the smallest
+    ratio = results[-1]["us_per_line"] / results[0]["us_per_line"]
+    print(f"\nPer-line cost ratio (largest / smallest input): {ratio:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Michelin Star Recipe Generator
+End-to-end benchmark suite for the generation pipeline
+
+Runs every stage against the offline fake backend in a throwaway home directory (so your real
+settings, history and API key are never touched) and reports timings as JSON:
+
+- _construct_prompt throughput
+- _process_recipe and _format_recipe_as_html on small, typical and huge recipe texts
+- save_recipe_to_history with 10, 1k and 10k entries already in the history
+- SettingsManager load time and a burst of set_setting calls
+- a full generate_recipe call with an instant fake backend (our own overhead)
+- cold startup of main.main in a fresh interpreter
+
+Usage:
+    python -m michelin_recipe_generator.benchmarks.run_benchmarks [--quick] [-o results.json]
+    python -m michelin_recipe_generator.benchmarks.run_benchmarks --baseline baseline.json [--tolerance 0.25]
+
+With --baseline the run exits with status 1 if any benchmark's median got slower than the
+baseline by more than the tolerance. --max-startup does the same for an absolute cold startup
+budget, which works as a startup-time regression check without any stored baseline:
+
+    python -m michelin_recipe_generator.benchmarks.run_benchmarks --quick --max-startup 1.5
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from .bench_formatter import make_recipe_text
+
+# Name of the top-level package, for running code in a fresh interpreter
+PACKAGE = __package__.split('.')[0]
+
+# Directory that contains the package (not resolved, so symlinked checkouts keep working)
+PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SMALL_RECIPE = """Seared Scallops
+
+INGREDIENTS:
+- 4 scallops
+- 1 tbsp butter
+
+INSTRUCTIONS:
+1. Sear the scallops in foaming butter.
+
+**Complexity Score: 3/10**
+"""
+
+# Runs a cold start of main.main: the event loop is replaced so the process exits once the window is up
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+QApplication.exec_ = lambda self: self.processEvents() or 0
+from {package} import main as app_main
+imported = time.perf_counter()
+try:
+    app_main.main()
+except SystemExit:
+    pass
+print(json.dumps({{"import_s": imported - start, "startup_s": time.perf_counter() - start}}))
+"""
+
+
+def measure(func, iterations, setup=None):
+    """Time func() iterations times (setup() runs untimed before each call) and return the samples"""
+    samples = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(benchmark, case, samples, **extra):
+    """Build a result dict from timing samples"""
+    ordered = sorted(samples)
+    median = statistics.median(ordered)
+    result = {
+        "benchmark": benchmark,
+        "case": case,
+        "iterations": len(samples),
+        "mean_s": statistics.mean(ordered),
+        "median_s": median,
+        "p95_s": ordered[min(len(ordered) - 1, int(round(0.95 * len(ordered))) - 1)],
+        "min_s": ordered[0],
+        "ops_per_s": 1 / median if median > 0 else None
+    }
+    result.update(extra)
+    return result
+
+
+def prepare_home(home):
+    """Point the app at a temporary home directory, seeded with settings for the fake backend"""
+    os.environ["HOME"] = home
+    os.environ["USERPROFILE"] = home # Path.home() on Windows
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    from ..settings_manager import SettingsManager
+    settings_manager = SettingsManager()
+    # Written before returning, so a fresh interpreter (cold startup) sees them too
+    with settings_manager.batch_updates():
+        settings_manager.set_setting("api_settings.backend", "fake")
+        settings_manager.set_setting("api_settings.fake_latency", 0)
+        settings_manager.set_setting("api_settings.fake_tokens_per_second", 0)
+        settings_manager.set_setting("cache_settings.enabled", False)
+    return settings_manager
+
+
+def bench_construct_prompt(generator, scale):
+    """Prompt construction throughput over a spread of parameter sets"""
+    from ..chef_profiles import CHEF_PROFILES
+    from ..recipe_generator import with_default_params
+    from ..prompt_templates import clear_cache
+
+    chef_ids = list(CHEF_PROFILES)
+    params_list = [
+        with_default_params({
+            "chefs": {chef_ids[i % len(chef_ids)]: (i * 7) % 101, chef_ids[(i + 3) % len(chef_ids)]: 50},
+            "michelin_stars": 1 + i % 3,
+            "gastronomy_level": (i * 13) % 101,
+            "dietary_restrictions": ["Vegetarian"] if i % 2 else []
+        })
+        for i in range(100)
+    ]
+    rounds = 20 * scale
+
+    def run():
+        for params in params_list:
+            generator._construct_prompt(params)
+
+    results = []
+    # Cold: the memoized prompts are dropped before every round; warm: every prompt is a cache hit
+    for case, setup in (("100_param_sets_cold", clear_cache), ("100_param_sets", None)):
+        samples = measure(run, rounds, setup=setup)
+        per_prompt = [sample / len(params_list) for sample in samples]
+        results.append(summarize("construct_prompt", case, per_prompt))
+    return results
+
+
+def bench_process_and_format(generator, scale):
+    """_process_recipe and _format_recipe_as_html on small, typical and huge recipes"""
+    from ..backends import CANNED_RECIPES
+    from ..recipe_generator import with_default_params
+    from ..recipe_renderer import default_renderer
+
+    params = with_default_params({})
+    cases = [
+        ("small", SMALL_RECIPE, 200 * scale),
+        ("typical", CANNED_RECIPES[0], 100 * scale),
+        ("huge", make_recipe_text(20000), 3 * scale)
+    ]
+
+    results = []
+    for case, text, iterations in cases:
+        size = {"lines": text.count("\n") + 1, "bytes": len(text.encode("utf-8"))}
+        samples = measure(lambda: generator._process_recipe(text, params), iterations)
+        results.append(summarize("process_recipe", case, samples, **size))
+        # Clear the renderer cache so every call really formats the text
+        samples = measure(lambda: generator._format_recipe_as_html(text), iterations, setup=default_renderer.clear)
+        results.append(summarize("format_recipe_as_html", case, samples, **size))
+    return results
+
+
+def bench_history_save(settings_manager, generator, scale):
+    """save_recipe_to_history with a history already holding 10, 1k and 10k entries"""
+    from ..backends import CANNED_RECIPES
+    from ..recipe_generator import with_default_params
+
+    recipe = generator._process_recipe(CANNED_RECIPES[0], with_default_params({}))
+    entry = {"title": recipe["title"], "timestamp": recipe["timestamp"], "recipe": recipe}
+    entry_line = json.dumps(entry, ensure_ascii=False) + "\n"
+
+    results = []
+    for history_size in (10, 1000, 10000):
+        settings_manager.set_setting("recipe_history_size", history_size)
+        settings_manager.clear_recipe_history()
+        with open(settings_manager.get_recipe_history_file(), 'w', encoding='utf-8') as f:
+            f.write(entry_line * history_size)
+        settings_manager.history_store._line_count = None # Re-count after writing the file directly
+
+        counter = iter(range(10 ** 9))
+
+        def save():
+            settings_manager.save_recipe_to_history(dict(recipe, id=f"bench_{history_size}_{next(counter)}"))
+
+        save() # Warm-up (opens the library)
+        samples = measure(save, 20 * scale)
+        results.append(summarize("save_recipe_to_history", f"history_{history_size}", samples,
+                                 history_entries=history_size))
+    return results
+
+
+def bench_settings_load(scale):
+    """Time to construct a SettingsManager from an existing settings file"""
+    from ..settings_manager import SettingsManager
+    samples = measure(SettingsManager, 50 * scale)
+    return [summarize("settings_manager_load", "existing_settings", samples)]
+
+
+def bench_set_setting(settings_manager, scale):
+    """100 set_setting calls in a row (as automation does), then the flush that writes them"""
+    keys = [f"bench.key_{i}" for i in range(100)]
+
+    def run():
+        for i, key in enumerate(keys):
+            settings_manager.set_setting(key, i)
+        settings_manager.flush()
+
+    samples = measure(run, 10 * scale)
+    return [summarize("set_setting", "100_keys_and_flush", samples)]
+
+
+def bench_generate_recipe(generator, scale):
+    """A full generate_recipe call with an instant fake backend, i.e. everything except the model"""
+    from ..recipe_generator import with_default_params
+    params = with_default_params({"chefs": {"thomas_keller": 70}, "michelin_stars": 3})
+
+    results = []
+    for stream in (True, False):
+        generator.settings_manager.set_setting("api_settings.stream", stream)
+        samples = measure(lambda: generator.generate_recipe(params, bypass_cache=True), 20 * scale)
+        results.append(summarize("generate_recipe", "stream" if stream else "no_stream", samples))
+    return results
+
+
+def bench_cold_startup(scale):
+    """Cold start of main.main in a fresh interpreter, until the window is shown"""
+    script = STARTUP_SCRIPT.format(package=PACKAGE)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = PACKAGE_PARENT + os.pathsep + env.get("PYTHONPATH", "")
+
+    process_samples = []
+    startup_samples = []
+    import_samples = []
+    for _ in range(3 * scale):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", script], env=env, cwd=PACKAGE_PARENT,
+                                capture_output=True, text=True, timeout=120)
+        process_samples.append(time.perf_counter() - start)
+        if output.returncode != 0:
+            raise RuntimeError(f"Startup benchmark failed:\n{output.stderr}")
+        timings = json.loads(output.stdout.strip().splitlines()[-1])
+        startup_samples.append(timings["startup_s"])
+        import_samples.append(timings["import_s"])
+
+    return [
+        summarize("cold_startup", "main_window_shown", startup_samples),
+        summarize("cold_startup", "import_main", import_samples),
+        summarize("cold_startup", "process_total", process_samples)
+    ]
+
+
+def run(quick=False, include_startup=True):
+    """Run the whole suite in a temporary home directory and return the results document"""
+    scale = 1 if quick else 5
+    original_env = {key: os.environ.get(key) for key in ("HOME", "USERPROFILE")}
+
+    with tempfile.TemporaryDirectory(prefix="recipe_bench_") as home:
+        try:
+            settings_manager = prepare_home(home)
+
+            from ..backends import FakeBackend
+            from ..recipe_generator import RecipeGenerator
+            generator = RecipeGenerator(settings_manager, backend=FakeBackend())
+
+            results = []
+            results += bench_construct_prompt(generator, scale)
+            results += bench_process_and_format(generator, scale)
+            results += bench_history_save(settings_manager, generator, scale)
+            results += bench_settings_load(scale)
+            results += bench_set_setting(settings_manager, scale)
+            results += bench_generate_recipe(generator, scale)
+            settings_manager.flush()
+            if include_startup:
+                results += bench_cold_startup(scale)
+        finally:
+            for key, value in original_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": quick,
+        "results": results
+    }
+
+
+def compare(results, baseline, tolerance):
+    """List benchmarks whose median is slower than the baseline by more than tolerance (a fraction)"""
+    baseline_medians = {(item["benchmark"], item["case"]): item["median_s"] for item in baseline["results"]}
+    regressions = []
+    for item in results["results"]:
+        reference = baseline_medians.get((item["benchmark"], item["case"]))
+        if reference and item["median_s"] > reference * (1 + tolerance):
+            regressions.append({
+                "benchmark": item["benchmark"],
+                "case": item["case"],
+                "baseline_s": reference,
+                "median_s": item["median_s"],
+                "slowdown": item["median_s"] / reference
+            })
+    return regressions
+
+
+def check_startup(results, max_startup):
+    """List a regression if the median cold startup exceeds max_startup seconds"""
+    for item in results["results"]:
+        if (item["benchmark"], item["case"]) == ("cold_startup", "main_window_shown") and item["median_s"] > max_startup:
+            return [{
+                "benchmark": item["benchmark"],
+                "case": item["case"],
+                "baseline_s": max_startup,
+                "median_s": item["median_s"],
+                "slowdown": item["median_s"] / max_startup
+            }]
+    return []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the recipe generation pipeline with the offline fake backend.")
+    parser.add_argument("-o", "--output", help="Write the JSON results to this file (default: stdout)")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations, for a fast smoke run")
+    parser.add_argument("--skip-startup", action="store_true", help="Skip the cold startup benchmark (needs PyQt5)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown against the baseline as a fraction (default: 0.25)")
+    parser.add_argument("--max-startup", type=float,
+                        help="Fail if the median cold startup (until the window is shown) exceeds this many seconds")
+    args = parser.parse_args(argv)
+
+    results = run(quick=args.quick, include_startup=not args.skip_startup)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            results["regressions"] = compare(results, json.load(f), args.tolerance)
+    if args.max_startup is not None and not args.skip_startup:
+        results["regressions"] = results.get("regressions", []) + check_startup(results, args.max_startup)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    for item in sorted(results["results"], key=lambda item: (item["benchmark"], item["case"])):
+        print(f"{item['benchmark']:<24} {item['case']:<20} median {item['median_s'] * 1000:>10.3f} ms",
+              file=sys.stderr)
+
+    if results.get("regressions"):
+        for item in results["regressions"]:
+            print(f"REGRESSION {item['benchmark']} / {item['case']}: {item['median_s'] * 1000:.3f} ms "
+                  f"vs {item['baseline_s'] * 1000:.3f} ms ({item['slowdown']:.2f}x)", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
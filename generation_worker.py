@@ -0,0 +1,141 @@
+# michelin_recipe_generator/generation_worker.py
+import threading
+from concurrent.futures import CancelledError, TimeoutError as FutureTimeoutError
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from .recipe_generator import GenerationCancelled
+
+
+class GenerationSignals(QObject):
+    """
+    Signals emitted by a GenerationJob.
+    QRunnable is not a QObject, so the job carries one of these to talk to the UI.
+    """
+    progress = pyqtSignal(str)
+    delta = pyqtSignal(str)
+    finished = pyqtSignal(dict)
+    error = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class GenerationJob(QRunnable):
+    """
+    A single recipe generation running on a QThreadPool worker thread.
+    Results are delivered through the job's signals, which Qt queues back onto the GUI thread.
+    If an AsyncRecipeEngine is given, the request runs on the engine's event loop instead and
+    the worker thread only waits for it.
+    """
+
+    def __init__(self, recipe_generator, params, bypass_cache=False, engine=None):
+        super().__init__()
+        self.recipe_generator = recipe_generator
+        self.params = params
+        self.bypass_cache = bypass_cache
+        self.engine = engine
+        self.signals = GenerationSignals()
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """Request cancellation; the generator stops at its next checkpoint"""
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+        """Check if cancellation has been requested"""
+        return self._cancel_event.is_set()
+
+    def run(self):
+        """Run the generation (called on a worker thread)"""
+        try:
+            if self.engine is not None:
+                recipe = self._run_on_engine()
+            else:
+                recipe = self.recipe_generator.generate_recipe(
+                    self.params,
+                    cancel_event=self._cancel_event,
+                    progress_callback=self.signals.progress.emit,
+                    delta_callback=self.signals.delta.emit,
+                    bypass_cache=self.bypass_cache
+                )
+        except (GenerationCancelled, CancelledError):
+            self.signals.cancelled.emit()
+            return
+        except Exception as e:
+            # Errors raised after the user cancelled are not worth reporting
+            if self.is_cancelled():
+                self.signals.cancelled.emit()
+            else:
+                self.signals.error.emit(str(e))
+            return
+
+        if self.is_cancelled():
+            self.signals.cancelled.emit()
+        elif recipe:
+            self.signals.finished.emit(recipe)
+        else:
+            self.signals.error.emit("Could not generate recipe. Please ensure your API key is valid and try again.")
+
+    def _run_on_engine(self):
+        """Submit the request to the async engine and wait for it, watching for cancellation"""
+        self.signals.progress.emit("Waiting for the recipe...")
+        future = self.engine.submit(self.params, bypass_cache=self.bypass_cache,
+                                    delta_callback=self.signals.delta.emit)
+        while True:
+            try:
+                return future.result(timeout=0.1)
+            except FutureTimeoutError:
+                if self.is_cancelled():
+                    # Cancels the asyncio task, which aborts the HTTP request
+                    future.cancel()
+                    raise GenerationCancelled("Recipe generation was cancelled.")
+
+
+class GenerationService(QObject):
+    """
+    Runs recipe generation jobs in the background so the GUI thread never blocks on the API.
+    Keeps track of running jobs so they can be cancelled (e.g. when the window closes).
+    """
+
+    def __init__(self, recipe_generator, max_workers=2, parent=None, engine=None):
+        super().__init__(parent)
+        self.recipe_generator = recipe_generator
+        self.engine = engine
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(max_workers)
+        self._active_jobs = set()
+
+    def submit(self, params, bypass_cache=False):
+        """Start generating a recipe in the background and return the job"""
+        job = GenerationJob(self.recipe_generator, params, bypass_cache=bypass_cache, engine=self.engine)
+
+        # Keep a reference until the job reports back, otherwise the signals object may be collected
+        self._active_jobs.add(job)
+        job.signals.finished.connect(lambda _recipe, j=job: self._release(j))
+        job.signals.error.connect(lambda _message, j=job: self._release(j))
+        job.signals.cancelled.connect(lambda j=job: self._release(j))
+
+        self.thread_pool.start(job)
+        return job
+
+    def _release(self, job):
+        """Forget a job once it has finished, failed or been cancelled"""
+        self._active_jobs.discard(job)
+
+    def active_jobs(self):
+        """Get the jobs that have not reported back yet"""
+        return list(self._active_jobs)
+
+    def cancel_all(self):
+        """Request cancellation of every running job"""
+        for job in list(self._active_jobs):
+            job.cancel()
+
+    def wait_for_done(self, msecs=-1):
+        """Block until all jobs have returned (used on shutdown)"""
+        return self.thread_pool.waitForDone(msecs)
+
+    def shutdown(self):
+        """Cancel running jobs and stop the async engine's loop, if any"""
+        self.cancel_all()
+        if self.engine is not None:
+            self.engine.shutdown()
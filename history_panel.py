@@ -0,0 +1,164 @@
+# michelin_recipe_generator/history_panel.py
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
+                            QComboBox, QListWidget, QListWidgetItem, QPushButton)
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+
+from .chef_profiles import CHEF_PROFILES
+
+
+class RecipeHistoryPanel(QWidget):
+    """
+    Searchable, paginated view of the recipe library.
+    Only one page of summaries is loaded at a time; the full recipe is fetched when selected.
+    """
+    recipe_selected = pyqtSignal(dict)
+
+    PAGE_SIZE = 25
+
+    def __init__(self, settings_manager, parent=None):
+        super().__init__(parent)
+        self.settings_manager = settings_manager
+        self.page = 0
+        self.total = 0
+        self.init_ui()
+
+    @property
+    def library(self):
+        """The recipe library, opened on first use"""
+        return self.settings_manager.get_recipe_library()
+
+    def init_ui(self):
+        """Initialize the panel UI"""
+        layout = QVBoxLayout(self)
+
+        # Full-text search (debounced so typing doesn't query on every keystroke)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search titles and recipe text...")
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.reset_and_refresh)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        layout.addWidget(self.search_input)
+
+        # Filters
+        filter_layout = QHBoxLayout()
+        self.chef_filter = QComboBox()
+        self.stars_filter = QComboBox()
+        self.occasion_filter = QComboBox()
+        self.dietary_filter = QComboBox()
+        for combo in (self.chef_filter, self.stars_filter, self.occasion_filter, self.dietary_filter):
+            combo.currentIndexChanged.connect(self.reset_and_refresh)
+            filter_layout.addWidget(combo)
+        layout.addLayout(filter_layout)
+
+        # Results
+        self.results_list = QListWidget()
+        self.results_list.currentItemChanged.connect(self.open_item)
+        layout.addWidget(self.results_list)
+
+        # Pagination
+        page_layout = QHBoxLayout()
+        self.prev_button = QPushButton("< Previous")
+        self.next_button = QPushButton("Next >")
+        self.page_label = QLabel()
+        self.page_label.setAlignment(Qt.AlignCenter)
+        self.prev_button.clicked.connect(self.previous_page)
+        self.next_button.clicked.connect(self.next_page)
+        page_layout.addWidget(self.prev_button)
+        page_layout.addWidget(self.page_label)
+        page_layout.addWidget(self.next_button)
+        layout.addLayout(page_layout)
+
+        self.populate_filters()
+        self.refresh()
+
+    def populate_filters(self):
+        """Fill the filter dropdowns from the values actually present in the library"""
+        self._set_combo_items(self.chef_filter, "Any chef", [
+            (CHEF_PROFILES.get(chef_id, {}).get("name", chef_id), chef_id)
+            for chef_id in self.library.distinct_values("chef")
+        ])
+        self._set_combo_items(self.stars_filter, "Any stars", [
+            (f"{stars} star" + ("s" if stars != 1 else ""), stars)
+            for stars in self.library.distinct_values("michelin_stars")
+        ])
+        self._set_combo_items(self.occasion_filter, "Any occasion", [
+            (occasion, occasion) for occasion in self.library.distinct_values("occasion")
+        ])
+        self._set_combo_items(self.dietary_filter, "Any diet", [
+            (restriction, restriction) for restriction in self.library.distinct_values("dietary_restriction")
+        ])
+
+    def _set_combo_items(self, combo, any_label, items):
+        """Replace a combo's items, keeping the current selection if it still exists"""
+        current = combo.currentData()
+        combo.blockSignals(True)
+        combo.clear()
+        combo.addItem(any_label, None)
+        for label, value in items:
+            combo.addItem(label, value)
+        index = combo.findData(current)
+        combo.setCurrentIndex(index if index >= 0 else 0)
+        combo.blockSignals(False)
+
+    def reset_and_refresh(self):
+        """Go back to the first page and re-run the query"""
+        self.page = 0
+        self.refresh()
+
+    def refresh(self):
+        """Run the current query and show one page of results"""
+        result = self.library.search(
+            query=self.search_input.text(),
+            chef=self.chef_filter.currentData(),
+            michelin_stars=self.stars_filter.currentData(),
+            occasion=self.occasion_filter.currentData(),
+            dietary_restriction=self.dietary_filter.currentData(),
+            page=self.page,
+            page_size=self.PAGE_SIZE
+        )
+        self.total = result["total"]
+
+        self.results_list.clear()
+        for summary in result["items"]:
+            details = []
+            if summary.get("michelin_stars"):
+                details.append(f"{summary['michelin_stars']}★")
+            if summary.get("complexity_score") is not None:
+                details.append(f"complexity {summary['complexity_score']}/10")
+            if summary.get("timestamp"):
+                details.append(summary["timestamp"][:16].replace("T", " "))
+            item = QListWidgetItem(f"{summary['title']}\n{'  ·  '.join(details)}")
+            item.setData(Qt.UserRole, summary["recipe_id"])
+            self.results_list.addItem(item)
+
+        page_count = max(1, (self.total + self.PAGE_SIZE - 1) // self.PAGE_SIZE)
+        self.page_label.setText(f"Page {self.page + 1} of {page_count} ({self.total} recipes)")
+        self.prev_button.setEnabled(self.page > 0)
+        self.next_button.setEnabled(self.page + 1 < page_count)
+
+    def reload(self):
+        """Refresh filters and results after new recipes were added"""
+        self.populate_filters()
+        self.refresh()
+
+    def previous_page(self):
+        """Show the previous page of results"""
+        if self.page > 0:
+            self.page -= 1
+            self.refresh()
+
+    def next_page(self):
+        """Show the next page of results"""
+        if (self.page + 1) * self.PAGE_SIZE < self.total:
+            self.page += 1
+            self.refresh()
+
+    def open_item(self, item, _previous=None):
+        """Load the selected recipe and hand it to whoever displays recipes"""
+        if item is None:
+            return
+        recipe = self.library.get_recipe(item.data(Qt.UserRole))
+        if recipe:
+            self.recipe_selected.emit(recipe)
@@ -0,0 +1,210 @@
+# michelin_recipe_generator/job_queue.py
+import json
+import sqlite3
+import time
+from contextlib import closing
+
+from .prompt_templates import prompt_hash
+
+JOB_STATES = ("pending", "running", "done", "failed")
+
+
+class JobQueue:
+    """
+    Durable, SQLite-backed queue of recipe generation jobs, so a long batch survives crashes.
+    Jobs belong to a named batch and move pending -> running -> done/failed. A job's idempotency
+    key is the hash of its prompt, so enqueuing the same menu again only adds what is new; jobs
+    left running by a crashed process go back to pending with recover(). A batch keeps the
+    generation settings (backend, model, temperature, ...) it was started with, and refuses to
+    run under different ones, which would mix recipes from two configurations.
+    """
+
+    def __init__(self, db_file):
+        """Initialize the queue, creating the database if needed"""
+        self.db_file = db_file
+        self._create_schema()
+
+    @classmethod
+    def from_settings(cls, settings_manager):
+        """Open the queue in the application directory"""
+        return cls(settings_manager.get_job_queue_file())
+
+    def _connect(self):
+        """Open a connection; one per operation keeps the queue safe to use from worker threads"""
+        return sqlite3.connect(str(self.db_file), timeout=30)
+
+    def _create_schema(self):
+        """Create the jobs table if it does not exist"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    batch TEXT NOT NULL,
+                    idempotency_key TEXT NOT NULL,
+                    params_json TEXT NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    recipe_json TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    UNIQUE (batch, idempotency_key)
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_batch_state ON jobs (batch, state, id);
+                CREATE TABLE IF NOT EXISTS batches (
+                    batch TEXT PRIMARY KEY,
+                    settings_json TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+            """)
+
+    def check_settings(self, batch, settings):
+        """
+        Record the generation settings of a new batch, or raise ValueError if the batch was
+        started with different ones (see RecipeGenerator.generation_settings)
+        """
+        settings_json = json.dumps(settings, sort_keys=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO batches (batch, settings_json, created_at) VALUES (?, ?, ?)",
+                (batch, settings_json, time.time())
+            )
+            stored = json.loads(conn.execute(
+                "SELECT settings_json FROM batches WHERE batch = ?", (batch,)
+            ).fetchone()[0])
+
+        settings = json.loads(settings_json)
+        changed = sorted(name for name in set(stored) | set(settings) if stored.get(name) != settings.get(name))
+        if changed:
+            differences = ", ".join(f"{name} {stored.get(name)!r} -> {settings.get(name)!r}" for name in changed)
+            raise ValueError(f"Batch {batch} was started with different generation settings ({differences}); "
+                             f"run it with the original settings or start a new batch")
+
+    def enqueue(self, batch, params_iter):
+        """
+        Add a job per parameter set to the batch, skipping any whose prompt is already queued.
+        Returns (added, skipped).
+        """
+        now = time.time()
+        added = 0
+        skipped = 0
+        with closing(self._connect()) as conn, conn:
+            for params in params_iter:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO jobs (batch, idempotency_key, params_json, created_at, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (batch, prompt_hash(params), json.dumps(params, ensure_ascii=False), now, now)
+                )
+                if cursor.rowcount:
+                    added += 1
+                else:
+                    skipped += 1
+        return added, skipped
+
+    def recover(self, batch=None):
+        """Return jobs left running (by a process that died) to pending; returns how many"""
+        return self._set_state("running", "pending", batch)
+
+    def retry_failed(self, batch=None):
+        """Queue failed jobs again; returns how many"""
+        return self._set_state("failed", "pending", batch)
+
+    def _set_state(self, from_state, to_state, batch):
+        """Move every job in from_state (optionally of one batch) to to_state"""
+        query = "UPDATE jobs SET state = ?, updated_at = ? WHERE state = ?"
+        args = [to_state, time.time(), from_state]
+        if batch is not None:
+            query += " AND batch = ?"
+            args.append(batch)
+        with closing(self._connect()) as conn, conn:
+            return conn.execute(query, args).rowcount
+
+    def claim(self, batch):
+        """Mark the oldest pending job of the batch as running and return (job_id, params), or None"""
+        with closing(self._connect()) as conn:
+            # BEGIN IMMEDIATE takes the write lock up front, so two workers can't claim the same job
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id, params_json FROM jobs WHERE batch = ? AND state = 'pending' ORDER BY id LIMIT 1",
+                    (batch,)
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET state = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (time.time(), row[0])
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def complete(self, job_id, recipe):
+        """Store a finished job's recipe"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE jobs SET state = 'done', recipe_json = ?, error = NULL, updated_at = ? WHERE id = ?",
+                (json.dumps(recipe, ensure_ascii=False), time.time(), job_id)
+            )
+
+    def fail(self, job_id, error):
+        """Record why a job failed"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE jobs SET state = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                (str(error), time.time(), job_id)
+            )
+
+    def counts(self, batch):
+        """Number of jobs in each state for the batch"""
+        counts = dict.fromkeys(JOB_STATES, 0)
+        with closing(self._connect()) as conn:
+            for state, count in conn.execute(
+                "SELECT state, COUNT(*) FROM jobs WHERE batch = ? GROUP BY state", (batch,)
+            ):
+                counts[state] = count
+        return counts
+
+    def results(self, batch):
+        """Yield {"job_id", "params", "recipe"} for every finished job of the batch, oldest first"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT id, params_json, recipe_json FROM jobs WHERE batch = ? AND state = 'done' ORDER BY id",
+                (batch,)
+            ).fetchall()
+        for job_id, params_json, recipe_json in rows:
+            yield {"job_id": job_id, "params": json.loads(params_json), "recipe": json.loads(recipe_json)}
+
+    def run(self, recipe_generator, batch, max_concurrency=4, bypass_cache=False):
+        """
+        Work through the batch's pending jobs with up to max_concurrency generations in flight.
+        Each job is claimed just before it starts and marked done or failed as soon as it finishes,
+        so an interrupted run loses at most the jobs that were in flight (see recover()).
+        Yields a result dict per job, as RecipeGenerator.generate_many does, plus its "job_id".
+        Raises ValueError if the generator's settings are not the ones the batch was started with.
+        """
+        self.check_settings(batch, recipe_generator.generation_settings())
+        job_ids = []
+
+        def claimed_params():
+            while True:
+                job = self.claim(batch)
+                if job is None:
+                    return
+                job_ids.append(job[0])
+                yield job[1]
+
+        for result in recipe_generator.generate_many(claimed_params(), max_concurrency=max_concurrency,
+                                                     bypass_cache=bypass_cache):
+            job_id = job_ids[result["index"]]
+            if "error" in result:
+                self.fail(job_id, result["error"])
+            else:
+                self.complete(job_id, result["recipe"])
+            result["job_id"] = job_id
+            yield result
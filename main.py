@@ -9,7 +9,7 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QTabWidget, QWidget,
                             QTextEdit, QGroupBox, QRadioButton, QScrollArea,
                             QSplitter, QFrame, QFileDialog, QMessageBox,
                             QDialog, QStyle) # Import QStyle for standard icons
-from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtCore import Qt, QSize, QTimer
 from PyQt5.QtGui import QFont, QPixmap, QIcon
 # Removed QColor, QPainter, QGraphicsDropShadowEffect imports
 
@@ -17,8 +17,10 @@ from PyQt5.QtGui import QFont, QPixmap, QIcon
 from .chef_profiles import CHEF_PROFILES
 from .recipe_generator import RecipeGenerator
 from .settings_manager import SettingsManager
-from .api_key_dialog import ApiKeyDialog
-from .settings_dialog import SettingsDialog # <-- Import the new dialog
+from .generation_worker import GenerationService
+# Dialogs, the history panel and the async engine are imported where first used to keep startup fast
+from .recipe_renderer import RECIPE_STYLESHEET, IncrementalRecipeFormatter, render_recipe_html
+from html import escape
 
 # Removed ChefPortraitEffect class
 class MichelinRecipeGenerator(QMainWindow):
@@ -27,10 +29,24 @@ class MichelinRecipeGenerator(QMainWindow):
 
         # Initialize settings
         self.settings_manager = SettingsManager()
-        self.recipe_generator = RecipeGenerator(self.settings_manager)
-
-        # Check for API key
-        self.check_api_key()
+        # The API client is set up after the window has painted (see finish_startup)
+        self.recipe_generator = RecipeGenerator(self.settings_manager, connect=False)
+
+        # Background generation keeps the window responsive while the API works
+        engine = None
+        if self.settings_manager.get_setting("api_settings.async_engine", False):
+            from .async_engine import AsyncRecipeEngine
+            engine = AsyncRecipeEngine(self.recipe_generator)
+        self.generation_service = GenerationService(self.recipe_generator, parent=self, engine=engine)
+        self.current_job = None
+
+        # Streamed text is formatted line by line; the display is refreshed at most every 100 ms
+        self.stream_formatter = None
+        self.stream_html_parts = []
+        self.stream_render_timer = QTimer(self)
+        self.stream_render_timer.setSingleShot(True)
+        self.stream_render_timer.setInterval(100)
+        self.stream_render_timer.timeout.connect(self.render_streamed_recipe)
 
         # Setup UI
         self.init_ui()
@@ -38,15 +54,28 @@ class MichelinRecipeGenerator(QMainWindow):
         # Apply dark theme
         self.apply_dark_theme()
 
+        # The API key prompt and client warm-up wait until the event loop is running
+        QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        """Check the API key and warm up the API client in the background once the window is on screen"""
+        self.check_api_key()
+        if self.recipe_generator.client is None:
+            self.recipe_generator.start_warmup()
+        if self.generation_service.engine is not None:
+            self.generation_service.engine.warm_up()
+
     def check_api_key(self):
         """Check if an API key is set and prompt if not"""
-        if not self.settings_manager.has_api_key():
+        # Local and fake backends work without a key
+        if self.recipe_generator.backend.requires_api_key and not self.settings_manager.has_api_key():
+            from .api_key_dialog import ApiKeyDialog
             dialog = ApiKeyDialog(self.settings_manager)
             result = dialog.exec_()
 
             if result == QDialog.Accepted:
                 # API key was set
-                self.recipe_generator.setup_api()
+                self.recipe_generator.start_warmup()
             else:
                 # User cancelled, show warning
                 QMessageBox.warning(
@@ -61,7 +90,6 @@ class MichelinRecipeGenerator(QMainWindow):
         # Construct path relative to this file's location
         script_dir = os.path.dirname(os.path.abspath(__file__))
         style_file_path = os.path.join(script_dir, "styles", "dark_theme.qss")
-        print(f"Stylesheet path: {style_file_path}")
         style_file = QFile(style_file_path)
         if not style_file.exists():
             print("Stylesheet not found!")
@@ -102,18 +130,33 @@ class MichelinRecipeGenerator(QMainWindow):
         # Create tab widget for customization categories
         self.tabs = QTabWidget()
 
-        # Create tabs
-        self.chef_tab = self.create_chef_tab()
-        self.recipe_params_tab = self.create_recipe_params_tab()
-        self.dietary_occasion_tab = self.create_dietary_occasion_tab()
-        self.equipment_time_tab = self.create_equipment_time_tab()
+        # Create tabs. Each tab starts as an empty page and is built the first time it is shown
+        # (or when its controls are needed), so only the visible tab is constructed at startup.
+        self.history_panel = None
+        self.tab_builders = [
+            self.create_chef_tab,
+            self.create_recipe_params_tab,
+            self.create_dietary_occasion_tab,
+            self.create_equipment_time_tab,
+            self.create_history_tab
+        ]
 
         # Add tabs to tab widget with icons
         style = self.style() # Get the application style
-        self.tabs.addTab(self.chef_tab, style.standardIcon(QStyle.SP_DirIcon), "Chef Selection") # Changed SP_UserIcon to SP_DirIcon
-        self.tabs.addTab(self.recipe_params_tab, style.standardIcon(QStyle.SP_FileDialogInfoView), "Recipe Parameters") # Changed SP_FileDialogDetailedView to SP_FileDialogInfoView
-        self.tabs.addTab(self.dietary_occasion_tab, style.standardIcon(QStyle.SP_MessageBoxInformation), "Dietary & Occasion")
-        self.tabs.addTab(self.equipment_time_tab, style.standardIcon(QStyle.SP_ComputerIcon), "Equipment & Time")
+        tab_labels = [
+            (style.standardIcon(QStyle.SP_DirIcon), "Chef Selection"), # Changed SP_UserIcon to SP_DirIcon
+            (style.standardIcon(QStyle.SP_FileDialogInfoView), "Recipe Parameters"), # Changed SP_FileDialogDetailedView to SP_FileDialogInfoView
+            (style.standardIcon(QStyle.SP_MessageBoxInformation), "Dietary & Occasion"),
+            (style.standardIcon(QStyle.SP_ComputerIcon), "Equipment & Time"),
+            (style.standardIcon(QStyle.SP_FileDialogListView), "Recipe History")
+        ]
+        for icon, label in tab_labels:
+            page = QWidget()
+            page_layout = QVBoxLayout(page)
+            page_layout.setContentsMargins(0, 0, 0, 0)
+            self.tabs.addTab(page, icon, label)
+        self.tabs.currentChanged.connect(self.ensure_tab)
+        self.ensure_tab(self.tabs.currentIndex())
 
         # Add settings button
         self.settings_button = QPushButton(style.standardIcon(QStyle.SP_FileDialogDetailedView), " Settings") # Use an appropriate icon
@@ -126,11 +169,21 @@ class MichelinRecipeGenerator(QMainWindow):
         # generate_button.setFont(QFont("Arial", 12, QFont.Bold)) # Removed, handled by QSS
         self.generate_button.clicked.connect(self.generate_recipe)
 
+        # Add cache bypass toggle (forces a fresh API call for an identical request)
+        self.bypass_cache_checkbox = QCheckBox("Bypass cache (regenerate)")
+        self.bypass_cache_checkbox.setToolTip("Ignore any cached recipe for these exact parameters and ask the API again")
+
+        # Add cancel button (only enabled while a recipe is being generated)
+        self.cancel_button = QPushButton(style.standardIcon(QStyle.SP_DialogCancelButton), " Cancel Generation")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_generation)
 
         # Add widgets to left layout
         left_layout.addWidget(self.tabs)
         left_layout.addWidget(self.settings_button) # <-- Add settings button here
+        left_layout.addWidget(self.bypass_cache_checkbox)
         left_layout.addWidget(self.generate_button)
+        left_layout.addWidget(self.cancel_button)
 
         # Create right panel (recipe display)
         right_panel = QWidget()
@@ -139,6 +192,8 @@ class MichelinRecipeGenerator(QMainWindow):
         # Create recipe display
         self.recipe_display = QTextEdit()
         self.recipe_display.setReadOnly(True)
+        # Recipes are rendered without an embedded stylesheet; install the shared one once
+        self.recipe_display.document().setDefaultStyleSheet(RECIPE_STYLESHEET)
         # self.recipe_display.setFont(QFont("Arial", 11)) # Removed, handled by QSS
 
         # Add save and export buttons
@@ -179,6 +234,26 @@ class MichelinRecipeGenerator(QMainWindow):
         # Show welcome message
         self.show_welcome_message()
 
+    def ensure_tab(self, index):
+        """Build the contents of a tab if that has not happened yet"""
+        if index < 0 or self.tab_builders[index] is None:
+            return
+        builder = self.tab_builders[index]
+        self.tab_builders[index] = None
+        self.tabs.widget(index).layout().addWidget(builder())
+
+    def ensure_all_tabs(self):
+        """Build every tab (their controls are read when collecting parameters)"""
+        for index in range(len(self.tab_builders)):
+            self.ensure_tab(index)
+
+    def create_history_tab(self):
+        """Create the searchable recipe history tab"""
+        from .history_panel import RecipeHistoryPanel
+        self.history_panel = RecipeHistoryPanel(self.settings_manager)
+        self.history_panel.recipe_selected.connect(self.display_recipe)
+        return self.history_panel
+
     def create_chef_tab(self):
         """Create the chef selection tab with influence sliders"""
         tab = QWidget()
@@ -475,36 +550,122 @@ class MichelinRecipeGenerator(QMainWindow):
         return tab
 
     def generate_recipe(self):
-        """Generate a recipe based on the selected parameters, with button feedback"""
+        """Start generating a recipe in the background, with button feedback"""
+        if self.current_job is not None:
+            return
+
         # Disable button and change text
-        original_text = self.generate_button.text()
         self.generate_button.setEnabled(False)
         self.generate_button.setText("Generating...")
-        QApplication.processEvents() # Ensure UI updates
+        self.cancel_button.setEnabled(True)
 
         # Collect all parameters
         params = self.collect_parameters()
 
-        # Generate recipe
-        try:
-            # Removed DEBUG print
-            recipe = self.recipe_generator.generate_recipe(params)
-            # Removed DEBUG print
-            if recipe: # Check if recipe generation was successful
-                self.display_recipe(recipe)
-            else:
-                # Handle case where recipe generation failed (returned None)
-                QMessageBox.warning(self, "Generation Failed",
-                                    "Could not generate recipe. Please ensure your API key is valid and try again.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"An unexpected error occurred during recipe generation: {str(e)}")
-        finally:
-            # Re-enable button and restore text
-            self.generate_button.setText(original_text)
-            self.generate_button.setEnabled(True)
+        # Hand the request to a worker thread; results come back through signals
+        job = self.generation_service.submit(params, bypass_cache=self.bypass_cache_checkbox.isChecked())
+        job.signals.progress.connect(lambda message, j=job: self.on_generation_progress(j, message))
+        job.signals.delta.connect(lambda text, j=job: self.on_generation_delta(j, text))
+        job.signals.finished.connect(lambda recipe, j=job: self.on_generation_finished(j, recipe))
+        job.signals.error.connect(lambda message, j=job: self.on_generation_error(j, message))
+        job.signals.cancelled.connect(lambda j=job: self.on_generation_cancelled(j))
+        self.current_job = job
+        self.stream_formatter = None
+
+    def cancel_generation(self):
+        """Cancel the running generation and give the UI back to the user straight away"""
+        if self.current_job is None:
+            return
+
+        self.current_job.cancel()
+        self.current_job = None
+        self.end_streamed_recipe()
+        self.reset_generation_controls()
+        self.statusBar().showMessage("Recipe generation cancelled.", 5000)
+
+    def reset_generation_controls(self):
+        """Restore the generate/cancel buttons after a job ends"""
+        self.generate_button.setText("Generate Michelin Recipe")
+        self.generate_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+
+    def on_generation_progress(self, job, message):
+        """Show progress messages from the current job"""
+        if job is self.current_job:
+            self.statusBar().showMessage(message)
+
+    def on_generation_delta(self, job, text):
+        """Format streamed text as it arrives and schedule a display refresh"""
+        if job is not self.current_job:
+            return
+
+        # Replace the previous recipe with the incoming one on the first delta
+        if self.stream_formatter is None:
+            self.stream_formatter = IncrementalRecipeFormatter()
+            self.stream_html_parts = []
+            self.complexity_label.setText("Complexity: -")
+
+        # Only lines completed by this delta are formatted; earlier output is never redone
+        html = self.stream_formatter.feed(text)
+        if html:
+            self.stream_html_parts.append(html)
+
+        if not self.stream_render_timer.isActive():
+            self.stream_render_timer.start()
+
+    def render_streamed_recipe(self):
+        """Show the recipe formatted so far, plus the line still being written"""
+        if self.stream_formatter is None:
+            return
+
+        html = "".join(self.stream_html_parts)
+        if self.stream_formatter.partial_line.strip():
+            html += f"<p>{escape(self.stream_formatter.partial_line.strip())}</p>"
+        self.recipe_display.setHtml(html)
+
+        # Follow the text as it grows
+        scroll_bar = self.recipe_display.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.maximum())
+
+    def end_streamed_recipe(self):
+        """Stop rendering streamed text (the job finished, failed or was cancelled)"""
+        self.stream_render_timer.stop()
+        self.stream_formatter = None
+        self.stream_html_parts = []
+
+    def on_generation_finished(self, job, recipe):
+        """Display the recipe produced by the current job"""
+        if job is not self.current_job:
+            return # Result of a job the user already cancelled
+        self.current_job = None
+        self.end_streamed_recipe()
+        self.reset_generation_controls()
+        self.statusBar().clearMessage()
+        self.display_recipe(recipe)
+        if self.history_panel is not None:
+            self.history_panel.reload()
+
+    def on_generation_error(self, job, message):
+        """Report a failed generation"""
+        if job is not self.current_job:
+            return
+        self.current_job = None
+        self.end_streamed_recipe()
+        self.reset_generation_controls()
+        self.statusBar().clearMessage()
+        QMessageBox.critical(self, "Error", f"An unexpected error occurred during recipe generation: {message}")
+
+    def on_generation_cancelled(self, job):
+        """Clean up after a job acknowledged its cancellation"""
+        if job is self.current_job:
+            self.current_job = None
+            self.reset_generation_controls()
 
     def collect_parameters(self):
         """Collect all parameters from the UI"""
+        # Tabs the user never opened still hold their default controls
+        self.ensure_all_tabs()
+
         params = {
             "chefs": {},
             "michelin_stars": 1,
@@ -571,8 +732,8 @@ class MichelinRecipeGenerator(QMainWindow):
 
     def display_recipe(self, recipe):
         """Display the generated recipe and its complexity score"""
-        # Assuming recipe is a dictionary with 'html_content' and 'complexity_score'
-        self.recipe_display.setHtml(recipe.get("html_content", "Error: Recipe content not found."))
+        # HTML is rendered on demand from the raw text (memoized by the shared renderer)
+        self.recipe_display.setHtml(render_recipe_html(recipe))
         self.complexity_label.setText(f"Complexity: {recipe.get('complexity_score', 'N/A')}")
 
     def save_recipe(self):
@@ -652,10 +813,17 @@ class MichelinRecipeGenerator(QMainWindow):
 
     def open_settings_dialog(self):
         """Open the settings configuration dialog."""
+        from .settings_dialog import SettingsDialog
         dialog = SettingsDialog(self.settings_manager, self)
         # No need to check result here, dialog handles saving internally on accept
         dialog.exec_()
 
+    def closeEvent(self, event):
+        """Cancel background jobs so the process can exit promptly, and save pending settings"""
+        self.generation_service.shutdown()
+        self.settings_manager.flush()
+        super().closeEvent(event)
+
 
 def main():
     app = QApplication(sys.argv)
@@ -0,0 +1,246 @@
+# michelin_recipe_generator/metrics.py
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Default histogram buckets in seconds, from fast local stages up to slow completions
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+# Recent observations kept per label set for percentiles
+SAMPLE_SIZE = 1024
+
+
+def _label_key(labels):
+    """Turn a labels dict into a hashable, consistently ordered key"""
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(label_key, extra=None):
+    """Format a label key as a Prometheus label set ('' if there are no labels)"""
+    pairs = list(label_key) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Counter:
+    """Monotonically increasing count per label set"""
+
+    def __init__(self, name, help_text=""):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """Add amount to the counter for the given labels"""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Get the current count for the given labels"""
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def reset(self):
+        """Drop every count"""
+        with self._lock:
+            self._values.clear()
+
+    def to_dict(self):
+        """Get the counts as JSON-serializable data"""
+        with self._lock:
+            return [{"labels": dict(key), "value": value} for key, value in self._values.items()]
+
+    def to_prometheus(self):
+        """Get the counter in Prometheus text format"""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Distribution of observed values per label set.
+    Keeps cumulative bucket counts for Prometheus and a bounded window of recent samples for
+    the p50/p95/p99 figures in the JSON dump, so memory stays constant however long it runs.
+    """
+
+    def __init__(self, name, help_text="", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Record one observation for the given labels"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0,
+                          "samples": deque(maxlen=SAMPLE_SIZE)}
+                self._series[key] = series
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][index] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+            series["samples"].append(value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Context manager that observes the seconds spent inside it"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def reset(self):
+        """Drop every observation"""
+        with self._lock:
+            self._series.clear()
+
+    def summary(self, **labels):
+        """Get count, sum, mean and p50/p95/p99 for the given labels (None if nothing was observed)"""
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            return self._summarize(series) if series else None
+
+    def _summarize(self, series):
+        """Summarize one series (caller holds the lock)"""
+        samples = sorted(series["samples"])
+        return {
+            "count": series["count"],
+            "sum": series["sum"],
+            "mean": series["sum"] / series["count"] if series["count"] else None,
+            "p50": _percentile(samples, 0.50),
+            "p95": _percentile(samples, 0.95),
+            "p99": _percentile(samples, 0.99)
+        }
+
+    def to_dict(self):
+        """Get every series as JSON-serializable data"""
+        with self._lock:
+            return [dict(self._summarize(series), labels=dict(key)) for key, series in self._series.items()]
+
+    def to_prometheus(self):
+        """Get the histogram in Prometheus text format (cumulative buckets, sum and count)"""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in self._series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', f'{bound:g}')])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series['sum']}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    In-process registry of counters and histograms.
+    Metrics are created on first use by name, and the whole registry can be dumped as JSON or
+    in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, **kwargs):
+        """Get a metric by name, creating it if needed"""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help_text, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {type(metric).__name__}")
+            return metric
+
+    def counter(self, name, help_text=""):
+        """Get (or create) a counter"""
+        return self._get_or_create(Counter, name, help_text)
+
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS):
+        """Get (or create) a histogram"""
+        return self._get_or_create(Histogram, name, help_text, buckets=buckets)
+
+    def to_dict(self):
+        """Get every metric as JSON-serializable data"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            metric.name: {
+                "type": "counter" if isinstance(metric, Counter) else "histogram",
+                "help": metric.help,
+                "series": metric.to_dict()
+            }
+            for metric in metrics
+        }
+
+    def to_json(self, indent=2):
+        """Dump every metric as a JSON document"""
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_prometheus(self):
+        """Dump every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.to_prometheus())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """
+        Zero every metric (e.g. between benchmark runs). The metrics stay registered, so
+        module-level references such as API_SECONDS keep recording into what is exported.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+
+# Registry shared by the generator, renderer, batch mode and anything else that reports metrics
+default_registry = MetricsRegistry()
+
+# Metrics recorded by the generation pipeline
+STAGE_SECONDS = default_registry.histogram(
+    "recipe_stage_seconds", "Time spent in each local stage of recipe generation")
+API_SECONDS = default_registry.histogram(
+    "recipe_api_seconds", "Time of completion requests, from sending the final attempt to the last token")
+API_WAIT_SECONDS = default_registry.histogram(
+    "recipe_api_wait_seconds", "Time completion requests waited before being sent, for rate limits or retry backoff")
+API_TTFT_SECONDS = default_registry.histogram(
+    "recipe_api_ttft_seconds", "Time from sending a streamed completion request to its first token")
+OUTPUT_TOKENS_PER_SECOND = default_registry.histogram(
+    "recipe_output_tokens_per_second", "Completion tokens per second of completion requests",
+    buckets=(5, 10, 20, 30, 40, 50, 75, 100, 150, 200, 300))
+REQUESTS_TOTAL = default_registry.counter(
+    "recipe_requests_total", "Recipe generations by outcome")
+TOKENS_TOTAL = default_registry.counter(
+    "recipe_tokens_total", "Tokens used by completion requests")
+RETRIES_TOTAL = default_registry.counter(
+    "recipe_api_retries_total", "Completion requests retried after a transient failure")
@@ -0,0 +1,118 @@
+# michelin_recipe_generator/parameter_sweep.py
+import itertools
+
+from .prompt_templates import influence_tier, prompt_hash
+from .recipe_generator import DEFAULT_PARAMS, with_default_params
+
+# Influence used for every value in a tier when collapse_influence_tiers is on
+TIER_REPRESENTATIVES = {"low": 15, "medium": 50, "high": 85}
+
+CHEF_AXIS_PREFIX = "chefs."
+
+
+def expand_axis(values):
+    """
+    Turn an axis specification into the list of values to try.
+    Accepts any iterable (sets are sorted so runs are repeatable) or, for JSON specs,
+    a {"start", "stop", "step"} range; stop is inclusive there, as in "0 to 100 in steps of 25".
+    """
+    if isinstance(values, dict):
+        start, stop, step = values.get("start", 0), values["stop"], values.get("step", 1)
+        if step <= 0:
+            raise ValueError(f"Range step must be positive, got {step}")
+        return list(range(start, stop + 1, step))
+    if isinstance(values, (set, frozenset)):
+        return sorted(values)
+    if isinstance(values, (str, bytes)) or not hasattr(values, "__iter__"):
+        return [values]
+    return list(values)
+
+
+class ParameterSweep:
+    """
+    Enumerates the cartesian product of parameter axes lazily and skips every combination whose
+    prompt is identical to one already produced, so each distinct prompt is generated only once.
+
+    axes maps a parameter name (a key of DEFAULT_PARAMS) to the values to try. A "chefs.<chef_id>"
+    axis sweeps one chef's influence, where 0 leaves the chef out. Parameters without an axis come
+    from base (and the GUI defaults).
+
+    The influence percentage is part of the prompt, so 72% and 90% are different prompts even though
+    they select the same "high" description. With collapse_influence_tiers every influence is
+    replaced by its tier's representative value (TIER_REPRESENTATIVES) before deduplication,
+    which cuts a sweep down to one prompt per tier at the cost of the exact percentages.
+    """
+
+    def __init__(self, axes, base=None, collapse_influence_tiers=False):
+        """Initialize the sweep, validating the axis names"""
+        for name in axes:
+            if name not in DEFAULT_PARAMS and not name.startswith(CHEF_AXIS_PREFIX):
+                raise ValueError(f"Unknown sweep parameter: {name}")
+        self.axes = {name: expand_axis(values) for name, values in axes.items()}
+        self.base = with_default_params(base)
+        self.collapse_influence_tiers = collapse_influence_tiers
+
+        # Counters for the most recent iteration
+        self.generated = 0
+        self.duplicates = 0
+
+    @classmethod
+    def from_dict(cls, spec):
+        """Create a sweep from a JSON-style spec: {"axes": {...}, "base": {...}, "collapse_influence_tiers": false}"""
+        if not isinstance(spec, dict) or not isinstance(spec.get("axes"), dict):
+            raise ValueError("A sweep spec needs an \"axes\" object mapping parameter names to values")
+        return cls(spec["axes"], base=spec.get("base"),
+                   collapse_influence_tiers=spec.get("collapse_influence_tiers", False))
+
+    def size(self):
+        """Number of combinations before deduplication"""
+        total = 1
+        for values in self.axes.values():
+            total *= len(values)
+        return total
+
+    def _make_params(self, assignment):
+        """Build the parameter set for one combination of axis values"""
+        params = {key: list(value) if isinstance(value, list) else value for key, value in self.base.items()}
+        chefs = dict(self.base["chefs"])
+
+        for name, value in assignment.items():
+            if name.startswith(CHEF_AXIS_PREFIX):
+                chef_id = name[len(CHEF_AXIS_PREFIX):]
+                if value:
+                    chefs[chef_id] = value
+                else:
+                    chefs.pop(chef_id, None)
+            elif name == "chefs":
+                chefs = dict(value)
+            else:
+                params[name] = list(value) if isinstance(value, (list, tuple)) else value
+
+        if self.collapse_influence_tiers:
+            chefs = {chef_id: TIER_REPRESENTATIVES[influence_tier(influence)] for chef_id, influence in chefs.items()}
+        params["chefs"] = chefs
+        return params
+
+    def combinations(self):
+        """Yield the parameter set for every combination, duplicates included"""
+        names = list(self.axes)
+        for values in itertools.product(*self.axes.values()):
+            yield self._make_params(dict(zip(names, values)))
+
+    def __iter__(self):
+        """Yield one parameter set per distinct prompt"""
+        self.generated = 0
+        self.duplicates = 0
+        seen = set()
+        for params in self.combinations():
+            self.generated += 1
+            key = prompt_hash(params)
+            if key in seen:
+                self.duplicates += 1
+                continue
+            seen.add(key)
+            yield params
+
+    def generate(self, recipe_generator, max_concurrency=4, bypass_cache=False):
+        """Generate a recipe for every distinct prompt concurrently (see RecipeGenerator.generate_many)"""
+        return recipe_generator.generate_many(self, max_concurrency=max_concurrency, bypass_cache=bypass_cache)
@@ -0,0 +1,184 @@
+# michelin_recipe_generator/prompt_templates.py
+import hashlib
+from functools import lru_cache
+
+from .chef_profiles import CHEF_PROFILES, CHEF_INFLUENCE_DESCRIPTIONS
+
+# Everything that does not depend on the parameter values is assembled once, at import time;
+# build_prompt only joins the pieces. Prompts are memoized per canonical parameter set.
+
+PROMPT_HEADER = "Create a Michelin-star level recipe with the following specifications:\n\n"
+
+NO_CHEF_TEXT = "CHEF INFLUENCES: No specific chef selected. Create a general Michelin-star level recipe.\n"
+
+STAR_DESCRIPTIONS = {
+    1: " - Excellent cooking, worth a stop",
+    2: " - Excellent cooking, worth a detour",
+    3: " - Exceptional cuisine, worth a special journey"
+}
+
+INGREDIENT_TEXT = {
+    "everyday": "Everyday ingredients that are commonly available in well-stocked supermarkets",
+    "luxury": "Luxurious, hard-to-find ingredients that might require specialty stores or online ordering"
+}
+
+SEASONAL_TEXT = "\nPrioritize seasonal ingredients appropriate for the current time of year"
+
+GASTRONOMY_TEXT = {
+    "traditional": " (mostly traditional cooking methods)",
+    "balanced": " (balanced mix of traditional and modern techniques)",
+    "modern": " (significant use of molecular gastronomy and modern techniques)"
+}
+
+SPECIALIZED_EQUIPMENT_TEXT = "\nSpecialized equipment is available (sous vide, anti-griddle, etc.)"
+
+FINAL_INSTRUCTIONS = """
+        \nPlease create a comprehensive recipe that includes:
+        1. A creative and descriptive title
+        2. A brief introduction explaining the dish and its inspiration
+        3. Comprehensive ingredients list with precise measurements
+        4. Detailed preparation instructions broken down by components
+        5. Step-by-step cooking instructions with timing and technique details
+        6. Plating instructions with artistic presentation guidance
+        7. Chef's notes with technique tips and insights
+        8. Suggested wine or beverage pairings
+        9. Possible ingredient substitutions
+
+        The recipe should reflect the chef influences, Michelin star level, and all other parameters specified above.
+ 
+        Finally, at the very end of your response, include a line formatted exactly like this:
+        **Complexity Score: [score]/10**
+        Where [score] is an integer from 1 to 10 representing the overall complexity based on ingredients and techniques.
+        """
+
+INFLUENCE_TIERS = ("low", "medium", "high")
+
+
+def influence_tier(influence):
+    """Map an influence percentage to its description tier"""
+    if influence >= 70:
+        return "high"
+    if influence >= 30:
+        return "medium"
+    return "low"
+
+
+def _chef_fragments(chef_id):
+    """The text around the influence percentage for each tier of one chef"""
+    chef = CHEF_PROFILES.get(chef_id, {})
+    descriptions = CHEF_INFLUENCE_DESCRIPTIONS.get(chef_id, {})
+    prefix = f"- {chef.get('name', 'Unknown Chef')} ("
+    return {
+        tier: (prefix, f"% influence): {descriptions.get(tier, '')}\n  Known for: {chef.get('signature', '')}\n")
+        for tier in INFLUENCE_TIERS
+    }
+
+
+CHEF_FRAGMENTS = {chef_id: _chef_fragments(chef_id) for chef_id in CHEF_PROFILES}
+
+# Used for chef ids that are not in CHEF_PROFILES (e.g. from an old history entry)
+UNKNOWN_CHEF_FRAGMENTS = _chef_fragments(None)
+
+
+def _value(value):
+    """Hashable form of a scalar parameter; the type is kept because 1 and 1.0 render differently"""
+    return (value.__class__, value)
+
+
+def canonical_params(params):
+    """
+    Reduce a parameter set to a hashable tuple of exactly what the prompt depends on.
+    Chef order is kept, since it is the order the chefs appear in the prompt.
+    Raises KeyError for a missing parameter, like building the prompt would.
+    """
+    return (
+        tuple((chef_id, _value(influence)) for chef_id, influence in params["chefs"].items()),
+        _value(params["michelin_stars"]),
+        params["ingredient_type"] == "everyday",
+        bool(params["seasonal"]),
+        _value(params["gastronomy_level"]),
+        bool(params["specialized_equipment"]),
+        tuple(params["dietary_restrictions"]),
+        _value(params["occasion"]),
+        _value(params["servings"]),
+        _value(params["prep_time"]),
+        _value(params["cook_time"]),
+        tuple(params["equipment"])
+    )
+
+
+@lru_cache(maxsize=4096)
+def _build_prompt(canonical):
+    """Build the prompt for a canonical parameter tuple"""
+    (chefs, (_, stars), everyday, seasonal, (_, gastronomy_level), specialized_equipment,
+     dietary_restrictions, (_, occasion), (_, servings), (_, prep_time), (_, cook_time), equipment) = canonical
+
+    parts = [PROMPT_HEADER]
+
+    # Chef influences
+    if chefs:
+        parts.append("CHEF INFLUENCES:\n")
+        for chef_id, (_, influence) in chefs:
+            prefix, suffix = CHEF_FRAGMENTS.get(chef_id, UNKNOWN_CHEF_FRAGMENTS)[influence_tier(influence)]
+            parts += (prefix, str(influence), suffix)
+    else:
+        parts.append(NO_CHEF_TEXT)
+
+    # Michelin star rating
+    parts += (f"\nMICHELIN STAR LEVEL: {stars} star", STAR_DESCRIPTIONS.get(stars, ""), "\n")
+
+    # Ingredient type
+    parts += ("\nINGREDIENT TYPE: ", INGREDIENT_TEXT["everyday" if everyday else "luxury"])
+    if seasonal:
+        parts.append(SEASONAL_TEXT)
+    parts.append("\n")
+
+    # Gastronomy level
+    if gastronomy_level < 30:
+        gastronomy_tier = "traditional"
+    elif gastronomy_level > 70:
+        gastronomy_tier = "modern"
+    else:
+        gastronomy_tier = "balanced"
+    parts += (f"\nGASTRONOMY LEVEL: {gastronomy_level}% modern techniques", GASTRONOMY_TEXT[gastronomy_tier])
+    if specialized_equipment:
+        parts.append(SPECIALIZED_EQUIPMENT_TEXT)
+    parts.append("\n")
+
+    if dietary_restrictions:
+        parts.append("\nDIETARY RESTRICTIONS: " + ", ".join(dietary_restrictions) + "\n")
+
+    parts.append(f"\nOCCASION: {occasion}\n\nSERVINGS: {servings}\n")
+    parts.append(f"\nTIME CONSTRAINTS:\n- Preparation time: approximately {prep_time} minutes"
+                 f"\n- Cooking time: approximately {cook_time} minutes\n")
+
+    if equipment:
+        parts.append("\nAVAILABLE EQUIPMENT: " + ", ".join(equipment) + "\n")
+
+    parts.append(FINAL_INSTRUCTIONS)
+    return "".join(parts)
+
+
+def build_prompt(params):
+    """Build the user prompt for a full parameter set (see with_default_params)"""
+    return _build_prompt(canonical_params(params))
+
+
+@lru_cache(maxsize=4096)
+def _hash_prompt(canonical):
+    return hashlib.sha256(_build_prompt(canonical).encode("utf-8")).hexdigest()
+
+
+def prompt_hash(params):
+    """
+    Stable hash of the prompt a parameter set produces.
+    Parameter sets that differ only in ways the prompt ignores hash the same, so this is the
+    identity to deduplicate and cache by. The API settings (model, system prompt, ...) are not included.
+    """
+    return _hash_prompt(canonical_params(params))
+
+
+def clear_cache():
+    """Drop the memoized prompts (e.g. to benchmark cold prompt construction)"""
+    _build_prompt.cache_clear()
+    _hash_prompt.cache_clear()
@@ -1,9 +1,425 @@
 import os
+import copy
 import json
 import time
-from datetime import datetime
-from openai import OpenAI
-from html import escape
+import uuid
+import random
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from .backends import create_backend
+
+from .prompt_templates import build_prompt
+from .metrics import (STAGE_SECONDS, API_SECONDS, API_TTFT_SECONDS, API_WAIT_SECONDS,
+                      OUTPUT_TOKENS_PER_SECOND, REQUESTS_TOTAL, TOKENS_TOTAL, RETRIES_TOTAL)
+from .recipe_parser import RECIPE_JSON_SCHEMA, ParsedRecipe, parse_recipe, recipe_to_text
+from .recipe_renderer import default_renderer
+from .response_cache import ResponseCache
+from .token_budget import TokenBudget
+
+
+# Parameter defaults, matching the initial state of the GUI controls
+DEFAULT_PARAMS = {
+    "chefs": {},
+    "michelin_stars": 1,
+    "ingredient_type": "everyday",
+    "seasonal": False,
+    "gastronomy_level": 50,
+    "specialized_equipment": False,
+    "dietary_restrictions": [],
+    "occasion": "Everyday Meal",
+    "servings": 4,
+    "prep_time": 60,
+    "cook_time": 60,
+    "equipment": ["Oven", "Stovetop"]
+}
+
+
+def with_default_params(params):
+    """Return a full parameter set, filling anything missing from DEFAULT_PARAMS"""
+    merged = copy.deepcopy(DEFAULT_PARAMS)
+    merged.update(params or {})
+    return merged
+
+
+class GenerationCancelled(Exception):
+    """Raised when a recipe generation is cancelled before it completes"""
+    pass
+
+
+class CircuitOpenError(Exception):
+    """Raised when requests are refused because the API has been failing repeatedly"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"API requests are paused after repeated failures; retrying in {retry_after:.0f}s.")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate (a rate of 0 means unlimited).
+    reserve() takes the tokens up front and returns how long the caller must wait before using
+    them, so callers queue up in order without polling and sync and async code can share a bucket.
+    """
+
+    def __init__(self, per_minute):
+        """Initialize a full bucket holding one minute's worth of tokens"""
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount=1):
+        """Take amount tokens and return the seconds to wait until they are actually available"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # A request larger than the bucket could never fit; let it through on a full bucket
+            self.tokens -= min(amount, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests after failure_threshold consecutive transient failures.
+    Once reset_timeout has passed a single trial request is let through; success closes the
+    circuit again, failure re-opens it. A trial that is never sent hands the slot back with
+    release_trial(), so the next caller makes it instead.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        """Initialize a closed circuit"""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed" # closed, open or half_open
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError if requests are currently refused.
+        Returns True if the caller was given the trial request, which it must settle with
+        record_success(), record_failure() or release_trial().
+        """
+        with self._lock:
+            if self.state == "closed":
+                return False
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == "open" and remaining <= 0:
+                self.state = "half_open" # This caller makes the trial request
+                return True
+            raise CircuitOpenError(max(remaining, 1.0))
+
+    def release_trial(self):
+        """Give back a trial that was not settled (e.g. cancelled before it was sent)"""
+        with self._lock:
+            if self.state == "half_open":
+                # opened_at is already past the timeout, so the next caller gets the trial
+                self.state = "open"
+
+    def record_success(self):
+        """Close the circuit after a successful request"""
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        """Count a transient failure, opening the circuit at the threshold or after a failed trial"""
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class RequestScheduler:
+    """
+    Shared gate for every completion request (GUI, batch and the async engine).
+    Requests wait for room in the requests/min and tokens/min buckets, transient failures (429,
+    5xx, timeouts, connection errors) are retried with jittered exponential backoff that honors
+    Retry-After, and a circuit breaker stops hammering an API that keeps failing. A rate-limit
+    response pauses every caller for its Retry-After, not just the one that received it.
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0, max_retries=5, base_delay=1.0,
+                 max_delay=60.0, failure_threshold=5, reset_timeout=30.0):
+        """Initialize the scheduler; a limit of 0 disables that bucket"""
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.circuit_breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings_manager):
+        """Create a scheduler configured from the rate_limits settings"""
+        get = settings_manager.get_setting
+        return cls(
+            requests_per_minute=get("rate_limits.requests_per_minute", 0),
+            tokens_per_minute=get("rate_limits.tokens_per_minute", 0),
+            max_retries=get("rate_limits.max_retries", 5),
+            base_delay=get("rate_limits.base_delay", 1.0),
+            max_delay=get("rate_limits.max_delay", 60.0),
+            failure_threshold=get("rate_limits.failure_threshold", 5),
+            reset_timeout=get("rate_limits.reset_timeout", 30.0)
+        )
+
+    def _admission_delay(self, estimated_tokens):
+        """Reserve capacity for one request and return how long to wait before sending it"""
+        with self._lock:
+            paused = max(0.0, self._paused_until - time.monotonic())
+        return max(paused, self.request_bucket.reserve(1), self.token_bucket.reserve(estimated_tokens))
+
+    def is_retryable(self, error):
+        """Check if an API error is transient and worth retrying"""
+        # Imported here so the openai package is only loaded once a request has actually failed
+        from openai import APIConnectionError, APIStatusError
+
+        if isinstance(error, APIConnectionError): # Includes timeouts
+            return True
+        if isinstance(error, APIStatusError):
+            if getattr(error, "code", None) == "insufficient_quota":
+                return False # A 429 that waiting will not fix
+            return error.status_code in (408, 409, 429) or error.status_code >= 500
+        return False
+
+    def retry_after(self, error):
+        """Get the server's Retry-After delay in seconds from an API error, or None"""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return None
+
+        value = headers.get("retry-after-ms")
+        if value:
+            try:
+                return float(value) / 1000
+            except ValueError:
+                pass
+
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def backoff_delay(self, attempt, error):
+        """Get the wait before retry number attempt (0-based) after error"""
+        retry_after = self.retry_after(error)
+        if retry_after is not None:
+            if getattr(error, "status_code", None) == 429:
+                # Everyone sharing the limit should hold off, not just this caller
+                with self._lock:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            return retry_after
+        # Full jitter keeps concurrent callers from retrying in lockstep
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _handle_failure(self, error, attempt):
+        """Record a failed attempt and return the retry delay, re-raising if it should not be retried"""
+        if not self.is_retryable(error):
+            # The API answered (e.g. a 400), which says nothing about its health: the failure count
+            # is left alone, and a trial request is handed back by the caller's release_trial()
+            raise error
+        self.circuit_breaker.record_failure()
+        if attempt >= self.max_retries:
+            raise error
+        return self.backoff_delay(attempt, error)
+
+    def call(self, func, estimated_tokens=0, cancel_event=None, on_retry=None):
+        """
+        Run func() under the rate limits, retrying transient failures.
+        cancel_event interrupts any wait; on_retry(attempt, delay, error) is called before each retry.
+        """
+        attempt = 0
+        while True:
+            trial = self.circuit_breaker.before_call()
+            try:
+                admission_delay = self._admission_delay(estimated_tokens)
+                API_WAIT_SECONDS.observe(admission_delay, reason="admission")
+                self._wait(admission_delay, cancel_event)
+                try:
+                    result = func()
+                except Exception as e:
+                    error = e
+                    delay = self._handle_failure(error, attempt)
+                else:
+                    self.circuit_breaker.record_success()
+                    return result
+            finally:
+                if trial:
+                    self.circuit_breaker.release_trial() # No-op once the attempt settled the breaker
+            attempt += 1
+            RETRIES_TOTAL.inc(error=type(error).__name__)
+            API_WAIT_SECONDS.observe(delay, reason="backoff")
+            if on_retry is not None:
+                on_retry(attempt, delay, error)
+            self._wait(delay, cancel_event)
+
+    async def acall(self, coro_factory, estimated_tokens=0, on_retry=None):
+        """Async counterpart of call(); coro_factory() must return a new awaitable for each attempt"""
+        attempt = 0
+        while True:
+            trial = self.circuit_breaker.before_call()
+            try:
+                admission_delay = self._admission_delay(estimated_tokens)
+                API_WAIT_SECONDS.observe(admission_delay, reason="admission")
+                await asyncio.sleep(admission_delay)
+                try:
+                    result = await coro_factory()
+                except Exception as e:
+                    error = e
+                    delay = self._handle_failure(error, attempt)
+                else:
+                    self.circuit_breaker.record_success()
+                    return result
+            finally:
+                if trial:
+                    self.circuit_breaker.release_trial() # No-op once the attempt settled the breaker
+            attempt += 1
+            RETRIES_TOTAL.inc(error=type(error).__name__)
+            API_WAIT_SECONDS.observe(delay, reason="backoff")
+            if on_retry is not None:
+                on_retry(attempt, delay, error)
+            await asyncio.sleep(delay)
+
+    def _wait(self, delay, cancel_event):
+        """Sleep for delay seconds, waking early to raise GenerationCancelled if cancelled"""
+        if delay <= 0:
+            return
+        if cancel_event is None:
+            time.sleep(delay)
+        elif cancel_event.wait(delay):
+            raise GenerationCancelled("Recipe generation was cancelled.")
+
+
+class TimedRequest:
+    """
+    Wraps the request function handed to the scheduler and notes when it was last sent, so
+    latencies are measured from the final attempt rather than including the scheduler's waits
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.sent_at = None
+
+    def __call__(self):
+        self.sent_at = time.perf_counter()
+        return self.func()
+
+    def elapsed(self):
+        """Seconds since the request was sent"""
+        return time.perf_counter() - self.sent_at
+
+
+class _Flight:
+    """One in-flight call of a SingleFlight"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Request coalescing for threads: while a call for a key is running, other callers with the
+    same key wait for it and share its result instead of making the same call again.
+    If the leading caller is cancelled, a waiting caller takes over and makes the call itself.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, func, cancel_event=None, on_wait=None):
+        """
+        Run func() unless a call for key is already in flight, in which case wait for that one.
+        Returns (result, shared), where shared tells whether the result came from another caller.
+        on_wait is called before waiting; cancel_event stops a waiting caller with GenerationCancelled.
+        """
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+
+            if leader:
+                try:
+                    flight.result = func()
+                    return flight.result, False
+                except BaseException as e:
+                    flight.error = e
+                    raise
+                finally:
+                    with self._lock:
+                        del self._flights[key]
+                    flight.done.set()
+
+            if on_wait is not None:
+                on_wait()
+            while not flight.done.wait(0.1):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise GenerationCancelled("Recipe generation was cancelled.")
+            if flight.error is None:
+                return flight.result, True
+            if not isinstance(flight.error, GenerationCancelled):
+                raise flight.error
+            # The leader gave up; go round again (and probably lead this time)
+
+
+class AsyncSingleFlight:
+    """Request coalescing for coroutines on one event loop (async counterpart of SingleFlight)"""
+
+    def __init__(self):
+        self._flights = {}
+
+    async def do(self, key, coro_factory):
+        """Await coro_factory() unless a call for key is already in flight; returns (result, shared)"""
+        while True:
+            future = self._flights.get(key)
+            if future is None:
+                future = self._flights[key] = asyncio.get_event_loop().create_future()
+                try:
+                    result = await coro_factory()
+                except asyncio.CancelledError:
+                    future.cancel() # Waiting callers retry
+                    raise
+                except BaseException as e:
+                    future.set_exception(e)
+                    future.exception() # Mark as retrieved; the leader reports it
+                    raise
+                else:
+                    future.set_result(result)
+                    return result, False
+                finally:
+                    del self._flights[key]
+
+            try:
+                # Shielded, so cancelling one waiting caller doesn't cancel the shared call
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise # This caller was cancelled
+                # The leader was cancelled; go round again
+
 
 class RecipeGenerator:
     """
@@ -11,84 +427,462 @@ class RecipeGenerator:
     Constructs prompts, processes API responses, and formats recipes.
     """
 
-    def __init__(self, settings_manager):
-        """Initialize the recipe generator with settings manager"""
+    def __init__(self, settings_manager, backend=None, connect=True):
+        """
+        Initialize the recipe generator with settings manager (and optionally a model backend).
+        With connect=False the API client (keyring lookup and client creation) is set up on first use,
+        or in the background by start_warmup().
+        """
         self.settings_manager = settings_manager
-        self.setup_api()
+        self.backend = backend or create_backend(settings_manager)
+        self.response_cache = ResponseCache.from_settings(settings_manager)
+        self.scheduler = RequestScheduler.from_settings(settings_manager)
+        self.token_budget = TokenBudget.from_settings(settings_manager)
+        self.single_flight = SingleFlight()
+        self.client = None
+        self._warmup_thread = None
+        self._client_ready = threading.Event() # Set once a warm-up has finished setting up the client
+        if connect:
+            self.setup_api()
 
     def setup_api(self):
-        """Set up the OpenAI API client with the stored API key"""
-        api_key = self.settings_manager.get_api_key()
-        if api_key:
-            self.client = OpenAI(api_key=api_key)
-        else:
-            self.client = None
+        """Set up the API client for the selected backend with the stored API key"""
+        self.client = self.backend.create_client(self.settings_manager.get_api_key())
 
-    def generate_recipe(self, params):
-        """Generate a recipe based on the provided parameters"""
+    def start_warmup(self):
+        """
+        Set up the API client on a background thread and open its connection ahead of the first request.
+        The keyring lookup can block for seconds (e.g. waiting for the keyring to be unlocked), and the
+        first request would otherwise also pay for the TLS handshake.
+        """
+        if self._warmup_thread is not None and self._warmup_thread.is_alive():
+            return self._warmup_thread
+        self._client_ready.clear()
+        self._warmup_thread = threading.Thread(target=self._warm_up, name="RecipeGeneratorWarmup", daemon=True)
+        self._warmup_thread.start()
+        return self._warmup_thread
+
+    def _warm_up(self):
+        """Warm-up thread: create the client, then pre-connect it"""
+        try:
+            self.setup_api()
+        except Exception as e:
+            print(f"Error setting up API client: {e}")
+        finally:
+            self._client_ready.set()
+
+        if self.client is None:
+            return
+        model = self.settings_manager.get_setting("api_settings.model", "gpt-4")
+        try:
+            self.backend.warm_up(self.client, model)
+        except Exception as e:
+            # Not fatal: the first generation opens its own connection (and reports real errors)
+            print(f"Error warming up API connection: {e}")
+
+    def wait_until_ready(self, timeout=None):
+        """Wait for a running warm-up to set up the client; returns whether a client is available"""
+        if self._warmup_thread is not None and self._warmup_thread is not threading.current_thread():
+            self._client_ready.wait(timeout)
+        return self.client is not None
+
+    def generate_recipe(self, params, cancel_event=None, progress_callback=None, delta_callback=None,
+                        bypass_cache=False):
+        """
+        Generate a recipe based on the provided parameters.
+        cancel_event (a threading.Event) is checked between stages so a background job can be abandoned;
+        progress_callback receives short status messages for the UI.
+        When streaming is enabled, delta_callback receives each piece of text as it arrives
+        (JSON-mode requests are not streamed, since partial JSON is not displayable).
+        Identical requests are answered from the response cache unless bypass_cache is set.
+        """
         # Check if API client is set
-        if not hasattr(self, 'client') or self.client is None:
-            raise ValueError("OpenAI API key is not set. Please set it in the settings.")
+        self._ensure_client()
 
         # Construct the prompt
-        prompt = self._construct_prompt(params) # Call _construct_prompt
+        self._report_progress(progress_callback, "Preparing recipe request...")
+        with STAGE_SECONDS.time(stage="prompt"):
+            prompt = self._construct_prompt(params) # Call _construct_prompt
 
-        # Get API settings
         model = self.settings_manager.get_setting("api_settings.model", "gpt-4")
-        temperature = self.settings_manager.get_setting("api_settings.temperature", 0.7)
-        max_tokens = self.settings_manager.get_setting("api_settings.max_tokens", 2000)
 
         try: # Outer try block for the whole generation process
-            # Call the OpenAI API using the new client interface
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": self._get_system_prompt()},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=temperature,
-                max_completion_tokens=max_tokens # Use max_completion_tokens instead of max_tokens
-            )
-
-            recipe_text = None # Initialize recipe_text
-            try: # Inner try block specifically for response processing
-                # Process the response with validation
-                if not response or not response.choices:
-                    raise Exception("Invalid response received from API: No choices found.")
-
-                first_choice = response.choices[0]
-                if not first_choice:
-                    raise Exception("Invalid response received from API: No first choice found.")
-
-                # Safely access message and content using getattr
-                message_obj = getattr(first_choice, 'message', None)
-                if not message_obj:
-                    raise Exception("Invalid response received from API: No message object found.")
-
-                recipe_text = getattr(message_obj, 'content', None)
-
-                if not recipe_text:
-                     raise Exception("Invalid response received from API: Message content is empty.")
+            self._check_cancelled(cancel_event)
+
+            cache_key = self._cache_key(prompt)
+            recipe_text = None
+            if self._cache_enabled() and not bypass_cache:
+                recipe_text = self.response_cache.get(cache_key)
+
+            outcome = "cache_hit" if recipe_text else "success"
+            if recipe_text:
+                self._report_progress(progress_callback, "Loaded recipe from cache.")
+                if delta_callback is not None and not self._json_mode():
+                    delta_callback(recipe_text)
+            else:
+                def fetch():
+                    return self._fetch_recipe_text(prompt, cache_key, model, cancel_event,
+                                                   progress_callback, delta_callback)
+
+                if self._coalescing_enabled(bypass_cache):
+                    # An identical request already in flight is awaited instead of being sent again.
+                    # Flights are keyed on the cache key, so only requests to the same endpoint are shared
+                    recipe_text, shared = self.single_flight.do(
+                        cache_key, fetch, cancel_event=cancel_event,
+                        on_wait=lambda: self._report_progress(
+                            progress_callback, "Waiting for an identical request already in progress...")
+                    )
+                    if shared:
+                        outcome = "coalesced"
+                        if delta_callback is not None and not self._json_mode():
+                            delta_callback(recipe_text)
+                else:
+                    recipe_text = fetch()
 
-            except Exception as resp_err:
-                 # Print details if response processing fails (optional)
-                 # print(f"ERROR processing API response: {resp_err}")
-                 # print(f"Response object type: {type(response)}")
-                 raise Exception(f"Failed to process API response: {resp_err}") from resp_err
+            # The tokens are already paid for, but a cancelled job should not show up in history
+            self._check_cancelled(cancel_event)
 
             # Continue if response processing succeeded and recipe_text is valid
-            recipe = self._process_recipe(recipe_text, params)
+            self._report_progress(progress_callback, "Formatting recipe...")
+            with STAGE_SECONDS.time(stage="process"):
+                recipe = self._process_recipe(recipe_text, params)
 
             # Save to history if enabled
-            self.settings_manager.save_recipe_to_history(recipe)
+            with STAGE_SECONDS.time(stage="history_save"):
+                self.settings_manager.save_recipe_to_history(recipe)
 
+            REQUESTS_TOTAL.inc(model=model, outcome=outcome)
             return recipe
 
+        except GenerationCancelled:
+            REQUESTS_TOTAL.inc(model=model, outcome="cancelled")
+            raise
         except Exception as e: # Catch errors from API call or response processing re-raise
+            REQUESTS_TOTAL.inc(model=model, outcome="error")
             raise Exception(f"Error generating recipe: {str(e)}") from e
 
+    def _fetch_recipe_text(self, prompt, cache_key, model, cancel_event=None, progress_callback=None,
+                           delta_callback=None):
+        """Get the recipe text from the API (streamed if enabled) and cache it"""
+        # Call the OpenAI API using the new client interface
+        self._report_progress(progress_callback, f"Waiting for {model} to compose the recipe...")
+
+        def on_retry(attempt, delay, error):
+            self._report_progress(progress_callback, f"API busy, retrying in {delay:.1f}s (attempt {attempt + 1})...")
+
+        if self._use_streaming():
+            pieces = []
+            for delta in self._stream_completion(prompt, cancel_event, on_retry):
+                pieces.append(delta)
+                if delta_callback is not None:
+                    delta_callback(delta)
+            recipe_text = "".join(pieces)
+            if not recipe_text:
+                raise Exception("Failed to process API response: Streamed message content is empty.")
+        else:
+            recipe_text = self._request_completion(prompt, cancel_event, on_retry)
+
+        # Cache even if the caller cancels later; the response is complete and already paid for
+        if self._cache_enabled():
+            self.response_cache.put(cache_key, recipe_text, model=model)
+        return recipe_text
+
+    def stream_recipe(self, params, cancel_event=None, bypass_cache=False):
+        """
+        Generate a recipe with stream=True and yield the text deltas as they arrive.
+        The caller receives raw text only; nothing is processed or saved to history.
+        A cache hit is yielded as a single delta.
+        """
+        self._ensure_client()
+        prompt = self._construct_prompt(params)
+
+        cache_key = self._cache_key(prompt)
+        if self._cache_enabled() and not bypass_cache:
+            cached_text = self.response_cache.get(cache_key)
+            if cached_text:
+                yield cached_text
+                return
+
+        pieces = []
+        for delta in self._stream_completion(prompt, cancel_event):
+            pieces.append(delta)
+            yield delta
+
+        # Only a stream that ran to completion is worth caching
+        if pieces and self._cache_enabled():
+            self.response_cache.put(cache_key, "".join(pieces),
+                                    model=self.settings_manager.get_setting("api_settings.model", "gpt-4"))
+
+    def _json_mode(self):
+        """Check if recipes are requested as structured JSON rather than free text"""
+        return self.settings_manager.get_setting("api_settings.output_mode", "text") == "json"
+
+    def _use_streaming(self):
+        """Check if completions should be streamed (never in JSON mode)"""
+        return self.settings_manager.get_setting("api_settings.stream", True) and not self._json_mode()
+
+    def _cache_enabled(self):
+        """Check if the response cache is switched on in the settings"""
+        return self.settings_manager.get_setting("cache_settings.enabled", True)
+
+    def _coalescing_enabled(self, bypass_cache=False):
+        """
+        Check if identical concurrent requests should share one API call.
+        Not when the caller asked for a fresh response, and optionally not for sampled (temperature > 0) requests.
+        """
+        if bypass_cache or not self.settings_manager.get_setting("api_settings.coalesce_requests", True):
+            return False
+        if self.settings_manager.get_setting("api_settings.temperature", 0.7) > 0:
+            return self.settings_manager.get_setting("api_settings.coalesce_nonzero_temperature", True)
+        return True
+
+    def generation_settings(self):
+        """The settings besides the prompt that decide what a generation produces"""
+        return {
+            "endpoint": self.backend.endpoint,
+            "model": self.settings_manager.get_setting("api_settings.model", "gpt-4"),
+            "temperature": self.settings_manager.get_setting("api_settings.temperature", 0.7),
+            "max_tokens": self.settings_manager.get_setting("api_settings.max_tokens", 2000),
+            "output_mode": self.settings_manager.get_setting("api_settings.output_mode", "text")
+        }
+
+    def _cache_key(self, prompt):
+        """Build the response cache key for a prompt under the current API settings"""
+        kwargs = self._completion_kwargs(prompt)
+        return ResponseCache.make_key(
+            self.backend.endpoint,
+            kwargs["messages"][0]["content"],
+            kwargs["messages"][1]["content"],
+            kwargs["model"],
+            kwargs["temperature"],
+            kwargs["max_completion_tokens"]
+        )
+
+    def generate_many(self, params_list, max_concurrency=4, bypass_cache=False):
+        """
+        Generate recipes for many parameter sets concurrently.
+        Yields a result dict per parameter set as soon as it completes (not in input order):
+        {"index", "params", "recipe"} on success or {"index", "params", "error"} on failure.
+        params_list may be any iterable; at most max_concurrency requests are in flight at a time.
+        """
+        max_concurrency = max(1, int(max_concurrency))
+        params_iter = enumerate(params_list)
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            pending = {}
+
+            def submit_next():
+                # Pull from the iterable lazily so huge inputs are never materialized at once
+                for index, params in params_iter:
+                    future = executor.submit(self.generate_recipe, params, bypass_cache=bypass_cache)
+                    pending[future] = (index, params)
+                    return True
+                return False
+
+            for _ in range(max_concurrency):
+                if not submit_next():
+                    break
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, params = pending.pop(future)
+                    try:
+                        yield {"index": index, "params": params, "recipe": future.result()}
+                    except Exception as e:
+                        yield {"index": index, "params": params, "error": str(e)}
+                    submit_next()
+
+    def _ensure_client(self):
+        """Set up the API client if needed, raising if it still is not available"""
+        # Don't race a warm-up that is still reading the keyring
+        if self.client is None and not self.wait_until_ready():
+            self.setup_api()
+        if self.client is None:
+            raise ValueError("OpenAI API key is not set. Please set it in the settings.")
+
+    def _completion_kwargs(self, prompt):
+        """Build the chat completion arguments from the prompt and API settings"""
+        # Get API settings
+        model = self.settings_manager.get_setting("api_settings.model", "gpt-4")
+        temperature = self.settings_manager.get_setting("api_settings.temperature", 0.7)
+        max_tokens = self.settings_manager.get_setting("api_settings.max_tokens", 2000)
+
+        kwargs = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": self._get_system_prompt()},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": temperature,
+            "max_completion_tokens": max_tokens # Use max_completion_tokens instead of max_tokens
+        }
+
+        # In JSON mode the API returns the recipe as typed fields matching the schema
+        if self._json_mode():
+            kwargs["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "michelin_recipe", "strict": True, "schema": RECIPE_JSON_SCHEMA}
+            }
+        return kwargs
+
+    def estimate_request(self, params):
+        """
+        Estimate the tokens a generation would use before sending it.
+        Returns {"model", "prompt_tokens", "max_completion_tokens", "total_tokens", "exact"}.
+        """
+        kwargs = self._completion_kwargs(self._construct_prompt(params))
+        return self.token_budget.estimate(kwargs["messages"], kwargs["model"], kwargs["max_completion_tokens"])
+
+    def _reserve_tokens(self, kwargs):
+        """Estimate a request and reserve it against the token budgets (raises TokenBudgetExceeded)"""
+        return self.token_budget.reserve(kwargs["messages"], kwargs["model"], kwargs["max_completion_tokens"])
+
+    def _request_completion(self, prompt, cancel_event=None, on_retry=None):
+        """Make a single (non-streaming) completion request through the scheduler and return the validated recipe text"""
+        kwargs = self._completion_kwargs(prompt)
+        estimate = self._reserve_tokens(kwargs)
+        request = TimedRequest(lambda: self.client.chat.completions.create(**kwargs))
+        try:
+            response = self.scheduler.call(
+                request, estimated_tokens=estimate["total_tokens"], cancel_event=cancel_event, on_retry=on_retry
+            )
+        except BaseException:
+            self.token_budget.release(estimate)
+            raise
+
+        # Servers that omit usage are charged the estimated prompt plus the counted reply
+        seconds = request.elapsed()
+        usage = getattr(response, 'usage', None)
+        try:
+            with STAGE_SECONDS.time(stage="validation"):
+                recipe_text = self._extract_recipe_text(response)
+        except Exception:
+            self._record_usage(estimate, usage, "", seconds)
+            raise
+        self._record_usage(estimate, usage, recipe_text, seconds)
+        return recipe_text
+
+    def _record_usage(self, estimate, usage, completion_text, seconds, ttft=None):
+        """Charge a finished request to the token budget and record its latency and throughput"""
+        prompt_tokens, completion_tokens = self.token_budget.record_usage(estimate, usage, completion_text)
+        model = estimate["model"]
+        TOKENS_TOTAL.inc(prompt_tokens, model=model, kind="prompt")
+        TOKENS_TOTAL.inc(completion_tokens, model=model, kind="completion")
+        API_SECONDS.observe(seconds, model=model)
+        if ttft is not None:
+            API_TTFT_SECONDS.observe(ttft, model=model)
+        # Generation speed excludes the wait for the first token where it is known
+        generating = seconds - (ttft or 0)
+        if completion_tokens and generating > 0:
+            OUTPUT_TOKENS_PER_SECOND.observe(completion_tokens / generating, model=model)
+
+    def _extract_recipe_text(self, response):
+        """Validate a completion response and return its message content"""
+        recipe_text = None # Initialize recipe_text
+        try: # Inner try block specifically for response processing
+            # Process the response with validation
+            if not response or not response.choices:
+                raise Exception("Invalid response received from API: No choices found.")
+
+            first_choice = response.choices[0]
+            if not first_choice:
+                raise Exception("Invalid response received from API: No first choice found.")
+
+            # Safely access message and content using getattr
+            message_obj = getattr(first_choice, 'message', None)
+            if not message_obj:
+                raise Exception("Invalid response received from API: No message object found.")
+
+            recipe_text = getattr(message_obj, 'content', None)
+
+            if not recipe_text:
+                 raise Exception("Invalid response received from API: Message content is empty.")
+
+            # Reject malformed JSON here so it never reaches the response cache
+            if self._json_mode():
+                try:
+                    json.loads(recipe_text)
+                except ValueError:
+                    raise Exception("Invalid response received from API: Message content is not valid JSON.")
+
+        except Exception as resp_err:
+             raise Exception(f"Failed to process API response: {resp_err}") from resp_err
+
+        return recipe_text
+
+    def _extract_delta(self, chunk):
+        """Get the content delta from a streamed chunk, or None if it carries no text"""
+        # Some chunks (e.g. the final one) carry no choices or no content
+        choices = getattr(chunk, 'choices', None)
+        if not choices:
+            return None
+        delta = getattr(choices[0], 'delta', None)
+        return getattr(delta, 'content', None) if delta else None
+
+    def _stream_completion(self, prompt, cancel_event=None, on_retry=None):
+        """
+        Make a streaming completion request and yield each non-empty content delta.
+        Opening the stream goes through the scheduler; once text has arrived a failure is not
+        retried, since the caller has already been given part of the recipe.
+        """
+        kwargs = self._completion_kwargs(prompt)
+        estimate = self._reserve_tokens(kwargs)
+        request = TimedRequest(lambda: self.client.chat.completions.create(
+            stream=True, stream_options={"include_usage": True}, **kwargs
+        ))
+        try:
+            stream = self.scheduler.call(
+                request, estimated_tokens=estimate["total_tokens"], cancel_event=cancel_event, on_retry=on_retry
+            )
+        except BaseException:
+            self.token_budget.release(estimate)
+            raise
+
+        usage = None
+        pieces = []
+        ttft = None
+        try:
+            for chunk in stream:
+                self._check_cancelled(cancel_event)
+                # The final chunk carries the usage for the whole request
+                usage = getattr(chunk, 'usage', None) or usage
+                content = self._extract_delta(chunk)
+                if content:
+                    if ttft is None:
+                        ttft = request.elapsed()
+                    pieces.append(content)
+                    yield content
+        finally:
+            # Closing the stream drops the connection, so a cancelled request stops producing tokens
+            close = getattr(stream, 'close', None)
+            if close is not None:
+                close()
+            self._record_usage(estimate, usage, "".join(pieces), request.elapsed(), ttft)
+
+    def _check_cancelled(self, cancel_event):
+        """Raise GenerationCancelled if the caller has asked to stop"""
+        if cancel_event is not None and cancel_event.is_set():
+            raise GenerationCancelled("Recipe generation was cancelled.")
+
+    def _report_progress(self, progress_callback, message):
+        """Send a status message to the caller if it asked for progress updates"""
+        if progress_callback is not None:
+            progress_callback(message)
+
     def _get_system_prompt(self):
         """Get the system prompt for the OpenAI API"""
+        if self._json_mode():
+            return self._base_system_prompt() + """
+        Respond only with a JSON object matching the provided schema. Put each ingredient, step,
+        plating instruction, note, pairing and substitution in its own field, use "group" for
+        component sub-headings, and give the complexity score (1-10) in "complexity_score"
+        instead of a text line.
+        """
+        return self._base_system_prompt()
+
+    def _base_system_prompt(self):
+        """Get the system prompt shared by the text and JSON output modes"""
         return """
         You are a world-class culinary AI specializing in Michelin-star level recipes.
         Your expertise spans various chef styles, techniques, and cuisines.
@@ -110,309 +904,38 @@ class RecipeGenerator:
         """
 
     def _construct_prompt(self, params):
-        """Construct a detailed prompt based on the parameters"""
-        # Start with basic prompt
-        prompt = "Create a Michelin-star level recipe with the following specifications:\n\n"
-
-        # Add chef influences
-        if params["chefs"]:
-            prompt += "CHEF INFLUENCES:\n"
-            # Import locally to avoid potential circular dependency if CHEF_PROFILES needs RecipeGenerator
-            from .chef_profiles import CHEF_PROFILES, CHEF_INFLUENCE_DESCRIPTIONS
-            for chef_id, influence in params["chefs"].items():
-                chef = CHEF_PROFILES.get(chef_id, {})
-
-                # Determine influence level
-                influence_level = "low"
-                if influence >= 70:
-                    influence_level = "high"
-                elif influence >= 30:
-                    influence_level = "medium"
-
-                influence_desc = CHEF_INFLUENCE_DESCRIPTIONS.get(chef_id, {}).get(influence_level, "")
-
-                prompt += f"- {chef.get('name', 'Unknown Chef')} ({influence}% influence): {influence_desc}\n"
-                prompt += f"  Known for: {chef.get('signature', '')}\n"
-        else:
-            prompt += "CHEF INFLUENCES: No specific chef selected. Create a general Michelin-star level recipe.\n"
-
-        # Add Michelin star rating
-        prompt += f"\nMICHELIN STAR LEVEL: {params['michelin_stars']} star"
-        if params['michelin_stars'] == 1:
-            prompt += " - Excellent cooking, worth a stop"
-        elif params['michelin_stars'] == 2:
-            prompt += " - Excellent cooking, worth a detour"
-        elif params['michelin_stars'] == 3:
-            prompt += " - Exceptional cuisine, worth a special journey"
-        prompt += "\n"
-
-        # Add ingredient type
-        prompt += f"\nINGREDIENT TYPE: "
-        if params['ingredient_type'] == 'everyday':
-            prompt += "Everyday ingredients that are commonly available in well-stocked supermarkets"
-        else:
-            prompt += "Luxurious, hard-to-find ingredients that might require specialty stores or online ordering"
-
-        if params['seasonal']:
-            prompt += "\nPrioritize seasonal ingredients appropriate for the current time of year"
-        prompt += "\n"
-
-        # Add gastronomy level
-        prompt += f"\nGASTRONOMY LEVEL: {params['gastronomy_level']}% modern techniques"
-        if params['gastronomy_level'] < 30:
-            prompt += " (mostly traditional cooking methods)"
-        elif params['gastronomy_level'] > 70:
-            prompt += " (significant use of molecular gastronomy and modern techniques)"
-        else:
-            prompt += " (balanced mix of traditional and modern techniques)"
-
-        if params['specialized_equipment']:
-            prompt += "\nSpecialized equipment is available (sous vide, anti-griddle, etc.)"
-        prompt += "\n"
-
-        # Add dietary restrictions
-        if params['dietary_restrictions']:
-            prompt += "\nDIETARY RESTRICTIONS: " + ", ".join(params['dietary_restrictions']) + "\n"
-
-        # Add occasion
-        prompt += f"\nOCCASION: {params['occasion']}\n"
-
-        # Add servings
-        prompt += f"\nSERVINGS: {params['servings']}\n"
-
-        # Add time constraints
-        prompt += f"\nTIME CONSTRAINTS:"
-        prompt += f"\n- Preparation time: approximately {params['prep_time']} minutes"
-        prompt += f"\n- Cooking time: approximately {params['cook_time']} minutes\n"
-
-        # Add available equipment
-        if params['equipment']:
-            prompt += "\nAVAILABLE EQUIPMENT: " + ", ".join(params['equipment']) + "\n"
-
-        # Final instructions
-        prompt += """
-        \nPlease create a comprehensive recipe that includes:
-        1. A creative and descriptive title
-        2. A brief introduction explaining the dish and its inspiration
-        3. Comprehensive ingredients list with precise measurements
-        4. Detailed preparation instructions broken down by components
-        5. Step-by-step cooking instructions with timing and technique details
-        6. Plating instructions with artistic presentation guidance
-        7. Chef's notes with technique tips and insights
-        8. Suggested wine or beverage pairings
-        9. Possible ingredient substitutions
-
-        The recipe should reflect the chef influences, Michelin star level, and all other parameters specified above.
- 
-        Finally, at the very end of your response, include a line formatted exactly like this:
-        **Complexity Score: [score]/10**
-        Where [score] is an integer from 1 to 10 representing the overall complexity based on ingredients and techniques.
-        """
-        return prompt
+        """Construct a detailed prompt based on the parameters (memoized; see prompt_templates)"""
+        return build_prompt(params)
 
     def _process_recipe(self, recipe_text, params):
-        import re # Import regex module
-        """Process the raw recipe text into a structured format"""
+        """Process the raw recipe text (or JSON-mode response) into a structured format"""
+        if self._json_mode():
+            # The fields are already typed; the text form is derived for history search and export
+            try:
+                parsed = ParsedRecipe.from_dict(json.loads(recipe_text))
+            except (ValueError, TypeError, AttributeError) as e: # AttributeError: not a JSON object
+                raise Exception(f"Failed to process API response: Invalid recipe JSON: {e}") from e
+            output_format = "json"
+            recipe_text = recipe_to_text(parsed)
+        else:
+            # One pass over the text gives the title, score and the structured recipe model
+            parsed = parse_recipe(recipe_text)
+            output_format = "text"
+
         # Create recipe object
         recipe = {
+            "title": parsed.title or "Untitled Recipe",
             "raw_text": recipe_text,
-            "html_content": self._format_recipe_as_html(recipe_text),
+            "format": output_format,
+            "structured": parsed.to_dict(),
             "parameters": params,
             "timestamp": datetime.now().isoformat(),
-            "id": f"recipe_{int(time.time())}",
-            "complexity_score": "N/A" # Add default score
+            "id": f"recipe_{int(time.time())}_{uuid.uuid4().hex[:8]}", # Suffix keeps ids unique under concurrent generation
+            "complexity_score": f"{parsed.complexity_score}/10" if parsed.complexity_score else "N/A"
         }
 
-        # Try to extract title
-        lines = recipe_text.split('\n')
-        if lines and lines[0].strip():
-            recipe["title"] = lines[0].strip()
-        else:
-            recipe["title"] = "Michelin Star Recipe"
-
-        # Try to extract complexity score
-        score_match = re.search(r"\*\*Complexity Score:\s*(\d{1,2})/10\*\*", recipe_text)
-        if score_match:
-            try:
-                score = int(score_match.group(1))
-                if 1 <= score <= 10:
-                    recipe["complexity_score"] = f"{score}/10"
-                    # Optional: Remove the score line from the raw text if desired
-                    # recipe_text = re.sub(r"\*\*Complexity Score:\s*\d{1,2}/10\*\*\n?", "", recipe_text).strip()
-                    # recipe["raw_text"] = recipe_text # Update raw text if removing score line
-                    # recipe["html_content"] = self._format_recipe_as_html(recipe_text) # Re-format HTML if removing score line
-            except ValueError:
-                pass # Ignore if score is not a valid integer
-
         return recipe
 
     def _format_recipe_as_html(self, recipe_text):
-        """Format the recipe text as HTML for display"""
-        # Basic HTML structure
-        html = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {
-                    font-family: 'Helvetica Neue', Arial, sans-serif;
-                    line-height: 1.6;
-                    color: #F0F0F0; /* Light base text color */
-                    max-width: 800px;
-                    margin: 0 auto;
-                    padding: 20px;
-                }
-                h1 {
-                    color: #FFFFFF; /* White for main title */
-                    font-size: 28px;
-                    margin-bottom: 10px;
-                    border-bottom: 2px solid #ddd;
-                    padding-bottom: 10px;
-                }
-                h2 {
-                    color: #E0E0E0; /* Lighter gray for h2 */
-                    font-size: 22px;
-                    margin-top: 25px;
-                    margin-bottom: 10px;
-                }
-                h3 {
-                    color: #D0D0D0; /* Lighter gray for h3 */
-                    font-size: 18px;
-                    margin-top: 20px;
-                    margin-bottom: 8px;
-                }
-                p {
-                    margin-bottom: 15px;
-                }
-                ul, ol {
-                    margin-bottom: 20px;
-                    padding-left: 25px;
-                }
-                li {
-                    margin-bottom: 8px;
-                }
-                .section {
-                    margin-bottom: 30px;
-                }
-                .chef-notes {
-                    background-color: #f9f9f9;
-                    border-left: 4px solid #ddd;
-                    padding: 15px;
-                    margin: 20px 0;
-                }
-                .substitutions {
-                    background-color: #f5f5f5;
-                    padding: 15px;
-                    margin: 20px 0;
-                    border-radius: 5px;
-                }
-                .wine-pairing {
-                    font-style: italic;
-                    margin: 20px 0;
-                }
-            </style>
-        </head>
-        <body>
-        """
-
-        # Process the recipe text
-        lines = recipe_text.strip().split('\n')
-        in_list = False
-        list_type = None
-
-        for i, line in enumerate(lines):
-            line = line.strip()
-
-            # Skip empty lines
-            if not line:
-                if in_list:
-                    html += "</ul>\n" if list_type == "ul" else "</ol>\n"
-                    in_list = False
-                    list_type = None
-                html += "<p>&nbsp;</p>\n"
-                continue
-
-            # Check if this is a title (first line)
-            if i == 0:
-                html += f"<h1>{escape(line)}</h1>\n"
-                continue
-
-            # Check if this is a section header
-            if line.isupper() or (line.endswith(':') and len(line) < 50):
-                if in_list:
-                    html += "</ul>\n" if list_type == "ul" else "</ol>\n"
-                    in_list = False
-                    list_type = None
-
-                # Clean up the header
-                header = line.rstrip(':').title()
-
-                # Apply specific styling based on section
-                if "INGREDIENTS" in line.upper():
-                    html += f"<h2>{escape(header)}</h2>\n"
-                elif "INSTRUCTIONS" in line.upper() or "DIRECTIONS" in line.upper() or "METHOD" in line.upper():
-                    html += f"<h2>{escape(header)}</h2>\n"
-                elif "NOTES" in line.upper() or "TIPS" in line.upper():
-                    html += f'<div class="chef-notes"><h2>{escape(header)}</h2>\n'
-                elif "SUBSTITUTIONS" in line.upper() or "ALTERNATIVES" in line.upper():
-                    html += f'<div class="substitutions"><h2>{escape(header)}</h2>\n'
-                elif "WINE" in line.upper() or "PAIRING" in line.upper():
-                    html += f'<div class="wine-pairing"><h2>{escape(header)}</h2>\n'
-                elif "PLATING" in line.upper() or "PRESENTATION" in line.upper():
-                    html += f"<h2>{escape(header)}</h2>\n"
-                else:
-                    html += f"<h3>{escape(header)}</h3>\n"
-
-                continue
-
-            # Check if this is a list item
-            if line.startswith('-') or line.startswith('•') or (line.startswith(('1.', '2.', '3.', '4.', '5.', '6.', '7.', '8.', '9.', '10.')) and ' ' in line):
-                # Determine list type
-                new_list_type = "ul" if line.startswith(('-', '•')) else "ol"
-
-                # Start a new list if needed
-                if not in_list or list_type != new_list_type:
-                    if in_list:
-                        html += "</ul>\n" if list_type == "ul" else "</ol>\n"
-                    html += "<ul>\n" if new_list_type == "ul" else "<ol>\n"
-                    in_list = True
-                    list_type = new_list_type
-
-                # Clean up the list item
-                item = line[1:].strip() if line.startswith(('-', '•')) else line[line.find('.')+1:].strip()
-                html += f"<li>{escape(item)}</li>\n"
-            else:
-                # Regular paragraph
-                if in_list:
-                    html += "</ul>\n" if list_type == "ul" else "</ol>\n"
-                    in_list = False
-                    list_type = None
-
-                html += f"<p>{escape(line)}</p>\n"
-
-        # Close any open lists
-        if in_list:
-            html += "</ul>\n" if list_type == "ul" else "</ol>\n"
-
-        # Close any open divs
-        # Note: This logic might be flawed if divs aren't properly nested in the input text
-        open_notes = html.count('<div class="chef-notes">')
-        open_subs = html.count('<div class="substitutions">')
-        open_wine = html.count('<div class="wine-pairing">')
-        closed_divs = html.count('</div>')
-
-        # Heuristic: Close divs based on counts, might need refinement
-        if open_notes > closed_divs: html += "</div>\n" * (open_notes - closed_divs)
-        closed_divs = html.count('</div>') # Recount
-        if open_subs > closed_divs: html += "</div>\n" * (open_subs - closed_divs)
-        closed_divs = html.count('</div>') # Recount
-        if open_wine > closed_divs: html += "</div>\n" * (open_wine - closed_divs)
-
-
-        # Close HTML
-        html += """
-        </body>
-        </html>
-        """
-
-        return html
\ No newline at end of file
+        """Format the recipe text as a standalone HTML document"""
+        return default_renderer.render_document(recipe_text)
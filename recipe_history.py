@@ -0,0 +1,142 @@
+# michelin_recipe_generator/recipe_history.py
+import json
+import os
+import threading
+
+
+class RecipeHistoryStore:
+    """
+    Append-only recipe history kept as JSON Lines.
+    Saving a recipe appends one line, so it costs the same regardless of history size, and a
+    process killed mid-write can only damage the last line (which is skipped when reading).
+    Trimming to the configured size happens by periodic compaction: once the file holds twice
+    as many entries as are kept, the newest entries are rewritten to a temp file and swapped in.
+    """
+
+    def __init__(self, history_file, legacy_file=None):
+        """Initialize the store; a legacy recipe_history.json is migrated on first use"""
+        self.history_file = history_file
+        self.legacy_file = legacy_file
+        self._lock = threading.Lock()
+        self._line_count = None # Counted lazily on the first append
+
+    def _migrate_legacy(self):
+        """Convert the old single-document JSON history into JSON Lines"""
+        if not self.legacy_file or not self.legacy_file.exists() or self.history_file.exists():
+            return
+
+        try:
+            with open(self.legacy_file, 'r') as f:
+                entries = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            entries = []
+
+        if self._write_entries(entries):
+            try:
+                os.remove(self.legacy_file)
+            except OSError as e:
+                print(f"Error removing legacy recipe history: {e}")
+
+    def _prepare_for_append(self):
+        """Count existing lines and make sure the next append starts on a fresh line"""
+        self._migrate_legacy()
+        self._line_count = 0
+        if not self.history_file.exists():
+            return
+
+        with open(self.history_file, 'rb') as f:
+            data = f.read()
+        self._line_count = data.count(b'\n')
+
+        # A crash mid-write can leave a partial last line; terminate it so it stays isolated
+        if data and not data.endswith(b'\n'):
+            with open(self.history_file, 'ab') as f:
+                f.write(b'\n')
+            self._line_count += 1
+
+    def append(self, entry, max_size):
+        """
+        Append one history entry, compacting the file if it has grown past twice max_size.
+        A max_size of 0 (or less) keeps no history, matching read().
+        """
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+
+        with self._lock:
+            if self._line_count is None:
+                self._prepare_for_append()
+
+            if max_size <= 0:
+                # Nothing is kept; drop what an earlier, larger size left behind (once)
+                if self._line_count:
+                    self._write_entries([])
+                return
+
+            try:
+                with open(self.history_file, 'a', encoding='utf-8') as f:
+                    f.write(line)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._line_count += 1
+            except IOError as e:
+                print(f"Error saving recipe history: {e}")
+                return
+
+            if self._line_count > max(2 * max_size, max_size + 1):
+                self._write_entries(self._read_entries()[-max_size:])
+
+    def read(self, max_size=None):
+        """Get the history entries, oldest first, limited to the newest max_size"""
+        with self._lock:
+            self._migrate_legacy()
+            entries = self._read_entries()
+        if max_size is not None:
+            entries = entries[-max_size:] if max_size > 0 else []
+        return entries
+
+    def _read_entries(self):
+        """Parse every complete line of the history file"""
+        if not self.history_file.exists():
+            return []
+
+        entries = []
+        try:
+            with open(self.history_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue # Partial line from an interrupted write
+        except IOError as e:
+            print(f"Error reading recipe history: {e}")
+        return entries
+
+    def _write_entries(self, entries):
+        """Atomically replace the history file with the given entries"""
+        temp_file = self.history_file.with_name(self.history_file.name + ".tmp")
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self.history_file)
+            self._line_count = len(entries)
+            return True
+        except IOError as e:
+            print(f"Error compacting recipe history: {e}")
+            return False
+
+    def clear(self):
+        """Delete the history (including any legacy file)"""
+        with self._lock:
+            try:
+                for path in (self.history_file, self.legacy_file):
+                    if path is not None and path.exists():
+                        os.remove(path)
+                self._line_count = 0
+                return True
+            except IOError:
+                return False
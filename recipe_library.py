@@ -0,0 +1,231 @@
+# michelin_recipe_generator/recipe_library.py
+import json
+import re
+import sqlite3
+from contextlib import closing
+
+
+class RecipeLibrary:
+    """
+    SQLite-backed archive of every generated recipe.
+    Titles and recipe text are indexed with FTS5 for full-text search (falling back to LIKE
+    matching where SQLite was built without FTS5), and the parameters people filter on
+    (chefs, star level, dietary restrictions, occasion, complexity) live in indexed columns
+    so queries only ever touch one page of results.
+    """
+
+    def __init__(self, db_file):
+        """Initialize the library, creating the database if needed"""
+        self.db_file = db_file
+        self.fts_enabled = False
+        self._create_schema()
+
+    def _connect(self):
+        """Open a connection; one per operation keeps the library safe to use from worker threads"""
+        conn = sqlite3.connect(str(self.db_file), timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _create_schema(self):
+        """Create tables, indexes and the full-text index"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS recipes (
+                    rowid INTEGER PRIMARY KEY,
+                    recipe_id TEXT UNIQUE NOT NULL,
+                    title TEXT NOT NULL,
+                    raw_text TEXT NOT NULL,
+                    timestamp TEXT,
+                    michelin_stars INTEGER,
+                    occasion TEXT,
+                    complexity_score INTEGER,
+                    recipe_json TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_recipes_timestamp ON recipes (timestamp);
+                CREATE INDEX IF NOT EXISTS idx_recipes_stars ON recipes (michelin_stars);
+                CREATE INDEX IF NOT EXISTS idx_recipes_occasion ON recipes (occasion);
+                CREATE INDEX IF NOT EXISTS idx_recipes_complexity ON recipes (complexity_score);
+
+                CREATE TABLE IF NOT EXISTS recipe_chefs (
+                    recipe_rowid INTEGER NOT NULL REFERENCES recipes (rowid) ON DELETE CASCADE,
+                    chef_id TEXT NOT NULL,
+                    influence INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS idx_recipe_chefs_chef ON recipe_chefs (chef_id, recipe_rowid);
+
+                CREATE TABLE IF NOT EXISTS recipe_dietary (
+                    recipe_rowid INTEGER NOT NULL REFERENCES recipes (rowid) ON DELETE CASCADE,
+                    restriction TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_recipe_dietary_restriction ON recipe_dietary (restriction, recipe_rowid);
+            """)
+
+            try:
+                conn.executescript("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5(
+                        title, raw_text, content='recipes', content_rowid='rowid'
+                    );
+                    CREATE TRIGGER IF NOT EXISTS recipes_fts_insert AFTER INSERT ON recipes BEGIN
+                        INSERT INTO recipes_fts (rowid, title, raw_text) VALUES (new.rowid, new.title, new.raw_text);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS recipes_fts_delete AFTER DELETE ON recipes BEGIN
+                        INSERT INTO recipes_fts (recipes_fts, rowid, title, raw_text)
+                        VALUES ('delete', old.rowid, old.title, old.raw_text);
+                    END;
+                """)
+                self.fts_enabled = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5; search falls back to LIKE matching
+                self.fts_enabled = False
+
+    def add_recipe(self, recipe):
+        """Add a recipe to the library (ignored if a recipe with the same id is already stored)"""
+        params = recipe.get("parameters") or {}
+        recipe = {key: value for key, value in recipe.items() if key != "html_content"} # Rendered on demand
+        row = (
+            recipe.get("id"),
+            recipe.get("title", "Untitled Recipe"),
+            recipe.get("raw_text", ""),
+            recipe.get("timestamp"),
+            params.get("michelin_stars"),
+            params.get("occasion"),
+            self._parse_complexity(recipe.get("complexity_score")),
+            json.dumps(recipe, ensure_ascii=False)
+        )
+
+        try:
+            with closing(self._connect()) as conn, conn:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO recipes (recipe_id, title, raw_text, timestamp, michelin_stars,"
+                    " occasion, complexity_score, recipe_json) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    row
+                )
+                if cursor.rowcount == 0:
+                    return False
+
+                rowid = cursor.lastrowid
+                conn.executemany(
+                    "INSERT INTO recipe_chefs (recipe_rowid, chef_id, influence) VALUES (?, ?, ?)",
+                    [(rowid, chef_id, influence) for chef_id, influence in (params.get("chefs") or {}).items()]
+                )
+                conn.executemany(
+                    "INSERT INTO recipe_dietary (recipe_rowid, restriction) VALUES (?, ?)",
+                    [(rowid, restriction) for restriction in params.get("dietary_restrictions") or []]
+                )
+            return True
+        except sqlite3.Error as e:
+            print(f"Error adding recipe to library: {e}")
+            return False
+
+    def add_recipes(self, recipes):
+        """Add several recipes (e.g. when importing existing history); returns how many were new"""
+        return sum(1 for recipe in recipes if recipe.get("id") and self.add_recipe(recipe))
+
+    def _parse_complexity(self, score):
+        """Turn a '7/10' style score into an integer (None if missing)"""
+        match = re.match(r"\s*(\d{1,2})", str(score or ""))
+        return int(match.group(1)) if match else None
+
+    def _fts_query(self, text):
+        """Quote each search term for FTS5 and allow prefix matches on the last one"""
+        terms = ['"' + term.replace('"', '""') + '"' for term in text.split()]
+        if terms:
+            terms[-1] += "*"
+        return " ".join(terms)
+
+    def search(self, query="", chef=None, michelin_stars=None, dietary_restriction=None, occasion=None,
+               min_complexity=None, max_complexity=None, page=0, page_size=20):
+        """
+        Search the library and return one page of results.
+        Returns {"items": [summary dicts], "total": int, "page": int, "page_size": int}; items hold
+        recipe_id, title, timestamp, michelin_stars, occasion and complexity_score (use get_recipe
+        for the full recipe). Text matches are ranked by relevance, otherwise newest first.
+        """
+        joins = []
+        conditions = []
+        args = []
+        order_by = "r.timestamp DESC, r.rowid DESC"
+
+        query = (query or "").strip()
+        if query:
+            if self.fts_enabled:
+                joins.append("JOIN recipes_fts ON recipes_fts.rowid = r.rowid")
+                conditions.append("recipes_fts MATCH ?")
+                args.append(self._fts_query(query))
+                order_by = "bm25(recipes_fts), " + order_by
+            else:
+                conditions.append("(r.title LIKE ? OR r.raw_text LIKE ?)")
+                args.extend([f"%{query}%", f"%{query}%"])
+
+        if chef:
+            conditions.append("EXISTS (SELECT 1 FROM recipe_chefs c WHERE c.recipe_rowid = r.rowid AND c.chef_id = ?)")
+            args.append(chef)
+        if dietary_restriction:
+            conditions.append("EXISTS (SELECT 1 FROM recipe_dietary d WHERE d.recipe_rowid = r.rowid AND d.restriction = ?)")
+            args.append(dietary_restriction)
+        if michelin_stars is not None:
+            conditions.append("r.michelin_stars = ?")
+            args.append(michelin_stars)
+        if occasion:
+            conditions.append("r.occasion = ?")
+            args.append(occasion)
+        if min_complexity is not None:
+            conditions.append("r.complexity_score >= ?")
+            args.append(min_complexity)
+        if max_complexity is not None:
+            conditions.append("r.complexity_score <= ?")
+            args.append(max_complexity)
+
+        from_clause = "FROM recipes r " + " ".join(joins)
+        where_clause = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+        page = max(0, int(page))
+
+        try:
+            with closing(self._connect()) as conn:
+                total = conn.execute(f"SELECT COUNT(*) {from_clause} {where_clause}", args).fetchone()[0]
+                rows = conn.execute(
+                    f"SELECT r.recipe_id, r.title, r.timestamp, r.michelin_stars, r.occasion, r.complexity_score"
+                    f" {from_clause} {where_clause} ORDER BY {order_by} LIMIT ? OFFSET ?",
+                    args + [page_size, page * page_size]
+                ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error searching recipe library: {e}")
+            return {"items": [], "total": 0, "page": page, "page_size": page_size}
+
+        return {"items": [dict(row) for row in rows], "total": total, "page": page, "page_size": page_size}
+
+    def get_recipe(self, recipe_id):
+        """Get the full recipe dict for an id, or None"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT recipe_json FROM recipes WHERE recipe_id = ?", (recipe_id,)).fetchone()
+        return json.loads(row["recipe_json"]) if row else None
+
+    def distinct_values(self, field):
+        """Get the distinct stored values of a filterable field, for populating filter widgets"""
+        queries = {
+            "chef": "SELECT DISTINCT chef_id FROM recipe_chefs ORDER BY chef_id",
+            "dietary_restriction": "SELECT DISTINCT restriction FROM recipe_dietary ORDER BY restriction",
+            "occasion": "SELECT DISTINCT occasion FROM recipes WHERE occasion IS NOT NULL ORDER BY occasion",
+            "michelin_stars": "SELECT DISTINCT michelin_stars FROM recipes WHERE michelin_stars IS NOT NULL ORDER BY michelin_stars"
+        }
+        with closing(self._connect()) as conn:
+            return [row[0] for row in conn.execute(queries[field])]
+
+    def count(self):
+        """Get the number of recipes in the library"""
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM recipes").fetchone()[0]
+
+    def delete_recipe(self, recipe_id):
+        """Remove a recipe from the library"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("DELETE FROM recipes WHERE recipe_id = ?", (recipe_id,))
+
+    def clear(self):
+        """Remove every recipe from the library"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM recipe_chefs")
+            conn.execute("DELETE FROM recipe_dietary")
+            conn.execute("DELETE FROM recipes")
@@ -0,0 +1,457 @@
+# michelin_recipe_generator/recipe_parser.py
+import re
+import sys
+from dataclasses import dataclass, field, asdict
+from typing import List, Optional
+
+# Slots keep large collections of parsed recipes compact (dataclass slots need Python 3.10+)
+_DATACLASS_OPTIONS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
+class Ingredient:
+    name: str
+    quantity: Optional[float] = None
+    quantity_max: Optional[float] = None # Upper bound for ranges like "2-3 shallots"
+    unit: Optional[str] = None
+    note: Optional[str] = None # Preparation note, e.g. "finely diced"
+    group: Optional[str] = None # Component sub-heading, e.g. "For the sauce"
+
+
+@dataclass(**_DATACLASS_OPTIONS)
+class Step:
+    number: int
+    text: str
+    group: Optional[str] = None
+    duration_minutes: Optional[float] = None
+
+
+@dataclass(**_DATACLASS_OPTIONS)
+class Timing:
+    label: str
+    minutes: float
+
+
+@dataclass(**_DATACLASS_OPTIONS)
+class Substitution:
+    original: str
+    replacement: str
+
+
+@dataclass(**_DATACLASS_OPTIONS)
+class Section:
+    title: str
+    kind: str # ingredients, instructions, plating, notes, pairing, substitutions or other
+    start_line: int # Line range in the raw text, so sections don't duplicate it
+    end_line: int
+
+
+@dataclass(**_DATACLASS_OPTIONS)
+class ParsedRecipe:
+    title: str
+    introduction: str = ""
+    sections: List[Section] = field(default_factory=list)
+    ingredients: List[Ingredient] = field(default_factory=list)
+    steps: List[Step] = field(default_factory=list)
+    timings: List[Timing] = field(default_factory=list)
+    plating: List[str] = field(default_factory=list)
+    notes: List[str] = field(default_factory=list)
+    pairings: List[str] = field(default_factory=list)
+    substitutions: List[Substitution] = field(default_factory=list)
+    complexity_score: Optional[int] = None
+
+    def to_dict(self):
+        """Convert to plain JSON-serializable data"""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a ParsedRecipe from to_dict() output"""
+        return cls(
+            title=data.get("title", ""),
+            introduction=data.get("introduction", ""),
+            sections=[Section(**item) for item in data.get("sections", [])],
+            ingredients=[Ingredient(**item) for item in data.get("ingredients", [])],
+            steps=[Step(**item) for item in data.get("steps", [])],
+            timings=[Timing(**item) for item in data.get("timings", [])],
+            plating=list(data.get("plating", [])),
+            notes=list(data.get("notes", [])),
+            pairings=list(data.get("pairings", [])),
+            substitutions=[Substitution(**item) for item in data.get("substitutions", [])],
+            complexity_score=data.get("complexity_score")
+        )
+
+
+def _nullable(json_type):
+    return {"type": [json_type, "null"]}
+
+
+# JSON schema for structured-output generation; mirrors ParsedRecipe (minus the text-only sections).
+# Strict structured outputs need every property listed as required, so optional values are nullable.
+RECIPE_JSON_SCHEMA = {
+    "type": "object",
+    "additionalProperties": False,
+    "required": ["title", "introduction", "ingredients", "steps", "timings", "plating", "notes",
+                 "pairings", "substitutions", "complexity_score"],
+    "properties": {
+        "title": {"type": "string"},
+        "introduction": {"type": "string"},
+        "ingredients": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "additionalProperties": False,
+                "required": ["name", "quantity", "quantity_max", "unit", "note", "group"],
+                "properties": {
+                    "name": {"type": "string"},
+                    "quantity": _nullable("number"),
+                    "quantity_max": _nullable("number"),
+                    "unit": _nullable("string"),
+                    "note": _nullable("string"),
+                    "group": _nullable("string")
+                }
+            }
+        },
+        "steps": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "additionalProperties": False,
+                "required": ["number", "text", "group", "duration_minutes"],
+                "properties": {
+                    "number": {"type": "integer"},
+                    "text": {"type": "string"},
+                    "group": _nullable("string"),
+                    "duration_minutes": _nullable("number")
+                }
+            }
+        },
+        "timings": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "additionalProperties": False,
+                "required": ["label", "minutes"],
+                "properties": {
+                    "label": {"type": "string"},
+                    "minutes": {"type": "number"}
+                }
+            }
+        },
+        "plating": {"type": "array", "items": {"type": "string"}},
+        "notes": {"type": "array", "items": {"type": "string"}},
+        "pairings": {"type": "array", "items": {"type": "string"}},
+        "substitutions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "additionalProperties": False,
+                "required": ["original", "replacement"],
+                "properties": {
+                    "original": {"type": "string"},
+                    "replacement": {"type": "string"}
+                }
+            }
+        },
+        "complexity_score": {"type": "integer"}
+    }
+}
+
+
+# Section kinds by header keyword, checked in order
+_SECTION_KINDS = (
+    ("ingredients", ("INGREDIENT", "SHOPPING LIST", "MISE EN PLACE")),
+    ("substitutions", ("SUBSTITUTION", "ALTERNATIVE", "SWAP")),
+    ("pairing", ("WINE", "PAIRING", "BEVERAGE", "DRINK")),
+    ("notes", ("NOTES", "TIPS", "NOTE")),
+    ("plating", ("PLATING", "PRESENTATION", "TO SERVE", "SERVING")),
+    ("instructions", ("INSTRUCTION", "DIRECTION", "METHOD", "PREPARATION", "COOKING", "STEPS", "PROCEDURE")),
+    ("introduction", ("INTRODUCTION", "INSPIRATION", "DESCRIPTION", "ABOUT")),
+)
+
+_UNITS = (
+    "teaspoons?", "tsp", "tablespoons?", "tbsp", "tbs", "cups?", "grams?", "g", "kilograms?", "kg",
+    "milligrams?", "mg", "millilit(?:er|re)s?", "ml", "centilit(?:er|re)s?", "cl", "lit(?:er|re)s?", "l",
+    "ounces?", "oz", "fluid ounces?", "fl oz", "pounds?", "lbs?", "pinch(?:es)?", "dash(?:es)?",
+    "cloves?", "sprigs?", "bunch(?:es)?", "pieces?", "slices?", "sheets?", "stalks?", "heads?",
+    "cans?", "quarts?", "qt", "pints?", "pt", "leaves", "knobs?", "handfuls?"
+)
+
+_FRACTIONS = {"½": 0.5, "¼": 0.25, "¾": 0.75, "⅓": 1 / 3, "⅔": 2 / 3, "⅛": 0.125}
+
+_NUMBER = r"\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?(?:\s*[½¼¾⅓⅔⅛])?|[½¼¾⅓⅔⅛]"
+_INGREDIENT_RE = re.compile(
+    rf"^(?P<quantity>{_NUMBER})(?:\s*(?:-|–|to)\s*(?P<quantity_max>{_NUMBER}))?"
+    rf"\s*(?:(?P<unit>{'|'.join(_UNITS)})\.?(?=\s|$))?\s*(?:of\s+)?(?P<name>.*)$",
+    re.IGNORECASE
+)
+_DURATION_RE = re.compile(
+    r"(?P<amount>\d+(?:\.\d+)?)(?:\s*(?:-|–|to)\s*\d+(?:\.\d+)?)?\s*(?P<unit>hours?|hrs?|minutes?|mins?|seconds?|secs?)\b",
+    re.IGNORECASE
+)
+_TIMING_RE = re.compile(
+    r"^(?P<label>(?:total|prep(?:aration)?|cook(?:ing)?|active|rest(?:ing)?|chill(?:ing)?|marinating)\s*time)\s*[:\-–]\s*(?P<value>.+)$",
+    re.IGNORECASE
+)
+_STEP_RE = re.compile(r"^(?:step\s*)?(?P<number>\d{1,3})[.):]\s*(?P<text>.+)$", re.IGNORECASE)
+_COMPLEXITY_RE = re.compile(r"\*\*Complexity Score:\s*(\d{1,2})/10\*\*")
+_SUBSTITUTION_PATTERNS = (
+    re.compile(r"^instead of (?P<original>.+?),\s*(?:use|try) (?P<replacement>.+)$", re.IGNORECASE),
+    re.compile(r"^(?P<original>.+?)\s+(?:can be|may be|could be)\s+(?:replaced|substituted|swapped)\s+(?:with|by|for)\s+(?P<replacement>.+)$", re.IGNORECASE),
+    re.compile(r"^(?P<original>.+?)\s*(?:→|->|=>)\s*(?P<replacement>.+)$"),
+    re.compile(r"^(?P<original>[^:]{1,60}):\s*(?P<replacement>.+)$"),
+)
+
+
+def _clean_markup(line):
+    """Strip markdown heading marks and emphasis wrapping from a line"""
+    line = line.strip().lstrip('#').strip()
+    while len(line) > 1 and line[0] in '*_' and line[-1] in '*_:':
+        line = line.strip('*_').strip()
+    return line.replace('**', '')
+
+
+def _is_header(raw_line, line):
+    """Check if a line is a section header (markdown heading, all caps, or short line ending in ':')"""
+    if raw_line.lstrip().startswith('#'):
+        return True
+    if _list_marker(line) is not None:
+        return False
+    return (line.isupper() and len(line) < 80) or (line.endswith(':') and len(line) < 50)
+
+
+def _list_marker(line):
+    """Get the text of a bullet or numbered list item (None if the line is not one)"""
+    if line[:1] in ('-', '•', '*') and line[1:2] in (' ', '\t'):
+        return line[1:].strip()
+    match = _STEP_RE.match(line)
+    if match:
+        return match.group("text").strip()
+    return None
+
+
+def _section_kind(title):
+    """Classify a section header"""
+    upper = title.upper()
+    for kind, keywords in _SECTION_KINDS:
+        if any(keyword in upper for keyword in keywords):
+            return kind
+    return "other"
+
+
+def _parse_number(text):
+    """Parse '1 1/2', '3/4', '2.5', '½' or '1½' into a float"""
+    text = text.strip()
+    total = 0.0
+    if text and text[-1] in _FRACTIONS:
+        total += _FRACTIONS[text[-1]]
+        text = text[:-1].strip()
+        if not text:
+            return total
+    for part in text.split():
+        if '/' in part:
+            numerator, denominator = part.split('/', 1)
+            total += float(numerator) / float(denominator) if float(denominator) else 0.0
+        else:
+            total += float(part)
+    return total
+
+
+def _parse_duration(text):
+    """Total minutes in a phrase like '1 hour 30 minutes' or '10-12 minutes' (None if no duration)"""
+    minutes = None
+    for match in _DURATION_RE.finditer(text):
+        amount = float(match.group("amount"))
+        unit = match.group("unit").lower()
+        if unit.startswith('h'):
+            amount *= 60
+        elif unit.startswith('s'):
+            amount /= 60
+        minutes = (minutes or 0) + amount
+    return minutes
+
+
+def parse_ingredient(text, group=None):
+    """Split an ingredient line into quantity, unit, name and note"""
+    text = text.strip()
+    quantity = quantity_max = unit = None
+    name = text
+
+    match = _INGREDIENT_RE.match(text)
+    if match and match.group("name"):
+        quantity = _parse_number(match.group("quantity"))
+        if match.group("quantity_max"):
+            quantity_max = _parse_number(match.group("quantity_max"))
+        unit = match.group("unit").lower() if match.group("unit") else None
+        name = match.group("name").strip()
+
+    # "butter, softened" / "shallots (finely diced)" -> name + note
+    note = None
+    for separator in (',', '('):
+        index = name.find(separator)
+        if index > 0:
+            note = name[index + 1:].strip().rstrip(')').strip() or None
+            name = name[:index].strip()
+            break
+
+    return Ingredient(name=name, quantity=quantity, quantity_max=quantity_max, unit=unit, note=note, group=group)
+
+
+def parse_substitution(text):
+    """Split a substitution line into original and replacement ingredient"""
+    for pattern in _SUBSTITUTION_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            return Substitution(original=match.group("original").strip(), replacement=match.group("replacement").strip())
+    return Substitution(original=text, replacement="")
+
+
+def parse_recipe(recipe_text):
+    """
+    Parse recipe text from the API into a ParsedRecipe in a single pass over its lines.
+    Recognizes section headers (plain, all-caps or markdown), ingredient lines with quantities and
+    units, numbered or bulleted steps, timing lines, pairings, substitutions and the complexity score.
+    """
+    lines = recipe_text.split('\n')
+    recipe = ParsedRecipe(title="")
+    introduction = []
+    current = None # Section being filled
+    group = None # Sub-heading inside an ingredients/instructions section
+    step_number = 0
+
+    for index, raw_line in enumerate(lines):
+        line = _clean_markup(raw_line)
+        if not line:
+            continue
+
+        # Complexity score line (the prompt asks for it at the very end)
+        score_match = _COMPLEXITY_RE.search(raw_line)
+        if score_match:
+            score = int(score_match.group(1))
+            if 1 <= score <= 10:
+                recipe.complexity_score = score
+            continue
+
+        # The first line of content is the title
+        if not recipe.title:
+            recipe.title = line
+            continue
+
+        # Timing lines can appear anywhere (often right under the title)
+        timing_match = _TIMING_RE.match(line.lstrip('-•* '))
+        if timing_match:
+            minutes = _parse_duration(timing_match.group("value"))
+            if minutes is not None:
+                recipe.timings.append(Timing(label=timing_match.group("label").strip().lower(), minutes=minutes))
+            continue
+
+        if _is_header(raw_line, line):
+            title = line.rstrip(':').strip()
+            kind = _section_kind(title)
+
+            # "For the sauce:" inside ingredients or instructions is a component, not a new section
+            if kind == "other" and current is not None and current.kind in ("ingredients", "instructions"):
+                group = title
+                continue
+
+            if current is not None:
+                current.end_line = index
+            current = Section(title=title, kind=kind, start_line=index, end_line=len(lines))
+            recipe.sections.append(current)
+            group = None
+            continue
+
+        item = _list_marker(line)
+        kind = current.kind if current is not None else "introduction"
+
+        if kind == "introduction":
+            introduction.append(line)
+        elif kind == "ingredients":
+            recipe.ingredients.append(parse_ingredient(item if item is not None else line, group))
+        elif kind == "instructions":
+            step_number += 1
+            text = item if item is not None else line
+            recipe.steps.append(Step(number=step_number, text=text, group=group, duration_minutes=_parse_duration(text)))
+        elif kind == "plating":
+            recipe.plating.append(item if item is not None else line)
+        elif kind == "notes":
+            recipe.notes.append(item if item is not None else line)
+        elif kind == "pairing":
+            recipe.pairings.append(item if item is not None else line)
+        elif kind == "substitutions":
+            recipe.substitutions.append(parse_substitution(item if item is not None else line))
+
+    recipe.introduction = "\n".join(introduction)
+    if not recipe.title:
+        recipe.title = "Michelin Star Recipe"
+    return recipe
+
+
+def _format_quantity(value):
+    """Format a quantity without trailing zeros (2.0 -> '2', 0.5 -> '0.5')"""
+    return f"{value:g}"
+
+
+def format_ingredient(ingredient):
+    """Format an ingredient as a single line of text"""
+    text = ""
+    if ingredient.quantity is not None:
+        text = _format_quantity(ingredient.quantity)
+        if ingredient.quantity_max is not None:
+            text += f"-{_format_quantity(ingredient.quantity_max)}"
+        text += " "
+    if ingredient.unit:
+        text += ingredient.unit + " "
+    text += ingredient.name
+    if ingredient.note:
+        text += f", {ingredient.note}"
+    return text
+
+
+def recipe_to_text(recipe):
+    """
+    Write a ParsedRecipe out as recipe text in the same layout the text prompt asks for.
+    Used to give structured (JSON mode) recipes a raw_text for history, search and export.
+    """
+    lines = [recipe.title, ""]
+    if recipe.introduction:
+        lines += [recipe.introduction, ""]
+    for timing in recipe.timings:
+        lines.append(f"{timing.label.capitalize()}: {_format_quantity(timing.minutes)} minutes")
+    if recipe.timings:
+        lines.append("")
+
+    def add_grouped(header, items, format_item):
+        lines.append(header)
+        group = None
+        for item in items:
+            if item.group and item.group != group:
+                group = item.group
+                lines.append(f"{group}:")
+            lines.append(format_item(item))
+        lines.append("")
+
+    if recipe.ingredients:
+        add_grouped("INGREDIENTS:", recipe.ingredients, lambda item: f"- {format_ingredient(item)}")
+    if recipe.steps:
+        add_grouped("INSTRUCTIONS:", recipe.steps, lambda step: f"{step.number}. {step.text}")
+
+    for header, items in (("PLATING:", recipe.plating), ("CHEF'S NOTES:", recipe.notes),
+                          ("WINE PAIRING:", recipe.pairings)):
+        if items:
+            lines.append(header)
+            lines += [f"- {item}" for item in items]
+            lines.append("")
+
+    if recipe.substitutions:
+        lines.append("SUBSTITUTIONS:")
+        for substitution in recipe.substitutions:
+            if substitution.replacement:
+                lines.append(f"- {substitution.original}: {substitution.replacement}")
+            else:
+                lines.append(f"- {substitution.original}")
+        lines.append("")
+
+    if recipe.complexity_score:
+        lines.append(f"**Complexity Score: {recipe.complexity_score}/10**")
+    return "\n".join(lines).strip() + "\n"
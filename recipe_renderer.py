@@ -0,0 +1,370 @@
+# michelin_recipe_generator/recipe_renderer.py
+import hashlib
+import threading
+from collections import OrderedDict
+from html import escape
+
+from .metrics import STAGE_SECONDS
+from .recipe_parser import ParsedRecipe, format_ingredient
+
+# Shared stylesheet for rendered recipes. The display widget installs it once as the document's
+# default stylesheet; only standalone HTML exports embed a copy.
+RECIPE_STYLESHEET = """
+body {
+    font-family: 'Helvetica Neue', Arial, sans-serif;
+    line-height: 1.6;
+    color: #F0F0F0; /* Light base text color */
+    max-width: 800px;
+    margin: 0 auto;
+    padding: 20px;
+}
+h1 {
+    color: #FFFFFF; /* White for main title */
+    font-size: 28px;
+    margin-bottom: 10px;
+    border-bottom: 2px solid #ddd;
+    padding-bottom: 10px;
+}
+h2 {
+    color: #E0E0E0; /* Lighter gray for h2 */
+    font-size: 22px;
+    margin-top: 25px;
+    margin-bottom: 10px;
+}
+h3 {
+    color: #D0D0D0; /* Lighter gray for h3 */
+    font-size: 18px;
+    margin-top: 20px;
+    margin-bottom: 8px;
+}
+p {
+    margin-bottom: 15px;
+}
+ul, ol {
+    margin-bottom: 20px;
+    padding-left: 25px;
+}
+li {
+    margin-bottom: 8px;
+}
+.section {
+    margin-bottom: 30px;
+}
+.chef-notes {
+    background-color: #f9f9f9;
+    border-left: 4px solid #ddd;
+    padding: 15px;
+    margin: 20px 0;
+}
+.substitutions {
+    background-color: #f5f5f5;
+    padding: 15px;
+    margin: 20px 0;
+    border-radius: 5px;
+}
+.wine-pairing {
+    font-style: italic;
+    margin: 20px 0;
+}
+"""
+
+
+# Section headers that start a styled block, in priority order: (keywords, css class)
+_BLOCK_SECTIONS = (
+    (("NOTES", "TIPS"), "chef-notes"),
+    (("SUBSTITUTIONS", "ALTERNATIVES"), "substitutions"),
+    (("WINE", "PAIRING"), "wine-pairing"),
+)
+
+_NUMBERED_PREFIXES = ('1.', '2.', '3.', '4.', '5.', '6.', '7.', '8.', '9.', '10.')
+
+
+def _is_section_header(line):
+    """Check if a (stripped, non-empty) line is a section header"""
+    return line.isupper() or (line.endswith(':') and len(line) < 50)
+
+
+def _classify_header(line):
+    """Get the heading tag and block css class (or None) for a section header line"""
+    upper = line.upper()
+    if "INGREDIENTS" in upper:
+        return "h2", None
+    if "INSTRUCTIONS" in upper or "DIRECTIONS" in upper or "METHOD" in upper:
+        return "h2", None
+    for keywords, css_class in _BLOCK_SECTIONS:
+        if any(keyword in upper for keyword in keywords):
+            return "h2", css_class
+    if "PLATING" in upper or "PRESENTATION" in upper:
+        return "h2", None
+    return "h3", None
+
+
+def _list_item(line):
+    """Get (list type, item text) if the line is a list item, otherwise None"""
+    if line.startswith(('-', '•')):
+        return "ul", line[1:].strip()
+    if line.startswith(_NUMBERED_PREFIXES) and ' ' in line:
+        return "ol", line[line.find('.')+1:].strip()
+    return None
+
+
+class IncrementalRecipeFormatter:
+    """
+    Formats recipe text into HTML as it arrives in chunks (e.g. streamed from the API).
+    feed() returns the HTML for lines completed by the chunk; the open list, open styled block
+    and any trailing partial line are carried between calls, so each piece of text is formatted
+    exactly once. close() flushes the final line and closes whatever is still open.
+    Concatenating every returned fragment gives the same HTML as format_recipe_body on the whole text.
+    """
+
+    def __init__(self):
+        self.list_type = None # "ul"/"ol" while a list is open
+        self.open_block = False # True while a styled section <div> is open
+        self._partial_line = ""
+        self._seen_title = False
+        self._pending_blank_lines = 0 # Held back until more content follows (trailing blanks are dropped)
+
+    @property
+    def partial_line(self):
+        """The text received after the last newline (not yet formatted)"""
+        return self._partial_line
+
+    def feed(self, chunk):
+        """Add a chunk of text and return the HTML for any lines it completed"""
+        if '\n' not in chunk:
+            self._partial_line += chunk
+            return ""
+
+        lines = (self._partial_line + chunk).split('\n')
+        self._partial_line = lines.pop()
+
+        parts = []
+        for line in lines:
+            self._format_line(line, parts)
+        return "".join(parts)
+
+    def close(self):
+        """Format the last line and close any open list or block"""
+        parts = []
+        if self._partial_line:
+            self._format_line(self._partial_line, parts)
+            self._partial_line = ""
+
+        if self.list_type:
+            parts.append(f"</{self.list_type}>\n")
+            self.list_type = None
+        if self.open_block:
+            parts.append("</div>\n")
+            self.open_block = False
+        return "".join(parts)
+
+    def _close_list(self, parts):
+        """End the open list, if any"""
+        if self.list_type:
+            parts.append(f"</{self.list_type}>\n")
+            self.list_type = None
+
+    def _format_line(self, line, parts):
+        """Append the HTML for one complete line"""
+        line = line.strip()
+
+        # Empty lines end any list and become spacing, but only between content
+        if not line:
+            if self._seen_title:
+                self._pending_blank_lines += 1
+            return
+
+        while self._pending_blank_lines:
+            self._close_list(parts)
+            parts.append("<p>&nbsp;</p>\n")
+            self._pending_blank_lines -= 1
+
+        # The first line of content is the title
+        if not self._seen_title:
+            self._seen_title = True
+            parts.append(f"<h1>{escape(line)}</h1>\n")
+            return
+
+        # Check if this is a section header
+        if _is_section_header(line):
+            self._close_list(parts)
+
+            # A new section ends the previous styled block
+            if self.open_block:
+                parts.append("</div>\n")
+                self.open_block = False
+
+            # Clean up the header
+            header = escape(line.rstrip(':').title())
+            tag, css_class = _classify_header(line)
+            if css_class:
+                parts.append(f'<div class="{css_class}"><{tag}>{header}</{tag}>\n')
+                self.open_block = True
+            else:
+                parts.append(f"<{tag}>{header}</{tag}>\n")
+            return
+
+        # Check if this is a list item
+        list_item = _list_item(line)
+        if list_item:
+            new_list_type, item = list_item
+
+            # Start a new list if needed
+            if self.list_type != new_list_type:
+                self._close_list(parts)
+                parts.append(f"<{new_list_type}>\n")
+                self.list_type = new_list_type
+
+            parts.append(f"<li>{escape(item)}</li>\n")
+        else:
+            # Regular paragraph
+            self._close_list(parts)
+            parts.append(f"<p>{escape(line)}</p>\n")
+
+
+def format_recipe_body(recipe_text):
+    """
+    Format the recipe text as the HTML body content (no document wrapper or stylesheet).
+    Single pass over the lines with the open list and styled block tracked explicitly,
+    so the cost is linear in the size of the text.
+    """
+    formatter = IncrementalRecipeFormatter()
+    return formatter.feed(recipe_text) + formatter.close()
+
+
+def format_structured_recipe_body(recipe):
+    """
+    Format a ParsedRecipe (e.g. from JSON-mode generation) as HTML body content.
+    Works straight from the typed fields, so no text has to be re-parsed; headings, lists and
+    styled blocks use the same markup as format_recipe_body.
+    """
+    parts = [f"<h1>{escape(recipe.title or 'Untitled Recipe')}</h1>\n"]
+    if recipe.introduction:
+        parts.append(f"<p>{escape(recipe.introduction)}</p>\n")
+    if recipe.timings:
+        parts.extend(f"<p>{escape(timing.label.capitalize())}: {timing.minutes:g} minutes</p>\n"
+                     for timing in recipe.timings)
+
+    def add_list(items, list_type):
+        parts.append(f"<{list_type}>\n")
+        parts.extend(f"<li>{escape(item)}</li>\n" for item in items)
+        parts.append(f"</{list_type}>\n")
+
+    def add_grouped(header, entries, list_type, format_entry):
+        parts.append(f"<h2>{header}</h2>\n")
+        group = None
+        items = []
+        for entry in entries:
+            if entry.group and entry.group != group:
+                if items:
+                    add_list(items, list_type)
+                    items = []
+                group = entry.group
+                parts.append(f"<h3>{escape(group.title())}</h3>\n")
+            items.append(format_entry(entry))
+        if items:
+            add_list(items, list_type)
+
+    if recipe.ingredients:
+        add_grouped("Ingredients", recipe.ingredients, "ul", format_ingredient)
+    if recipe.steps:
+        add_grouped("Instructions", recipe.steps, "ol", lambda step: step.text)
+    if recipe.plating:
+        parts.append("<h2>Plating</h2>\n")
+        add_list(recipe.plating, "ul")
+
+    substitutions = [
+        f"{item.original}: {item.replacement}" if item.replacement else item.original
+        for item in recipe.substitutions
+    ]
+    for header, css_class, items in (("Chef's Notes", "chef-notes", recipe.notes),
+                                     ("Wine Pairing", "wine-pairing", recipe.pairings),
+                                     ("Substitutions", "substitutions", substitutions)):
+        if items:
+            parts.append(f'<div class="{css_class}"><h2>{escape(header)}</h2>\n')
+            add_list(items, "ul")
+            parts.append("</div>\n")
+
+    if recipe.complexity_score:
+        parts.append(f"<p>**Complexity Score: {recipe.complexity_score}/10**</p>\n")
+    return "".join(parts)
+
+
+def wrap_html_document(body_html):
+    """Wrap rendered body content in a complete HTML document with the recipe stylesheet"""
+    return (
+        "<!DOCTYPE html>\n<html>\n<head>\n<style>\n" + RECIPE_STYLESHEET + "</style>\n</head>\n<body>\n"
+        + body_html + "</body>\n</html>\n"
+    )
+
+
+class RecipeRenderer:
+    """
+    Renders recipes to HTML on demand.
+    Recipe records only store raw text; rendered HTML is kept in a small LRU cache keyed by a
+    hash of the text, so re-displaying a recipe (e.g. from the history panel) is free while
+    large libraries never hold HTML for recipes nobody is looking at.
+    """
+
+    def __init__(self, maxsize=64):
+        """Initialize the renderer with the maximum number of cached renderings"""
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render_body(self, recipe_text, structured=None):
+        """
+        Get the HTML body for a recipe, rendering it only if not cached.
+        When structured data (ParsedRecipe.to_dict() output) is given it is rendered directly
+        and recipe_text only serves as the cache key.
+        """
+        key = hashlib.sha256(recipe_text.encode("utf-8")).hexdigest()
+        if structured is not None:
+            key = "structured:" + key
+        with self._lock:
+            html = self._cache.get(key)
+            if html is not None:
+                self._cache.move_to_end(key)
+                return html
+
+        with STAGE_SECONDS.time(stage="format"):
+            if structured is not None:
+                html = format_structured_recipe_body(ParsedRecipe.from_dict(structured))
+            else:
+                html = format_recipe_body(recipe_text)
+
+        with self._lock:
+            self._cache[key] = html
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return html
+
+    def render_document(self, recipe_text, structured=None):
+        """Get a standalone HTML document (stylesheet included) for a recipe"""
+        return wrap_html_document(self.render_body(recipe_text, structured))
+
+    def clear(self):
+        """Drop every cached rendering"""
+        with self._lock:
+            self._cache.clear()
+
+
+# Renderer shared by the GUI and anything else that displays recipes
+default_renderer = RecipeRenderer()
+
+
+def render_recipe_html(recipe, standalone=False):
+    """
+    Render a recipe dict to HTML using the shared renderer.
+    Returns body content for widgets that have RECIPE_STYLESHEET installed, or a complete
+    document when standalone is set. Recipes generated in JSON mode are rendered from their
+    structured fields. Older records that only carry html_content are passed through.
+    """
+    recipe_text = recipe.get("raw_text")
+    if not recipe_text:
+        return recipe.get("html_content", "Error: Recipe content not found.")
+    structured = recipe.get("structured") if recipe.get("format") == "json" else None
+    if standalone:
+        return default_renderer.render_document(recipe_text, structured)
+    return default_renderer.render_body(recipe_text, structured)
@@ -0,0 +1,143 @@
+# michelin_recipe_generator/response_cache.py
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import closing
+
+# Part of every key; bump it when the key material changes so older entries stop matching
+KEY_VERSION = 2
+
+
+class ResponseCache:
+    """
+    Persistent, content-addressed cache of API responses.
+    Entries are keyed on a hash of everything that determines the completion (the endpoint that
+    answers, prompts, model, temperature, max tokens), expire after a TTL and are evicted least-recently-used first
+    once the entry count or total size limit is exceeded.
+    """
+
+    def __init__(self, cache_file, max_entries=500, max_bytes=50 * 1024 * 1024, ttl_seconds=7 * 24 * 3600):
+        """Initialize the cache, creating the database file if needed"""
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._create_schema()
+
+    @classmethod
+    def from_settings(cls, settings_manager):
+        """Create a cache using the limits from the application settings"""
+        return cls(
+            settings_manager.get_response_cache_file(),
+            max_entries=settings_manager.get_setting("cache_settings.max_entries", 500),
+            max_bytes=int(settings_manager.get_setting("cache_settings.max_size_mb", 50) * 1024 * 1024),
+            ttl_seconds=int(settings_manager.get_setting("cache_settings.ttl_hours", 168) * 3600)
+        )
+
+    @staticmethod
+    def make_key(endpoint, system_prompt, prompt, model, temperature, max_tokens):
+        """
+        Build the cache key for a request.
+        endpoint identifies the provider that answers: the same model name can mean different
+        servers (or a canned stub), and their replies must never be served for each other.
+        """
+        material = json.dumps([KEY_VERSION, endpoint, system_prompt, prompt, model, temperature, max_tokens],
+                              ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _connect(self):
+        """Open a connection; one per operation keeps the cache safe to use from worker threads"""
+        return sqlite3.connect(str(self.cache_file), timeout=10)
+
+    def _create_schema(self):
+        """Create the cache table if it does not exist"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " model TEXT,"
+                " response_text TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+
+    def get(self, key):
+        """Get a cached response text, or None if missing or expired"""
+        now = time.time()
+        try:
+            with closing(self._connect()) as conn, conn:
+                row = conn.execute(
+                    "SELECT response_text, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+
+                response_text, created_at = row
+                if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return None
+
+                # Touch the entry so it counts as recently used
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                return response_text
+        except sqlite3.Error as e:
+            print(f"Error reading response cache: {e}")
+            return None
+
+    def put(self, key, response_text, model=None):
+        """Store a response text and evict old entries if the cache is over its limits"""
+        now = time.time()
+        size = len(response_text.encode("utf-8"))
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response_text, size, created_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, response_text, size, now, now)
+                )
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            print(f"Error writing response cache: {e}")
+
+    def _evict(self, conn, now):
+        """Drop expired entries, then least recently used ones until within the limits"""
+        if self.ttl_seconds:
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+
+        if self.max_entries:
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+        if self.max_bytes:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC").fetchall()
+                stale = []
+                for key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    stale.append((key,))
+                    total -= size
+                conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def clear(self):
+        """Remove every cached response"""
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM responses")
+            return True
+        except sqlite3.Error as e:
+            print(f"Error clearing response cache: {e}")
+            return False
+
+    def stats(self):
+        """Get the number of entries and their total size in bytes"""
+        with closing(self._connect()) as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": count, "bytes": total}
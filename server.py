@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Michelin Star Recipe Generator
+Headless HTTP service: one process generates recipes for many clients (e.g. kitchen tablets)
+
+Usage:
+    python -m michelin_recipe_generator.server --host 0.0.0.0 --port 8080 --workers 4 --queue-size 32
+
+Endpoints:
+    POST /recipes          Recipe parameters as JSON (the keys the GUI produces; anything omitted
+                           uses the GUI defaults); responds with the recipe as JSON
+    POST /recipes/stream   Same request; responds with server-sent events: "delta" events carrying
+                           the recipe text as it is written, then one "recipe" (or "error") event
+    GET  /health           Queue and worker status
+    GET  /metrics          Latency/throughput metrics in Prometheus text format
+
+Add ?bypass_cache=1 to either POST endpoint to skip the response cache. Requests wait in a bounded
+queue for one of the workers; when the queue is full the server answers 503 with Retry-After.
+A client that closes its connection before the response is complete cancels its generation.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from urllib.parse import urlsplit, parse_qs
+
+from .async_engine import AsyncRecipeEngine
+from .batch import make_backend
+from .metrics import default_registry, REQUESTS_TOTAL
+from .recipe_generator import RecipeGenerator, with_default_params
+from .settings_manager import SettingsManager
+
+# Largest request body accepted (parameter sets are tiny)
+MAX_BODY_BYTES = 1024 * 1024
+
+# Seconds a client is asked to wait before retrying when the queue is full
+RETRY_AFTER_SECONDS = 5
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    502: "Bad Gateway",
+    503: "Service Unavailable"
+}
+
+
+class HTTPError(Exception):
+    """An error answered with a JSON {"error": message} body"""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class _Job:
+    """A queued generation request"""
+
+    def __init__(self, params, bypass_cache, stream):
+        self.params = params
+        self.bypass_cache = bypass_cache
+        # Streaming jobs get the text deltas through a queue; the result arrives on the future
+        self.deltas = asyncio.Queue() if stream else None
+        self.future = asyncio.get_event_loop().create_future()
+
+
+class RecipeServer:
+    """
+    asyncio HTTP server in front of an AsyncRecipeEngine.
+    Requests are put on a bounded queue and served by a fixed number of worker tasks, so the number
+    of generations in flight (and the memory used by waiting requests) stays bounded no matter
+    how many clients connect. All workers share the engine's client and connection pool.
+    """
+
+    def __init__(self, engine, host="127.0.0.1", port=8080, workers=4, queue_size=32):
+        """Initialize the server (nothing is started until serve() or start())"""
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.workers = max(1, int(workers))
+        self.queue_size = max(1, int(queue_size))
+        self.queue = None
+        self.active_jobs = 0
+        self._server = None
+        self._worker_tasks = []
+
+    async def start(self):
+        """Start the workers and begin accepting connections"""
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker_tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+
+    async def serve(self):
+        """Run until cancelled (e.g. by Ctrl+C), then shut down cleanly"""
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        """Stop accepting connections, stop the workers and close the API client"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        await self.engine.aclose()
+
+    async def _worker(self):
+        """Take jobs off the queue and generate them one at a time"""
+        while True:
+            job = await self.queue.get()
+            try:
+                await self._run_job(job)
+            finally:
+                self.queue.task_done()
+
+    async def _run_job(self, job):
+        """Generate one job's recipe and deliver the result to its future"""
+        if job.future.done():
+            return # The client went away while the job was queued
+
+        delta_callback = job.deltas.put_nowait if job.deltas is not None else None
+        task = asyncio.ensure_future(self.engine.agenerate_recipe(
+            job.params, bypass_cache=job.bypass_cache, delta_callback=delta_callback
+        ))
+        # A client that disconnects cancels its future, which aborts the request
+        job.future.add_done_callback(lambda future: task.cancel() if future.cancelled() else None)
+
+        self.active_jobs += 1
+        try:
+            recipe = await task
+        except asyncio.CancelledError:
+            if not job.future.cancelled():
+                raise # The server is shutting down
+            return
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        finally:
+            self.active_jobs -= 1
+
+        if not job.future.done():
+            job.future.set_result(recipe)
+
+    def submit(self, params, bypass_cache=False, stream=False):
+        """Queue a generation, raising HTTPError 503 if the queue is full"""
+        job = _Job(params, bypass_cache, stream)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            model = self.engine.settings_manager.get_setting("api_settings.model", "gpt-4")
+            REQUESTS_TOTAL.inc(model=model, outcome="rejected")
+            raise HTTPError(503, "The server is busy; please retry shortly.",
+                            headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+        return job
+
+    def health(self):
+        """Status for GET /health"""
+        return {
+            "status": "ok",
+            "backend": self.engine.recipe_generator.backend.name,
+            "api_ready": self.engine.client is not None,
+            "workers": self.workers,
+            "active": self.active_jobs,
+            "queued": self.queue.qsize(),
+            "queue_size": self.queue_size
+        }
+
+    async def _handle_connection(self, reader, writer):
+        """Serve one HTTP request per connection"""
+        try:
+            try:
+                method, path, query, body = await self._read_request(reader)
+                await self._dispatch(method, path, query, body, reader, writer)
+            except HTTPError as e:
+                await self._send_json(writer, e.status, {"error": str(e)}, e.headers)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass # The client went away
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        """Parse the request line, headers and body"""
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        parts = request_line.split()
+        if len(parts) != 3:
+            raise HTTPError(400, "Malformed request line.")
+        method, target, _ = parts
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length.")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body is too large.")
+        body = await reader.readexactly(length) if length else b""
+
+        url = urlsplit(target)
+        return method.upper(), url.path.rstrip("/") or "/", parse_qs(url.query), body
+
+    async def _dispatch(self, method, path, query, body, reader, writer):
+        """Route a request to its endpoint"""
+        routes = {
+            "/recipes": ("POST", self._handle_recipe),
+            "/recipes/stream": ("POST", self._handle_stream),
+            "/health": ("GET", self._handle_health),
+            "/metrics": ("GET", self._handle_metrics)
+        }
+        if path not in routes:
+            raise HTTPError(404, f"No such endpoint: {path}")
+        allowed, handler = routes[path]
+        if method != allowed:
+            raise HTTPError(405, f"Use {allowed} for {path}.", headers={"Allow": allowed})
+        await handler(query, body, reader, writer)
+
+    def _parse_params(self, body):
+        """Read recipe parameters from a JSON request body"""
+        try:
+            params = json.loads(body.decode("utf-8")) if body.strip() else {}
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise HTTPError(400, f"Invalid JSON: {e}")
+        if not isinstance(params, dict):
+            raise HTTPError(400, "Expected a JSON object of recipe parameters.")
+        return with_default_params(params)
+
+    def _bypass_cache(self, query):
+        """Check the bypass_cache query parameter"""
+        return query.get("bypass_cache", ["0"])[-1].lower() in ("1", "true", "yes")
+
+    async def _wait_for_disconnect(self, reader):
+        """Return once the client closes the connection (anything more it sends is ignored)"""
+        try:
+            while await reader.read(4096):
+                pass
+        except ConnectionError:
+            pass
+
+    async def _handle_recipe(self, query, body, reader, writer):
+        """POST /recipes: generate and return the whole recipe"""
+        job = self.submit(self._parse_params(body), bypass_cache=self._bypass_cache(query))
+        disconnected = asyncio.ensure_future(self._wait_for_disconnect(reader))
+        try:
+            await asyncio.wait([job.future, disconnected], return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            job.future.cancel()
+            raise
+        finally:
+            disconnected.cancel()
+
+        if not job.future.done():
+            job.future.cancel() # The client went away: abandon the generation
+            return
+        if job.future.exception() is not None:
+            raise HTTPError(502, str(job.future.exception()))
+        await self._send_json(writer, 200, job.future.result())
+
+    async def _handle_stream(self, query, body, reader, writer):
+        """POST /recipes/stream: send the text as server-sent events while it is generated"""
+        job = self.submit(self._parse_params(body), bypass_cache=self._bypass_cache(query), stream=True)
+        disconnected = asyncio.ensure_future(self._wait_for_disconnect(reader))
+        try:
+            await self._send_head(writer, 200, "text/event-stream", {"Cache-Control": "no-cache"})
+            while not job.future.done():
+                next_delta = asyncio.ensure_future(job.deltas.get())
+                try:
+                    await asyncio.wait([next_delta, job.future, disconnected], return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    if not next_delta.done():
+                        next_delta.cancel()
+                if disconnected.done():
+                    job.future.cancel() # The client went away: abandon the generation
+                    return
+                if next_delta.done():
+                    await self._send_event(writer, "delta", {"text": next_delta.result()})
+
+            # Deltas delivered just before the result
+            while not job.deltas.empty():
+                await self._send_event(writer, "delta", {"text": job.deltas.get_nowait()})
+
+            if job.future.exception() is not None:
+                await self._send_event(writer, "error", {"error": str(job.future.exception())})
+            else:
+                await self._send_event(writer, "recipe", job.future.result())
+        except BaseException:
+            # A write failed or the server is stopping: abandon the generation
+            job.future.cancel()
+            raise
+        finally:
+            disconnected.cancel()
+
+    async def _handle_health(self, query, body, reader, writer):
+        """GET /health"""
+        await self._send_json(writer, 200, self.health())
+
+    async def _handle_metrics(self, query, body, reader, writer):
+        """GET /metrics"""
+        text = default_registry.to_prometheus()
+        await self._send_head(writer, 200, "text/plain; version=0.0.4; charset=utf-8",
+                              {"Content-Length": str(len(text.encode("utf-8")))})
+        writer.write(text.encode("utf-8"))
+        await writer.drain()
+
+    async def _send_head(self, writer, status, content_type, headers=None):
+        """Write the status line and headers"""
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                 f"Content-Type: {content_type}",
+                 "Connection: close"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+    async def _send_json(self, writer, status, payload, headers=None):
+        """Write a complete JSON response"""
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        headers = dict(headers or {}, **{"Content-Length": str(len(data))})
+        await self._send_head(writer, status, "application/json; charset=utf-8", headers)
+        writer.write(data)
+        await writer.drain()
+
+    async def _send_event(self, writer, event, payload):
+        """Write one server-sent event"""
+        data = json.dumps(payload, ensure_ascii=False)
+        writer.write(f"event: {event}\ndata: {data}\n\n".encode("utf-8"))
+        await writer.drain()
+
+
+async def run_server(server):
+    """Warm up the API client, then serve until interrupted"""
+    await server.engine.awarm_up()
+    if server.engine.client is None:
+        await server.engine.aclose()
+        print("OpenAI API key is not set. Run the desktop app once to store it.", file=sys.stderr)
+        return 2
+    print(f"Serving recipes on http://{server.host}:{server.port} "
+          f"({server.workers} workers, queue of {server.queue_size})", file=sys.stderr)
+    await server.serve()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Michelin star recipe generation over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--workers", type=int, help="Generations in flight at once (default: api_settings.max_concurrency)")
+    parser.add_argument("--queue-size", type=int, default=32,
+                        help="Requests that may wait for a worker before new ones get 503 (default: 32)")
+    parser.add_argument("--backend", choices=["openai", "openai_compatible", "fake"],
+                        help="Model backend (default: api_settings.backend)")
+    parser.add_argument("--base-url", help="Server URL for the openai_compatible backend")
+    args = parser.parse_args(argv)
+
+    settings_manager = SettingsManager()
+    try:
+        recipe_generator = RecipeGenerator(settings_manager, backend=make_backend(args, settings_manager), connect=False)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    workers = args.workers or settings_manager.get_setting("api_settings.max_concurrency", 8)
+    engine = AsyncRecipeEngine(recipe_generator, max_concurrency=workers)
+    server = RecipeServer(engine, host=args.host, port=args.port, workers=workers, queue_size=args.queue_size)
+    try:
+        return asyncio.run(run_server(server))
+    except KeyboardInterrupt:
+        return 0
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
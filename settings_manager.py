@@ -1,19 +1,38 @@
 import os
 import json
-import keyring
+import atexit
+import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
+from .recipe_history import RecipeHistoryStore
+from .recipe_library import RecipeLibrary
+
 class SettingsManager:
     """
     Manages application settings and API keys for the Michelin Star Recipe Generator.
     Handles secure storage and retrieval of API keys using the keyring library.
+    Changes made with set_setting are written behind: they are collected for save_delay seconds
+    and then written in one go on a background thread. Call flush() to write them immediately.
     """
     
-    def __init__(self):
+    def __init__(self, save_delay=0.5):
         """Initialize the settings manager"""
         # Define app name for keyring
         self.app_name = "MichelinRecipeGenerator"
         self.api_key_name = "openai_api_key"
+
+        # Batch generation saves from worker threads; serialize file writes
+        self._lock = threading.RLock()
+
+        # Write-behind state: pending changes are saved when the timer fires, on flush() or at exit
+        self.save_delay = save_delay
+        self._write_lock = threading.Lock() # Keeps snapshots hitting the disk in order
+        self._save_timer = None
+        self._dirty = False
+        self._batch_depth = 0
+        self._flush_at_exit = False
         
         # Create app directory if it doesn't exist
         self.app_dir = self._get_app_directory()
@@ -24,6 +43,13 @@ class SettingsManager:
         
         # Load or create settings
         self.settings = self._load_settings()
+
+        # Recipe history (append-only; migrates the old recipe_history.json on first use)
+        self.history_store = RecipeHistoryStore(
+            self.get_recipe_history_file(),
+            legacy_file=self.app_dir / "recipe_history.json"
+        )
+        self._recipe_library = None
     
     def _get_app_directory(self):
         """Get the application directory based on the operating system"""
@@ -44,8 +70,13 @@ class SettingsManager:
             try:
                 with open(self.settings_file, 'r') as f:
                     return json.load(f)
-            except (json.JSONDecodeError, IOError):
-                # If file is corrupted, create new settings
+            except (json.JSONDecodeError, IOError) as e:
+                # If file is corrupted, keep a copy for inspection and create new settings
+                print(f"Error loading settings, restoring defaults: {e}")
+                try:
+                    os.replace(self.settings_file, self.settings_file.with_name(self.settings_file.name + ".corrupt"))
+                except OSError:
+                    pass
                 return self._create_default_settings()
         else:
             return self._create_default_settings()
@@ -60,7 +91,39 @@ class SettingsManager:
             "api_settings": {
                 "model": "gpt-4",
                 "temperature": 0.7,
-                "max_tokens": 2000
+                "max_tokens": 2000,
+                "stream": True,
+                "output_mode": "text", # "text" or "json" (structured output)
+                "backend": "openai", # "openai", "openai_compatible" (uses base_url) or "fake" (offline)
+                "base_url": "",
+                "fake_latency": 0.5, # Fake backend: seconds to the first token
+                "fake_tokens_per_second": 50,
+                "async_engine": False,
+                "max_concurrency": 8,
+                "coalesce_requests": True, # Identical concurrent requests share one API call
+                "coalesce_nonzero_temperature": True # Set to False to always sample separately when temperature > 0
+            },
+            "rate_limits": {
+                # Set these to your organization's limits; 0 disables a limit
+                "requests_per_minute": 0,
+                "tokens_per_minute": 0,
+                "max_retries": 5,
+                "base_delay": 1.0,
+                "max_delay": 60.0,
+                "failure_threshold": 5,
+                "reset_timeout": 30.0
+            },
+            "token_budget": {
+                # Limits in total (prompt + completion) tokens; 0 disables a limit
+                "session_limit": 0,
+                "daily_limit": 0,
+                "max_prompt_tokens": 8000
+            },
+            "cache_settings": {
+                "enabled": True,
+                "max_entries": 500,
+                "max_size_mb": 50,
+                "ttl_hours": 168
             },
             "has_api_key": False
         }
@@ -70,15 +133,73 @@ class SettingsManager:
         return default_settings
     
     def _save_settings(self, settings=None):
-        """Save settings to file"""
-        if settings is None:
-            settings = self.settings
-        
+        """
+        Save settings to file right away.
+        Written to a temporary file and renamed over the old one, so a crash mid-write never
+        leaves a truncated settings file behind.
+        """
+        with self._write_lock:
+            with self._lock:
+                if settings is None:
+                    settings = self.settings
+                    self._dirty = False
+                # Serialize under the lock so a concurrent set_setting can't change the dict mid-dump
+                data = json.dumps(settings, indent=2)
+
+            temp_file = self.settings_file.with_name(self.settings_file.name + ".tmp")
+            try:
+                with open(temp_file, 'w') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_file, self.settings_file)
+            except IOError as e:
+                print(f"Error saving settings: {e}")
+
+    def _schedule_save(self):
+        """Mark the settings as changed and make sure a write is coming"""
+        with self._lock:
+            self._dirty = True
+            if self._batch_depth or self._save_timer is not None:
+                return # batch_updates() or the running timer will pick the change up
+            if not self._flush_at_exit:
+                atexit.register(self.flush)
+                self._flush_at_exit = True
+            self._save_timer = threading.Timer(self.save_delay, self._save_pending)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _save_pending(self):
+        """Timer callback: write the changes collected since the timer started"""
+        with self._lock:
+            self._save_timer = None
+            if not self._dirty or self._batch_depth:
+                return
+        self._save_settings()
+
+    def flush(self):
+        """Write pending setting changes now (call before exiting)"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return
+        self._save_settings()
+
+    @contextmanager
+    def batch_updates(self):
+        """Group many set_setting calls into a single write when the block exits"""
+        with self._lock:
+            self._batch_depth += 1
         try:
-            with open(self.settings_file, 'w') as f:
-                json.dump(settings, f, indent=2)
-        except IOError as e:
-            print(f"Error saving settings: {e}")
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                outermost = self._batch_depth == 0
+            if outermost:
+                self.flush()
     
     def get_setting(self, key, default=None):
         """Get a setting value by key"""
@@ -97,17 +218,18 @@ class SettingsManager:
         keys = key.split('.')
         settings = self.settings
         
-        # Navigate to the nested dictionary
-        for k in keys[:-1]:
-            if k not in settings:
-                settings[k] = {}
-            settings = settings[k]
-        
-        # Set the value
-        settings[keys[-1]] = value
-        
-        # Save settings
-        self._save_settings()
+        with self._lock:
+            # Navigate to the nested dictionary
+            for k in keys[:-1]:
+                if k not in settings:
+                    settings[k] = {}
+                settings = settings[k]
+
+            # Set the value
+            settings[keys[-1]] = value
+
+        # Saved in the background (see flush)
+        self._schedule_save()
     
     def save_api_key(self, api_key):
         """Save the OpenAI API key securely"""
@@ -115,6 +237,8 @@ class SettingsManager:
             return False
         
         try:
+            import keyring # Loaded on demand; the keyring backends are slow to import
+
             # Store API key in the system's secure storage
             keyring.set_password(self.app_name, self.api_key_name, api_key)
             
@@ -132,6 +256,7 @@ class SettingsManager:
             return None
         
         try:
+            import keyring
             return keyring.get_password(self.app_name, self.api_key_name)
         except Exception as e:
             print(f"Error retrieving API key: {e}")
@@ -140,6 +265,7 @@ class SettingsManager:
     def delete_api_key(self):
         """Delete the stored API key"""
         try:
+            import keyring
             keyring.delete_password(self.app_name, self.api_key_name)
             self.settings["has_api_key"] = False
             self._save_settings()
@@ -152,67 +278,63 @@ class SettingsManager:
         """Check if an API key is stored"""
         return self.settings.get("has_api_key", False)
     
+    def get_response_cache_file(self):
+        """Get the path to the API response cache database"""
+        return self.app_dir / "response_cache.sqlite3"
+
+    def get_token_usage_file(self):
+        """Get the path to the per-day token usage totals"""
+        return self.app_dir / "token_usage.sqlite3"
+
+    def get_job_queue_file(self):
+        """Get the path to the durable batch job queue database"""
+        return self.app_dir / "job_queue.sqlite3"
+
+    def get_recipe_library_file(self):
+        """Get the path to the searchable recipe library database"""
+        return self.app_dir / "recipe_library.sqlite3"
+
+    def get_recipe_library(self):
+        """Get the recipe library, opening it (and importing existing history) on first use"""
+        with self._lock:
+            if self._recipe_library is None:
+                is_new = not self.get_recipe_library_file().exists()
+                self._recipe_library = RecipeLibrary(self.get_recipe_library_file())
+                if is_new:
+                    self._recipe_library.add_recipes(entry.get("recipe", {}) for entry in self.history_store.read())
+            return self._recipe_library
+
     def get_recipe_history_file(self):
         """Get the path to the recipe history file"""
-        return self.app_dir / "recipe_history.json"
+        return self.app_dir / "recipe_history.jsonl"
     
     def save_recipe_to_history(self, recipe):
         """Save a generated recipe to history"""
         if not self.get_setting("save_recipes", True):
             return
         
-        history_file = self.get_recipe_history_file()
-        history = []
-        
-        # Load existing history if available
-        if history_file.exists():
-            try:
-                with open(history_file, 'r') as f:
-                    history = json.load(f)
-            except (json.JSONDecodeError, IOError):
-                history = []
+        # Rendered HTML is derived from raw_text on demand; never persist it
+        recipe = {key: value for key, value in recipe.items() if key != "html_content"}
         
-        # Add new recipe to history
-        history.append({
+        self.history_store.append({
             "title": recipe.get("title", "Untitled Recipe"),
             "timestamp": recipe.get("timestamp"),
             "recipe": recipe
-        })
-        
-        # Limit history size
-        max_size = self.get_setting("recipe_history_size", 10)
-        if len(history) > max_size:
-            history = history[-max_size:]
-        
-        # Save history
-        try:
-            with open(history_file, 'w') as f:
-                json.dump(history, f, indent=2)
-        except IOError as e:
-            print(f"Error saving recipe history: {e}")
+        }, max_size=self.get_setting("recipe_history_size", 10))
+
+        # The library keeps every recipe for searching; history only keeps the most recent ones
+        self.get_recipe_library().add_recipe(recipe)
     
     def get_recipe_history(self):
         """Get the recipe history"""
-        history_file = self.get_recipe_history_file()
-        
-        if not history_file.exists():
-            return []
-        
-        try:
-            with open(history_file, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return []
+        return self.history_store.read(max_size=self.get_setting("recipe_history_size", 10))
     
     def clear_recipe_history(self):
-        """Clear the recipe history"""
-        history_file = self.get_recipe_history_file()
-        
-        if history_file.exists():
-            try:
-                os.remove(history_file)
-                return True
-            except IOError:
-                return False
-        
-        return True
\ No newline at end of file
+        """Clear the recipe history and the searchable library of every saved recipe"""
+        cleared = self.history_store.clear()
+        try:
+            self.get_recipe_library().clear()
+        except sqlite3.Error as e:
+            print(f"Error clearing recipe library: {e}")
+            return False
+        return cleared
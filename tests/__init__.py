@@ -0,0 +1,2 @@
+# Tests for the Michelin Star Recipe Generator
+# Run from the repository root with: python -m pytest -q
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+from ..async_engine import AsyncRecipeEngine
+from ..backends import CANNED_RECIPES, FakeBackend
+from ..recipe_generator import RecipeGenerator, with_default_params
+from ..settings_manager import SettingsManager
+from ..token_budget import TokenBudget
+
+
+class AsyncTokenBudgetTest(unittest.TestCase):
+    """Requests waiting for a concurrency slot must not hold token budget"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.old_home = os.environ.get("HOME")
+        os.environ["HOME"] = self.temp_dir.name
+
+        self.settings = SettingsManager(save_delay=0)
+        self.settings.set_setting("cache_settings.enabled", False)
+        self.settings.set_setting("api_settings.max_tokens", 8000)
+        self.settings.set_setting("save_recipes", False)
+
+        backend = FakeBackend(latency=0.02, recipes=CANNED_RECIPES[:1])
+        self.generator = RecipeGenerator(self.settings, backend=backend, connect=False)
+        self.params_list = [with_default_params({"servings": servings}) for servings in range(1, 7)]
+
+    def tearDown(self):
+        self.settings.flush()
+        if self.old_home is None:
+            del os.environ["HOME"]
+        else:
+            os.environ["HOME"] = self.old_home
+        self.temp_dir.cleanup()
+
+    def _tight_budget(self, max_concurrency):
+        """
+        A session limit that fits every request run max_concurrency at a time, but not
+        a reservation for every request at once
+        """
+        backend = self.generator.backend
+        used = 0
+        reserved = 0
+        for params in self.params_list:
+            kwargs = self.generator._completion_kwargs(self.generator._construct_prompt(params))
+            usage = backend.usage(kwargs["messages"], backend.completion_text(kwargs["messages"]))
+            used += usage.total_tokens
+            estimate = self.generator.token_budget.estimate(
+                kwargs["messages"], kwargs["model"], kwargs["max_completion_tokens"]
+            )
+            reserved = max(reserved, estimate["total_tokens"])
+        limit = used + max_concurrency * reserved
+        self.assertLess(limit, len(self.params_list) * reserved)
+        return TokenBudget(self.settings.get_token_usage_file(), session_limit=limit)
+
+    def _generate_all(self, stream):
+        self.settings.set_setting("api_settings.stream", stream)
+        self.generator.token_budget = self._tight_budget(max_concurrency=2)
+        engine = AsyncRecipeEngine(self.generator, max_concurrency=2)
+
+        async def run():
+            try:
+                return [result async for result in engine.agenerate_many(self.params_list)]
+            finally:
+                await engine.aclose()
+
+        return asyncio.run(run())
+
+    def test_queued_requests_do_not_reserve_tokens(self):
+        results = self._generate_all(stream=False)
+        self.assertEqual([result.get("error") for result in results], [None] * len(self.params_list))
+
+    def test_queued_streams_do_not_reserve_tokens(self):
+        results = self._generate_all(stream=True)
+        self.assertEqual([result.get("error") for result in results], [None] * len(self.params_list))
+
+
+
+class AsyncClientSetupTest(unittest.TestCase):
+    """Setting up the client (a keyring lookup) must not stall the event loop"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.old_home = os.environ.get("HOME")
+        os.environ["HOME"] = self.temp_dir.name
+
+        self.settings = SettingsManager(save_delay=0)
+        self.settings.set_setting("save_recipes", False)
+
+        def slow_keyring():
+            time.sleep(0.3)
+            return None
+
+        self.settings.get_api_key = slow_keyring
+        self.generator = RecipeGenerator(self.settings, backend=FakeBackend(), connect=False)
+
+    def tearDown(self):
+        self.settings.flush()
+        if self.old_home is None:
+            del os.environ["HOME"]
+        else:
+            os.environ["HOME"] = self.old_home
+        self.temp_dir.cleanup()
+
+    def test_first_request_sets_up_client_off_the_loop(self):
+        engine = AsyncRecipeEngine(self.generator)
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        async def scenario():
+            ticking = asyncio.ensure_future(ticker())
+            try:
+                return await engine.agenerate_recipe(with_default_params({"servings": 2}))
+            finally:
+                ticking.cancel()
+                await engine.aclose()
+
+        recipe = asyncio.run(scenario())
+        self.assertTrue(recipe["raw_text"])
+        self.assertLess(max(later - earlier for earlier, later in zip(ticks, ticks[1:])), 0.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import types
+import unittest
+
+from ..backends import FakeBackend, ModelBackend, OpenAIBackend, OpenAICompatibleBackend
+from ..recipe_generator import RecipeGenerator, with_default_params
+from ..settings_manager import SettingsManager
+
+
+class ModelBackendTest(unittest.TestCase):
+
+    def test_backend_must_create_both_clients(self):
+        class SyncOnlyBackend(ModelBackend):
+            def create_client(self, api_key):
+                return None
+
+        with self.assertRaises(TypeError):
+            ModelBackend()
+        with self.assertRaises(TypeError):
+            SyncOnlyBackend()
+
+    def test_bundled_backends_are_complete(self):
+        for backend_class in (OpenAIBackend, OpenAICompatibleBackend, FakeBackend):
+            self.assertFalse(backend_class.__abstractmethods__, backend_class.__name__)
+
+
+class UnreachableClient:
+    """An OpenAI-style client whose every request fails"""
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = types.SimpleNamespace(completions=self)
+
+    def create(self, **kwargs):
+        self.calls += 1
+        raise RuntimeError("API unavailable")
+
+
+class BackendCacheIsolationTest(unittest.TestCase):
+    """A cached reply from one backend is never served by another"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.old_home = os.environ.get("HOME")
+        os.environ["HOME"] = self.temp_dir.name
+
+        self.settings = SettingsManager(save_delay=0)
+        self.settings.set_setting("save_recipes", False)
+        self.settings.set_setting("api_settings.stream", False)
+        self.params = with_default_params({"servings": 2})
+
+    def tearDown(self):
+        self.settings.flush()
+        if self.old_home is None:
+            del os.environ["HOME"]
+        else:
+            os.environ["HOME"] = self.old_home
+        self.temp_dir.cleanup()
+
+    def test_endpoints(self):
+        self.assertEqual(OpenAIBackend().endpoint, "openai")
+        self.assertEqual(FakeBackend().endpoint, "fake")
+        self.assertEqual(OpenAICompatibleBackend("http://localhost:8000/v1/").endpoint,
+                         "openai_compatible:http://localhost:8000/v1")
+
+    def test_fake_reply_is_not_served_for_openai(self):
+        RecipeGenerator(self.settings, backend=FakeBackend(), connect=False).generate_recipe(self.params)
+
+        generator = RecipeGenerator(self.settings, backend=OpenAIBackend(), connect=False)
+        generator.client = UnreachableClient()
+        with self.assertRaises(Exception):
+            generator.generate_recipe(self.params)
+        self.assertEqual(generator.client.calls, 1)
+
+    def test_compatible_servers_do_not_share_replies(self):
+        first = RecipeGenerator(self.settings, backend=OpenAICompatibleBackend("http://a.local/v1"), connect=False)
+        second = RecipeGenerator(self.settings, backend=OpenAICompatibleBackend("http://b.local/v1"), connect=False)
+        prompt = first._construct_prompt(self.params)
+        self.assertNotEqual(first._cache_key(prompt), second._cache_key(prompt))
+
+
+if __name__ == "__main__":
+    unittest.main()
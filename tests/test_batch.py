@@ -0,0 +1,91 @@
+import asyncio
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+from pathlib import Path
+
+from ..async_engine import AsyncRecipeEngine
+from ..backends import FakeBackend
+from ..batch import read_params_file, run_batch, run_batch_async
+from ..recipe_generator import DEFAULT_PARAMS, RecipeGenerator
+from ..settings_manager import SettingsManager
+
+
+class ReadParamsFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "params.jsonl"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_missing_keys_use_defaults_and_blank_lines_are_skipped(self):
+        self.path.write_text('{"servings": 6}\n\n{"michelin_stars": 3}\n', encoding="utf-8")
+        params = list(read_params_file(self.path))
+        self.assertEqual(len(params), 2)
+        self.assertEqual(params[0]["servings"], 6)
+        self.assertEqual(params[1]["michelin_stars"], 3)
+        self.assertEqual(params[1]["servings"], DEFAULT_PARAMS["servings"])
+
+    def test_invalid_line_names_its_line_number(self):
+        self.path.write_text('{"servings": 6}\n[1, 2]\n', encoding="utf-8")
+        with self.assertRaisesRegex(ValueError, ":2: expected a JSON object"):
+            list(read_params_file(self.path))
+
+
+class BatchRunTest(unittest.TestCase):
+    """Both batch paths read their input lazily, a bounded number of parameter sets ahead"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.old_home = os.environ.get("HOME")
+        os.environ["HOME"] = self.temp_dir.name
+
+        self.settings = SettingsManager(save_delay=0)
+        self.settings.set_setting("cache_settings.enabled", False)
+        self.settings.set_setting("save_recipes", False)
+        self.generator = RecipeGenerator(self.settings, backend=FakeBackend(latency=0.01), connect=False)
+        self.pulled = 0
+        self.max_ahead = 0
+        self.output = io.StringIO()
+
+    def tearDown(self):
+        self.settings.flush()
+        if self.old_home is None:
+            del os.environ["HOME"]
+        else:
+            os.environ["HOME"] = self.old_home
+        self.temp_dir.cleanup()
+
+    def params_iter(self, count):
+        """Parameter sets that record how far ahead of the written results they were pulled"""
+        for servings in range(1, count + 1):
+            written = len(self.output.getvalue().splitlines())
+            self.pulled += 1
+            self.max_ahead = max(self.max_ahead, self.pulled - written)
+            yield dict(DEFAULT_PARAMS, servings=servings)
+
+    def check_output(self, succeeded, failed, count):
+        self.assertEqual((succeeded, failed), (count, 0))
+        results = [json.loads(line) for line in self.output.getvalue().splitlines()]
+        self.assertEqual(sorted(result["index"] for result in results), list(range(count)))
+        self.assertLessEqual(self.max_ahead, 2)
+
+    def test_threaded_batch(self):
+        with redirect_stderr(io.StringIO()):
+            succeeded, failed = run_batch(self.generator, self.params_iter(8), self.output, max_concurrency=2)
+        self.check_output(succeeded, failed, 8)
+
+    def test_async_batch(self):
+        engine = AsyncRecipeEngine(self.generator, max_concurrency=2)
+        with redirect_stderr(io.StringIO()):
+            succeeded, failed = asyncio.run(run_batch_async(engine, self.params_iter(8), self.output))
+        self.check_output(succeeded, failed, 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import unittest
+
+from ..benchmarks import run_benchmarks
+
+
+def result(benchmark, case, median_s):
+    return {"benchmark": benchmark, "case": case, "median_s": median_s}
+
+
+class CompareTest(unittest.TestCase):
+
+    def test_only_slowdowns_beyond_the_tolerance_are_regressions(self):
+        baseline = {"results": [result("prompt", "memoized", 1.0), result("format", "huge", 1.0)]}
+        results = {"results": [result("prompt", "memoized", 1.2), result("format", "huge", 1.5),
+                               result("new", "case", 9.0)]}
+        regressions = run_benchmarks.compare(results, baseline, tolerance=0.25)
+        self.assertEqual([(item["benchmark"], item["slowdown"]) for item in regressions], [("format", 1.5)])
+
+    def test_startup_budget(self):
+        results = {"results": [result("cold_startup", "main_window_shown", 2.0)]}
+        self.assertEqual(run_benchmarks.check_startup(results, 3.0), [])
+        self.assertEqual(run_benchmarks.check_startup(results, 1.0)[0]["slowdown"], 2.0)
+
+    def test_summarize(self):
+        summary = run_benchmarks.summarize("prompt", "cold", [0.3, 0.1, 0.2], scale=1)
+        self.assertEqual((summary["iterations"], summary["median_s"], summary["min_s"]), (3, 0.2, 0.1))
+        self.assertEqual(summary["scale"], 1)
+
+
+class QuickRunTest(unittest.TestCase):
+
+    def setUp(self):
+        self.saved_env = {key: os.environ.get(key) for key in ("HOME", "USERPROFILE", "QT_QPA_PLATFORM")}
+
+    def tearDown(self):
+        for key, value in self.saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    def test_quick_run_covers_every_stage(self):
+        results = run_benchmarks.run(quick=True, include_startup=False)
+        benchmarks = {item["benchmark"] for item in results["results"]}
+        self.assertEqual(benchmarks, {"construct_prompt", "process_recipe", "format_recipe_as_html",
+                                      "save_recipe_to_history", "settings_manager_load", "set_setting",
+                                      "generate_recipe"})
+        self.assertTrue(all(item["median_s"] >= 0 for item in results["results"]))
+        self.assertEqual(os.environ.get("HOME"), self.saved_env["HOME"])
+
+
+if __name__ == "__main__":
+    unittest.main()
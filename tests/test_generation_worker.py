@@ -0,0 +1,67 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+if importlib.util.find_spec("PyQt5") is not None:
+    from ..backends import FakeBackend
+    from ..generation_worker import GenerationJob, GenerationService
+    from ..recipe_generator import RecipeGenerator, with_default_params
+    from ..settings_manager import SettingsManager
+
+
+@unittest.skipIf(importlib.util.find_spec("PyQt5") is None, "PyQt5 is not installed")
+class GenerationJobTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.old_home = os.environ.get("HOME")
+        os.environ["HOME"] = self.temp_dir.name
+
+        self.settings = SettingsManager(save_delay=0)
+        self.settings.set_setting("save_recipes", False)
+        self.generator = RecipeGenerator(self.settings, backend=FakeBackend(), connect=False)
+        self.params = with_default_params({"servings": 2})
+
+    def tearDown(self):
+        self.settings.flush()
+        if self.old_home is None:
+            del os.environ["HOME"]
+        else:
+            os.environ["HOME"] = self.old_home
+        self.temp_dir.cleanup()
+
+    def run_job(self, job):
+        """Run a job on this thread and collect what it reported"""
+        events = []
+        job.signals.delta.connect(lambda text: events.append(("delta", text)))
+        job.signals.finished.connect(lambda recipe: events.append(("finished", recipe)))
+        job.signals.error.connect(lambda message: events.append(("error", message)))
+        job.signals.cancelled.connect(lambda: events.append(("cancelled", None)))
+        job.run()
+        return events
+
+    def test_finished_job_reports_the_recipe(self):
+        events = self.run_job(GenerationJob(self.generator, self.params))
+        kind, recipe = events[-1]
+        self.assertEqual(kind, "finished")
+        self.assertTrue(recipe["raw_text"])
+        deltas = "".join(text for kind, text in events if kind == "delta")
+        self.assertEqual(deltas, recipe["raw_text"])
+
+    def test_cancelled_job_reports_cancellation(self):
+        job = GenerationJob(self.generator, self.params)
+        job.cancel()
+        self.assertEqual(self.run_job(job), [("cancelled", None)])
+
+    def test_service_tracks_and_cancels_jobs(self):
+        service = GenerationService(self.generator, max_workers=1)
+        job = service.submit(self.params)
+        self.assertIn(job, service.active_jobs())
+        service.cancel_all()
+        self.assertTrue(job.is_cancelled())
+        self.assertTrue(service.wait_for_done(5000))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from ..backends import FakeBackend
+from ..job_queue import JobQueue
+from ..recipe_generator import RecipeGenerator, with_default_params
+from ..settings_manager import SettingsManager
+
+SETTINGS = {"endpoint": "fake", "model": "gpt-4", "temperature": 0.7, "max_tokens": 2000, "output_mode": "text"}
+
+
+def menu(*servings):
+    return [with_default_params({"servings": count}) for count in servings]
+
+
+class JobQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.queue = JobQueue(Path(self.temp_dir.name) / "job_queue.sqlite3")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_enqueue_skips_prompts_already_queued(self):
+        self.assertEqual(self.queue.enqueue("menu", menu(1, 2)), (2, 0))
+        self.assertEqual(self.queue.enqueue("menu", menu(2, 3)), (1, 1))
+        self.assertEqual(self.queue.enqueue("other", menu(2)), (1, 0)) # Batches are separate
+        self.assertEqual(self.queue.counts("menu")["pending"], 3)
+
+    def test_claim_oldest_first(self):
+        self.queue.enqueue("menu", menu(1, 2))
+        first_id, first = self.queue.claim("menu")
+        second_id, second = self.queue.claim("menu")
+        self.assertEqual((first["servings"], second["servings"]), (1, 2))
+        self.assertIsNone(self.queue.claim("menu"))
+        self.assertEqual(self.queue.counts("menu")["running"], 2)
+
+    def test_concurrent_workers_never_claim_the_same_job(self):
+        self.queue.enqueue("menu", menu(*range(1, 21)))
+        claimed = []
+
+        def worker():
+            while True:
+                job = self.queue.claim("menu")
+                if job is None:
+                    return
+                claimed.append(job[0])
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(claimed), sorted(set(claimed)))
+        self.assertEqual(len(claimed), 20)
+
+    def test_recover_and_retry(self):
+        self.queue.enqueue("menu", menu(1, 2))
+        running_id, _ = self.queue.claim("menu")
+        failed_id, _ = self.queue.claim("menu")
+        self.queue.fail(failed_id, "API unavailable")
+
+        self.assertEqual(self.queue.recover("menu"), 1)
+        self.assertEqual(self.queue.claim("menu")[0], running_id)
+        self.assertEqual(self.queue.retry_failed("menu"), 1)
+        self.assertEqual(self.queue.claim("menu")[0], failed_id)
+
+    def test_results_of_finished_jobs(self):
+        self.queue.enqueue("menu", menu(1, 2))
+        job_id, params = self.queue.claim("menu")
+        self.queue.complete(job_id, {"title": "Lobster"})
+        results = list(self.queue.results("menu"))
+        self.assertEqual(results, [{"job_id": job_id, "params": params, "recipe": {"title": "Lobster"}}])
+        self.assertEqual(self.queue.counts("menu"), {"pending": 1, "running": 0, "done": 1, "failed": 0})
+
+    def test_batch_refuses_different_generation_settings(self):
+        self.queue.check_settings("menu", SETTINGS)
+        self.queue.check_settings("menu", dict(SETTINGS)) # Same settings: fine
+        with self.assertRaisesRegex(ValueError, "model 'gpt-4' -> 'gpt-4o'"):
+            self.queue.check_settings("menu", dict(SETTINGS, model="gpt-4o"))
+        with self.assertRaisesRegex(ValueError, "endpoint"):
+            JobQueue(self.queue.db_file).check_settings("menu", dict(SETTINGS, endpoint="openai"))
+        self.queue.check_settings("other", dict(SETTINGS, model="gpt-4o"))
+
+
+class JobQueueRunTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.old_home = os.environ.get("HOME")
+        os.environ["HOME"] = self.temp_dir.name
+
+        self.settings = SettingsManager(save_delay=0)
+        self.settings.set_setting("save_recipes", False)
+        self.generator = RecipeGenerator(self.settings, backend=FakeBackend(), connect=False)
+        self.queue = JobQueue.from_settings(self.settings)
+
+    def tearDown(self):
+        self.settings.flush()
+        if self.old_home is None:
+            del os.environ["HOME"]
+        else:
+            os.environ["HOME"] = self.old_home
+        self.temp_dir.cleanup()
+
+    def test_run_completes_every_job(self):
+        self.queue.enqueue("menu", menu(1, 2, 3))
+        results = list(self.queue.run(self.generator, "menu", max_concurrency=2))
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all("recipe" in result for result in results))
+        self.assertEqual(self.queue.counts("menu")["done"], 3)
+
+    def test_run_refuses_a_batch_started_with_another_model(self):
+        self.queue.enqueue("menu", menu(1))
+        list(self.queue.run(self.generator, "menu"))
+
+        self.settings.set_setting("api_settings.model", "gpt-4o")
+        self.queue.enqueue("menu", menu(2))
+        with self.assertRaises(ValueError):
+            list(self.queue.run(self.generator, "menu"))
+        self.assertEqual(self.queue.counts("menu")["pending"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
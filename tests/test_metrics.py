@@ -0,0 +1,86 @@
+import json
+import unittest
+
+from ..metrics import Counter, Histogram, MetricsRegistry, default_registry, REQUESTS_TOTAL
+
+
+class CounterTest(unittest.TestCase):
+
+    def test_counts_per_label_set(self):
+        counter = Counter("requests_total")
+        counter.inc(outcome="success")
+        counter.inc(2, outcome="success")
+        counter.inc(outcome="error")
+        self.assertEqual(counter.value(outcome="success"), 3)
+        self.assertEqual(counter.value(outcome="error"), 1)
+        self.assertEqual(counter.value(outcome="cancelled"), 0)
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_summary(self):
+        histogram = Histogram("seconds", buckets=(1, 5))
+        for value in (0.5, 2, 3, 10):
+            histogram.observe(value, stage="api")
+        summary = histogram.summary(stage="api")
+        self.assertEqual(summary["count"], 4)
+        self.assertEqual(summary["sum"], 15.5)
+        self.assertEqual(summary["p50"], 2)
+        self.assertEqual(summary["p99"], 10)
+        self.assertIsNone(histogram.summary(stage="other"))
+
+    def test_prometheus_buckets_are_cumulative(self):
+        histogram = Histogram("seconds", "Help text", buckets=(1, 5))
+        for value in (0.5, 2, 3, 10):
+            histogram.observe(value, stage="api")
+        lines = histogram.to_prometheus()
+        self.assertIn('seconds_bucket{stage="api",le="1"} 1', lines)
+        self.assertIn('seconds_bucket{stage="api",le="5"} 3', lines)
+        self.assertIn('seconds_bucket{stage="api",le="+Inf"} 4', lines)
+        self.assertIn('seconds_count{stage="api"} 4', lines)
+
+    def test_label_values_are_escaped(self):
+        histogram = Histogram("seconds")
+        histogram.observe(1, model='a"b')
+        self.assertIn('seconds_count{model="a\\"b"} 1', histogram.to_prometheus())
+
+
+class MetricsRegistryTest(unittest.TestCase):
+
+    def test_metrics_are_shared_by_name(self):
+        registry = MetricsRegistry()
+        self.assertIs(registry.counter("total"), registry.counter("total"))
+        with self.assertRaises(ValueError):
+            registry.histogram("total")
+
+    def test_json_dump(self):
+        registry = MetricsRegistry()
+        registry.counter("total", "Things").inc(kind="a")
+        dump = json.loads(registry.to_json())
+        self.assertEqual(dump["total"]["type"], "counter")
+        self.assertEqual(dump["total"]["series"], [{"labels": {"kind": "a"}, "value": 1}])
+
+    def test_reset_zeroes_metrics_in_place(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("total")
+        histogram = registry.histogram("seconds")
+        counter.inc()
+        histogram.observe(1)
+
+        registry.reset()
+        self.assertEqual(counter.value(), 0)
+        self.assertIsNone(histogram.summary())
+
+        # Metrics held by reference still record into what the registry exports
+        counter.inc()
+        self.assertIs(registry.counter("total"), counter)
+        self.assertEqual(json.loads(registry.to_json())["total"]["series"], [{"labels": {}, "value": 1}])
+
+    def test_reset_of_default_registry_keeps_pipeline_metrics_exported(self):
+        default_registry.reset()
+        REQUESTS_TOTAL.inc(model="test-model", outcome="success")
+        self.assertIn('recipe_requests_total{model="test-model",outcome="success"} 1', default_registry.to_prometheus())
+
+
+if __name__ == "__main__":
+    unittest.main()
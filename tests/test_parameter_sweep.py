@@ -0,0 +1,71 @@
+import unittest
+
+from ..parameter_sweep import TIER_REPRESENTATIVES, ParameterSweep, expand_axis
+from ..prompt_templates import prompt_hash
+
+
+class ExpandAxisTest(unittest.TestCase):
+
+    def test_specifications(self):
+        self.assertEqual(expand_axis({"start": 0, "stop": 100, "step": 25}), [0, 25, 50, 75, 100])
+        self.assertEqual(expand_axis({"Vegetarian", "Gluten-free"}), ["Gluten-free", "Vegetarian"])
+        self.assertEqual(expand_axis("Date night"), ["Date night"])
+        self.assertEqual(expand_axis((1, 2)), [1, 2])
+
+    def test_non_positive_step(self):
+        with self.assertRaises(ValueError):
+            expand_axis({"stop": 10, "step": 0})
+
+
+class ParameterSweepTest(unittest.TestCase):
+
+    def test_every_combination_without_duplicates(self):
+        sweep = ParameterSweep({"michelin_stars": [1, 2, 3], "servings": [2, 4]})
+        params = list(sweep)
+        self.assertEqual(sweep.size(), 6)
+        self.assertEqual((len(params), sweep.generated, sweep.duplicates), (6, 6, 0))
+        self.assertEqual({(item["michelin_stars"], item["servings"]) for item in params},
+                         {(stars, servings) for stars in (1, 2, 3) for servings in (2, 4)})
+
+    def test_combinations_with_the_same_prompt_are_skipped(self):
+        # Only "everyday" changes the prompt; any other ingredient type reads as luxury
+        sweep = ParameterSweep({"ingredient_type": ["everyday", "luxury", "exotic"], "seasonal": [False, 0, True]})
+        params = list(sweep)
+        self.assertEqual((sweep.generated, sweep.duplicates), (9, 5))
+        self.assertEqual(len({prompt_hash(item) for item in params}), 4)
+
+    def test_chef_axis_zero_leaves_the_chef_out(self):
+        sweep = ParameterSweep({"chefs.thomas_keller": [0, 40]}, base={"chefs": {"gordon_ramsay": 80}})
+        self.assertEqual([item["chefs"] for item in sweep],
+                         [{"gordon_ramsay": 80}, {"gordon_ramsay": 80, "thomas_keller": 40}])
+
+    def test_collapsing_influence_tiers(self):
+        axes = {"chefs.thomas_keller": {"start": 10, "stop": 100, "step": 10}}
+        self.assertEqual(len(list(ParameterSweep(axes))), 10)
+
+        sweep = ParameterSweep(axes, collapse_influence_tiers=True)
+        params = list(sweep)
+        self.assertEqual([item["chefs"]["thomas_keller"] for item in params],
+                         [TIER_REPRESENTATIVES[tier] for tier in ("low", "medium", "high")])
+        self.assertEqual(sweep.duplicates, 7)
+
+    def test_base_is_not_modified(self):
+        sweep = ParameterSweep({"equipment": [["Grill"]]}, base={"equipment": ["Oven"]})
+        params = next(iter(sweep))
+        params["equipment"].append("Smoker")
+        self.assertEqual(sweep.base["equipment"], ["Oven"])
+
+    def test_unknown_axis(self):
+        with self.assertRaisesRegex(ValueError, "Unknown sweep parameter: spiciness"):
+            ParameterSweep({"spiciness": [1, 2]})
+
+    def test_from_dict(self):
+        sweep = ParameterSweep.from_dict({"axes": {"servings": {"start": 2, "stop": 6, "step": 2}},
+                                          "base": {"michelin_stars": 3}})
+        self.assertEqual([(item["servings"], item["michelin_stars"]) for item in sweep], [(2, 3), (4, 3), (6, 3)])
+        with self.assertRaises(ValueError):
+            ParameterSweep.from_dict({"servings": [2]})
+
+
+if __name__ == "__main__":
+    unittest.main()
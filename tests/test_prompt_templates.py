@@ -0,0 +1,134 @@
+import random
+import unittest
+
+from ..chef_profiles import CHEF_INFLUENCE_DESCRIPTIONS, CHEF_PROFILES
+from ..prompt_templates import (FINAL_INSTRUCTIONS, build_prompt, canonical_params, clear_cache, influence_tier,
+                                prompt_hash)
+from ..recipe_generator import with_default_params
+
+
+def legacy_prompt(params):
+    """The prompt builder prompt_templates replaced, string concatenation and all"""
+    prompt = "Create a Michelin-star level recipe with the following specifications:\n\n"
+    if params["chefs"]:
+        prompt += "CHEF INFLUENCES:\n"
+        for chef_id, influence in params["chefs"].items():
+            chef = CHEF_PROFILES.get(chef_id, {})
+            influence_level = "low"
+            if influence >= 70:
+                influence_level = "high"
+            elif influence >= 30:
+                influence_level = "medium"
+            influence_desc = CHEF_INFLUENCE_DESCRIPTIONS.get(chef_id, {}).get(influence_level, "")
+            prompt += f"- {chef.get('name', 'Unknown Chef')} ({influence}% influence): {influence_desc}\n"
+            prompt += f"  Known for: {chef.get('signature', '')}\n"
+    else:
+        prompt += "CHEF INFLUENCES: No specific chef selected. Create a general Michelin-star level recipe.\n"
+
+    prompt += f"\nMICHELIN STAR LEVEL: {params['michelin_stars']} star"
+    if params['michelin_stars'] == 1:
+        prompt += " - Excellent cooking, worth a stop"
+    elif params['michelin_stars'] == 2:
+        prompt += " - Excellent cooking, worth a detour"
+    elif params['michelin_stars'] == 3:
+        prompt += " - Exceptional cuisine, worth a special journey"
+    prompt += "\n"
+
+    prompt += "\nINGREDIENT TYPE: "
+    if params['ingredient_type'] == 'everyday':
+        prompt += "Everyday ingredients that are commonly available in well-stocked supermarkets"
+    else:
+        prompt += "Luxurious, hard-to-find ingredients that might require specialty stores or online ordering"
+    if params['seasonal']:
+        prompt += "\nPrioritize seasonal ingredients appropriate for the current time of year"
+    prompt += "\n"
+
+    prompt += f"\nGASTRONOMY LEVEL: {params['gastronomy_level']}% modern techniques"
+    if params['gastronomy_level'] < 30:
+        prompt += " (mostly traditional cooking methods)"
+    elif params['gastronomy_level'] > 70:
+        prompt += " (significant use of molecular gastronomy and modern techniques)"
+    else:
+        prompt += " (balanced mix of traditional and modern techniques)"
+    if params['specialized_equipment']:
+        prompt += "\nSpecialized equipment is available (sous vide, anti-griddle, etc.)"
+    prompt += "\n"
+
+    if params['dietary_restrictions']:
+        prompt += "\nDIETARY RESTRICTIONS: " + ", ".join(params['dietary_restrictions']) + "\n"
+    prompt += f"\nOCCASION: {params['occasion']}\n"
+    prompt += f"\nSERVINGS: {params['servings']}\n"
+    prompt += "\nTIME CONSTRAINTS:"
+    prompt += f"\n- Preparation time: approximately {params['prep_time']} minutes"
+    prompt += f"\n- Cooking time: approximately {params['cook_time']} minutes\n"
+    if params['equipment']:
+        prompt += "\nAVAILABLE EQUIPMENT: " + ", ".join(params['equipment']) + "\n"
+    return prompt + FINAL_INSTRUCTIONS
+
+
+def random_params(rng):
+    chef_ids = rng.sample(sorted(CHEF_PROFILES) + ["retired_chef"], rng.randint(0, 3))
+    return with_default_params({
+        "chefs": {chef_id: rng.choice([0, 10, 29, 30, 69, 70, 100]) for chef_id in chef_ids},
+        "michelin_stars": rng.randint(1, 3),
+        "ingredient_type": rng.choice(["everyday", "luxury"]),
+        "seasonal": rng.random() < 0.5,
+        "gastronomy_level": rng.choice([0, 29, 30, 50, 70, 71, 100]),
+        "specialized_equipment": rng.random() < 0.5,
+        "dietary_restrictions": rng.sample(["Vegetarian", "Gluten-free", "Nut-free"], rng.randint(0, 2)),
+        "occasion": rng.choice(["Everyday Meal", "Date night"]),
+        "servings": rng.randint(1, 8),
+        "prep_time": rng.choice([15, 60, 120]),
+        "cook_time": rng.choice([15, 60, 120]),
+        "equipment": rng.sample(["Oven", "Stovetop", "Grill"], rng.randint(0, 3))
+    })
+
+
+class PromptTemplatesTest(unittest.TestCase):
+
+    def setUp(self):
+        clear_cache()
+
+    def test_prompt_matches_the_legacy_builder(self):
+        rng = random.Random(21)
+        for _ in range(300):
+            params = random_params(rng)
+            self.assertEqual(build_prompt(params), legacy_prompt(params))
+            self.assertEqual(build_prompt(params), legacy_prompt(params)) # Memoized
+
+    def test_hash_follows_the_prompt(self):
+        params = with_default_params({})
+        self.assertEqual(prompt_hash(params), prompt_hash(with_default_params({})))
+        self.assertNotEqual(prompt_hash(params), prompt_hash(with_default_params({"servings": 2})))
+
+    def test_ignored_differences_hash_the_same(self):
+        everyday = with_default_params({"seasonal": 0, "ingredient_type": "everyday"})
+        self.assertEqual(prompt_hash(everyday), prompt_hash(with_default_params({"seasonal": False})))
+        self.assertEqual(prompt_hash(with_default_params({"ingredient_type": "luxury"})),
+                         prompt_hash(with_default_params({"ingredient_type": "seasonal luxury"})))
+
+    def test_int_and_float_values_are_distinct(self):
+        self.assertNotEqual(canonical_params(with_default_params({"servings": 1})),
+                            canonical_params(with_default_params({"servings": 1.0})))
+        self.assertIn("SERVINGS: 1.0\n", build_prompt(with_default_params({"servings": 1.0})))
+
+    def test_chef_order_is_kept(self):
+        first = with_default_params({"chefs": {"thomas_keller": 50, "gordon_ramsay": 50}})
+        second = with_default_params({"chefs": {"gordon_ramsay": 50, "thomas_keller": 50}})
+        self.assertNotEqual(prompt_hash(first), prompt_hash(second))
+
+    def test_unknown_chef(self):
+        self.assertIn("- Unknown Chef (80% influence)",
+                      build_prompt(with_default_params({"chefs": {"retired_chef": 80}})))
+
+    def test_missing_parameter_raises_key_error(self):
+        with self.assertRaises(KeyError):
+            build_prompt({"chefs": {}})
+
+    def test_influence_tiers(self):
+        self.assertEqual([influence_tier(value) for value in (0, 29, 30, 69, 70, 100)],
+                         ["low", "low", "medium", "medium", "high", "high"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+
+from ..backends import FakeBackend
+from ..recipe_generator import GenerationCancelled, RecipeGenerator, with_default_params
+from ..recipe_renderer import render_recipe_html
+from ..settings_manager import SettingsManager
+
+
+class GeneratorTestCase(unittest.TestCase):
+    """Runs a generator against the offline fake backend with settings in a temporary home directory"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.old_home = os.environ.get("HOME")
+        os.environ["HOME"] = self.temp_dir.name
+
+        self.settings = SettingsManager(save_delay=0)
+        self.settings.set_setting("save_recipes", False)
+        self.params = with_default_params({"servings": 2})
+
+    def tearDown(self):
+        self.settings.flush()
+        if self.old_home is None:
+            del os.environ["HOME"]
+        else:
+            os.environ["HOME"] = self.old_home
+        self.temp_dir.cleanup()
+
+    def make_generator(self, **backend_options):
+        return RecipeGenerator(self.settings, backend=FakeBackend(**backend_options), connect=False)
+
+
+class StreamingTest(GeneratorTestCase):
+
+    def test_deltas_add_up_to_the_recipe(self):
+        generator = self.make_generator()
+        deltas = []
+        recipe = generator.generate_recipe(self.params, delta_callback=deltas.append)
+        self.assertGreater(len(deltas), 10)
+        self.assertEqual("".join(deltas), recipe["raw_text"])
+
+    def test_cache_hit_is_delivered_as_one_delta(self):
+        generator = self.make_generator()
+        first = generator.generate_recipe(self.params)
+        deltas = []
+        second = generator.generate_recipe(self.params, delta_callback=deltas.append)
+        self.assertEqual(deltas, [first["raw_text"]])
+        self.assertEqual(second["raw_text"], first["raw_text"])
+
+    def test_stream_recipe_yields_raw_text(self):
+        generator = self.make_generator()
+        text = "".join(generator.stream_recipe(self.params, bypass_cache=True))
+        self.assertEqual(text, generator.generate_recipe(self.params, bypass_cache=True)["raw_text"])
+
+    def test_cancelling_mid_stream(self):
+        generator = self.make_generator(tokens_per_second=2000)
+        cancel_event = threading.Event()
+        deltas = []
+
+        def on_delta(delta):
+            deltas.append(delta)
+            if len(deltas) == 5:
+                cancel_event.set()
+
+        with self.assertRaises(GenerationCancelled):
+            generator.generate_recipe(self.params, cancel_event=cancel_event, delta_callback=on_delta,
+                                      bypass_cache=True)
+        self.assertLess(len(deltas), 10)
+        self.assertEqual(generator.response_cache.stats()["entries"], 0) # An unfinished stream is not cached
+
+
+class FixedReplyBackend(FakeBackend):
+    """Fake backend that answers JSON-mode requests with a given reply"""
+
+    def __init__(self, reply):
+        super().__init__()
+        self.reply = reply
+
+    def completion_text(self, messages, response_format=None):
+        if response_format is not None:
+            return self.reply
+        return super().completion_text(messages, response_format)
+
+
+class JsonModeTest(GeneratorTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.settings.set_setting("api_settings.output_mode", "json")
+
+    def test_request_asks_for_the_recipe_schema(self):
+        kwargs = self.make_generator()._completion_kwargs("prompt")
+        self.assertEqual(kwargs["response_format"]["type"], "json_schema")
+        self.assertTrue(kwargs["response_format"]["json_schema"]["strict"])
+
+    def test_recipe_comes_from_the_structured_fields(self):
+        deltas = []
+        recipe = self.make_generator().generate_recipe(self.params, delta_callback=deltas.append)
+        self.assertEqual(deltas, []) # Partial JSON is not streamed
+        self.assertEqual(recipe["format"], "json")
+        self.assertEqual(recipe["title"], recipe["structured"]["title"])
+        self.assertTrue(recipe["structured"]["ingredients"])
+        self.assertTrue(recipe["raw_text"].startswith(recipe["title"] + "\n"))
+        self.assertIn("<h2>Ingredients</h2>", render_recipe_html(recipe))
+        json.dumps(recipe) # Stays serializable for history
+
+    def test_text_mode_responses_are_not_reused(self):
+        generator = self.make_generator()
+        self.settings.set_setting("api_settings.output_mode", "text")
+        text_recipe = generator.generate_recipe(self.params)
+        self.settings.set_setting("api_settings.output_mode", "json")
+        json_recipe = generator.generate_recipe(self.params)
+        self.assertEqual((text_recipe["format"], json_recipe["format"]), ("text", "json"))
+
+    def test_invalid_json_is_reported_and_not_cached(self):
+        generator = RecipeGenerator(self.settings, backend=FixedReplyBackend('{"title": "Trunc'), connect=False)
+        with self.assertRaisesRegex(Exception, "not valid JSON"):
+            generator.generate_recipe(self.params)
+        self.assertEqual(generator.response_cache.stats()["entries"], 0)
+
+    def test_json_that_is_not_a_recipe_is_reported(self):
+        generator = RecipeGenerator(self.settings, backend=FixedReplyBackend('["Lobster"]'), connect=False)
+        with self.assertRaisesRegex(Exception, "Invalid recipe JSON"):
+            generator.generate_recipe(self.params)
+
+
+class SlowSetupBackend(FakeBackend):
+    """Fake backend whose client setup blocks until released, like a locked keyring"""
+
+    def __init__(self, fail_setup=False, fail_warm_up=False):
+        super().__init__()
+        self.release = threading.Event()
+        self.fail_setup = fail_setup
+        self.fail_warm_up = fail_warm_up
+        self.clients_created = 0
+        self.warmed_up = threading.Event()
+
+    def create_client(self, api_key=None):
+        self.release.wait(5)
+        if self.fail_setup:
+            raise RuntimeError("keyring is locked")
+        self.clients_created += 1
+        return super().create_client(api_key)
+
+    def warm_up(self, client, model):
+        self.warmed_up.set()
+        if self.fail_warm_up:
+            raise ConnectionError("unreachable")
+
+
+class WarmUpTest(GeneratorTestCase):
+
+    def test_generation_waits_for_the_warm_up_client(self):
+        backend = SlowSetupBackend()
+        generator = RecipeGenerator(self.settings, backend=backend, connect=False)
+        generator.start_warmup()
+        self.assertIsNone(generator.client)
+        self.assertFalse(generator.wait_until_ready(timeout=0.01))
+
+        backend.release.set()
+        recipe = generator.generate_recipe(self.params)
+        self.assertTrue(recipe["raw_text"])
+        self.assertEqual(backend.clients_created, 1)
+        self.assertTrue(backend.warmed_up.wait(5))
+
+    def test_failed_warm_up_is_not_fatal(self):
+        backend = SlowSetupBackend(fail_warm_up=True)
+        backend.release.set()
+        generator = RecipeGenerator(self.settings, backend=backend, connect=False)
+        with redirect_stdout(io.StringIO()) as output:
+            generator.start_warmup().join(5)
+        self.assertIn("Error warming up API connection: unreachable", output.getvalue())
+        self.assertTrue(generator.generate_recipe(self.params)["raw_text"])
+
+    def test_failed_setup_leaves_no_client(self):
+        backend = SlowSetupBackend(fail_setup=True)
+        backend.release.set()
+        generator = RecipeGenerator(self.settings, backend=backend, connect=False)
+        with redirect_stdout(io.StringIO()) as output:
+            generator.start_warmup().join(5)
+        self.assertIn("Error setting up API client: keyring is locked", output.getvalue())
+        self.assertFalse(generator.wait_until_ready())
+        self.assertFalse(backend.warmed_up.is_set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from ..recipe_history import RecipeHistoryStore
+
+
+class RecipeHistoryStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = RecipeHistoryStore(Path(self.temp_dir.name) / "recipe_history.jsonl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_compaction_keeps_newest_entries(self):
+        for i in range(25):
+            self.store.append({"title": f"Recipe {i}"}, max_size=5)
+        entries = self.store.read()
+        self.assertLessEqual(len(entries), 10)
+        self.assertEqual([entry["title"] for entry in self.store.read(max_size=5)],
+                         [f"Recipe {i}" for i in range(20, 25)])
+
+    def test_zero_size_keeps_nothing(self):
+        for i in range(3):
+            self.store.append({"title": f"Recipe {i}"}, max_size=10)
+        for i in range(5):
+            self.store.append({"title": f"Late {i}"}, max_size=0)
+        self.assertEqual(self.store.read(), [])
+        self.assertEqual(self.store.read(max_size=0), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from ..recipe_library import RecipeLibrary
+from ..settings_manager import SettingsManager
+
+
+def make_recipe(recipe_id, title, raw_text, timestamp, stars=2, occasion="Dinner party", chefs=None,
+                dietary=(), complexity="5/10"):
+    return {
+        "id": recipe_id,
+        "title": title,
+        "raw_text": raw_text,
+        "timestamp": timestamp,
+        "complexity_score": complexity,
+        "html_content": "<p>rendered</p>",
+        "parameters": {
+            "chefs": chefs or {},
+            "michelin_stars": stars,
+            "occasion": occasion,
+            "dietary_restrictions": list(dietary)
+        }
+    }
+
+
+RECIPES = [
+    make_recipe("1", "Butter-Poached Lobster", "Lobster poached in beurre monte with Sauternes",
+                "2026-01-01T10:00:00", stars=3, chefs={"thomas_keller": 90}, complexity="8/10"),
+    make_recipe("2", "Seared Scallops", "Scallops with cauliflower puree and brown butter",
+                "2026-01-02T10:00:00", occasion="Date night", chefs={"thomas_keller": 40}, dietary=["Gluten-free"]),
+    make_recipe("3", "Beetroot Tartare", "Roasted beetroot with horseradish cream",
+                "2026-01-03T10:00:00", stars=1, dietary=["Vegetarian", "Gluten-free"], complexity="3/10"),
+]
+
+
+class RecipeLibraryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.library = RecipeLibrary(Path(self.temp_dir.name) / "recipe_library.sqlite3")
+        self.assertEqual(self.library.add_recipes(RECIPES), 3)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def ids(self, **criteria):
+        return [item["recipe_id"] for item in self.library.search(**criteria)["items"]]
+
+    def test_adding_a_stored_recipe_again_is_ignored(self):
+        self.assertFalse(self.library.add_recipe(RECIPES[0]))
+        self.assertEqual(self.library.count(), 3)
+
+    def test_rendered_html_is_not_stored(self):
+        self.assertNotIn("html_content", self.library.get_recipe("1"))
+        self.assertIsNone(self.library.get_recipe("missing"))
+
+    def test_newest_first_without_a_query(self):
+        self.assertEqual(self.ids(), ["3", "2", "1"])
+
+    def test_text_search(self):
+        self.assertEqual(set(self.ids(query="butter")), {"1", "2"})
+        self.assertEqual(self.ids(query="horseradish"), ["3"])
+        self.assertEqual(self.ids(query="truffle"), [])
+
+    def test_last_term_matches_as_a_prefix(self):
+        self.assertEqual(self.ids(query="scal"), ["2"])
+
+    def test_like_fallback_without_fts(self):
+        self.library.fts_enabled = False
+        self.assertEqual(set(self.ids(query="butter")), {"1", "2"})
+        self.assertEqual(self.ids(query="Beetroot"), ["3"])
+
+    def test_filters(self):
+        self.assertEqual(set(self.ids(chef="thomas_keller")), {"1", "2"})
+        self.assertEqual(set(self.ids(dietary_restriction="Gluten-free")), {"2", "3"})
+        self.assertEqual(self.ids(michelin_stars=3), ["1"])
+        self.assertEqual(self.ids(occasion="Date night"), ["2"])
+        self.assertEqual(self.ids(min_complexity=5), ["2", "1"])
+        self.assertEqual(self.ids(max_complexity=4), ["3"])
+        self.assertEqual(self.ids(query="butter", chef="thomas_keller", michelin_stars=3), ["1"])
+
+    def test_pagination(self):
+        page = self.library.search(page=1, page_size=2)
+        self.assertEqual(page["total"], 3)
+        self.assertEqual([item["recipe_id"] for item in page["items"]], ["1"])
+
+    def test_distinct_values(self):
+        self.assertEqual(self.library.distinct_values("chef"), ["thomas_keller"])
+        self.assertEqual(self.library.distinct_values("dietary_restriction"), ["Gluten-free", "Vegetarian"])
+        self.assertEqual(self.library.distinct_values("michelin_stars"), [1, 2, 3])
+
+    def test_delete_and_clear(self):
+        self.library.delete_recipe("2")
+        self.assertEqual(self.library.count(), 2)
+        self.assertEqual(self.ids(query="scallops"), [])
+        self.library.clear()
+        self.assertEqual(self.library.count(), 0)
+        self.assertEqual(self.library.distinct_values("chef"), [])
+
+
+class ClearRecipeHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.old_home = os.environ.get("HOME")
+        os.environ["HOME"] = self.temp_dir.name
+        self.settings = SettingsManager(save_delay=0)
+
+    def tearDown(self):
+        self.settings.flush()
+        if self.old_home is None:
+            del os.environ["HOME"]
+        else:
+            os.environ["HOME"] = self.old_home
+        self.temp_dir.cleanup()
+
+    def test_clearing_history_also_clears_the_library(self):
+        for recipe in RECIPES:
+            self.settings.save_recipe_to_history(recipe)
+        self.assertEqual(self.settings.get_recipe_library().count(), 3)
+
+        self.assertTrue(self.settings.clear_recipe_history())
+        self.assertEqual(self.settings.get_recipe_history(), [])
+        self.assertEqual(self.settings.get_recipe_library().count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
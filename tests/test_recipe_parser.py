@@ -0,0 +1,75 @@
+import unittest
+
+from ..backends import CANNED_RECIPES
+from ..recipe_parser import ParsedRecipe, format_ingredient, parse_ingredient, parse_recipe, parse_substitution
+
+
+class ParseRecipeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.recipe = parse_recipe(CANNED_RECIPES[0])
+
+    def test_title_introduction_and_score(self):
+        self.assertEqual(self.recipe.title, "Butter-Poached Lobster with Sauternes Beurre Blanc")
+        self.assertTrue(self.recipe.introduction.startswith("A celebration of cold-water lobster"))
+        self.assertEqual(self.recipe.complexity_score, 8)
+
+    def test_sections(self):
+        self.assertEqual([section.kind for section in self.recipe.sections],
+                         ["ingredients", "instructions", "plating", "notes", "pairing", "substitutions"])
+
+    def test_ingredients_keep_their_component_group(self):
+        ingredients = self.recipe.ingredients
+        self.assertEqual(len(ingredients), 9)
+        self.assertEqual((ingredients[1].quantity, ingredients[1].unit, ingredients[1].name, ingredients[1].note),
+                         (1.5, "cups", "unsalted butter", "cubed"))
+        self.assertEqual(ingredients[0].group, "For the lobster")
+        self.assertEqual(ingredients[-1].group, "For the beurre blanc")
+
+    def test_steps_timings_and_lists(self):
+        self.assertEqual([step.number for step in self.recipe.steps], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(self.recipe.steps[0].duration_minutes, 2)
+        self.assertEqual([(timing.label, timing.minutes) for timing in self.recipe.timings],
+                         [("preparation time", 45), ("cooking time", 30)])
+        self.assertEqual(len(self.recipe.plating), 2)
+        self.assertEqual(len(self.recipe.notes), 2)
+        self.assertEqual(self.recipe.pairings, ["A Meursault or a mineral Chablis Premier Cru"])
+        self.assertEqual(self.recipe.substitutions[1].original, "Sauternes")
+
+    def test_markdown_layout(self):
+        recipe = parse_recipe("## **Truffle Risotto**\n\n### Ingredients\n* 2-3 shallots (minced)\n"
+                              "### Method\n- Toast the rice for 1 hour 30 minutes.\n\n**Complexity Score: 11/10**\n")
+        self.assertEqual(recipe.title, "Truffle Risotto")
+        self.assertEqual((recipe.ingredients[0].quantity, recipe.ingredients[0].quantity_max), (2, 3))
+        self.assertEqual(recipe.steps[0].duration_minutes, 90)
+        self.assertIsNone(recipe.complexity_score) # Out of range
+
+    def test_empty_text_gets_a_default_title(self):
+        self.assertEqual(parse_recipe("").title, "Michelin Star Recipe")
+
+    def test_dict_round_trip(self):
+        self.assertEqual(ParsedRecipe.from_dict(self.recipe.to_dict()), self.recipe)
+
+
+class ParseLineTest(unittest.TestCase):
+
+    def test_ingredient_quantities(self):
+        self.assertEqual(parse_ingredient("1 1/2 cups arborio rice").quantity, 1.5)
+        self.assertEqual(parse_ingredient("½ cup cream").quantity, 0.5)
+        ingredient = parse_ingredient("Salt to taste")
+        self.assertEqual((ingredient.name, ingredient.quantity), ("Salt to taste", None))
+
+    def test_format_ingredient_round_trip(self):
+        for text in ("2-3 shallots, minced", "1.5 cups unsalted butter, cubed", "Salt to taste"):
+            self.assertEqual(format_ingredient(parse_ingredient(text)), text)
+
+    def test_substitution_forms(self):
+        for text in ("Lobster: langoustines", "Instead of lobster, use langoustines",
+                     "Lobster can be replaced with langoustines", "Lobster -> langoustines"):
+            substitution = parse_substitution(text)
+            self.assertEqual((substitution.original.lower(), substitution.replacement), ("lobster", "langoustines"))
+        self.assertEqual(parse_substitution("No substitutes").replacement, "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+
+from ..backends import CANNED_RECIPES
+from ..recipe_renderer import (IncrementalRecipeFormatter, RecipeRenderer, format_recipe_body,
+                               render_recipe_html)
+
+
+class IncrementalRecipeFormatterTest(unittest.TestCase):
+
+    def stream(self, text, chunk_size):
+        formatter = IncrementalRecipeFormatter()
+        fragments = [formatter.feed(text[start:start + chunk_size])
+                     for start in range(0, len(text), chunk_size)]
+        return "".join(fragments) + formatter.close()
+
+    def test_any_chunking_matches_the_one_shot_formatting(self):
+        for recipe in CANNED_RECIPES:
+            expected = format_recipe_body(recipe)
+            for chunk_size in (1, 2, 7, 64, len(recipe)):
+                self.assertEqual(self.stream(recipe, chunk_size), expected, chunk_size)
+
+    def test_partial_line_is_held_back(self):
+        formatter = IncrementalRecipeFormatter()
+        self.assertEqual(formatter.feed("Seared Scal"), "")
+        self.assertEqual(formatter.partial_line, "Seared Scal")
+        self.assertEqual(formatter.feed("lops\nINGRED"), "<h1>Seared Scallops</h1>\n")
+        self.assertEqual(formatter.partial_line, "INGRED")
+
+    def test_close_flushes_the_last_line_and_open_elements(self):
+        formatter = IncrementalRecipeFormatter()
+        formatter.feed("Title\nCHEF'S NOTES:\n- Rest the meat")
+        self.assertEqual(formatter.close(), "<ul>\n<li>Rest the meat</li>\n</ul>\n</div>\n")
+        self.assertIsNone(formatter.list_type)
+        self.assertFalse(formatter.open_block)
+        self.assertEqual(formatter.close(), "")
+
+    def test_trailing_blank_lines_are_dropped(self):
+        formatter = IncrementalRecipeFormatter()
+        html = formatter.feed("Title\nA paragraph.\n\n\n") + formatter.close()
+        self.assertEqual(html, "<h1>Title</h1>\n<p>A paragraph.</p>\n")
+
+
+class FormatRecipeBodyTest(unittest.TestCase):
+
+    def test_sections_and_lists(self):
+        html = format_recipe_body("Title\nINGREDIENTS:\n- salt\n- pepper\nINSTRUCTIONS:\n1. Season\n2. Serve")
+        self.assertEqual(html, "<h1>Title</h1>\n<h2>Ingredients</h2>\n<ul>\n<li>salt</li>\n<li>pepper</li>\n</ul>\n"
+                               "<h2>Instructions</h2>\n<ol>\n<li>Season</li>\n<li>Serve</li>\n</ol>\n")
+
+    def test_styled_block_runs_until_the_next_section(self):
+        html = format_recipe_body("Title\nWINE PAIRING:\n- Chablis\nPLATING:\n- Warm plate")
+        self.assertEqual(html, '<h1>Title</h1>\n<div class="wine-pairing"><h2>Wine Pairing</h2>\n<ul>\n'
+                               '<li>Chablis</li>\n</ul>\n</div>\n<h2>Plating</h2>\n<ul>\n<li>Warm plate</li>\n</ul>\n')
+
+    def test_text_is_escaped(self):
+        html = format_recipe_body("Fish & <Chips>\n- 1 < 2")
+        self.assertIn("<h1>Fish &amp; &lt;Chips&gt;</h1>", html)
+        self.assertIn("<li>1 &lt; 2</li>", html)
+
+    def test_empty_text(self):
+        self.assertEqual(format_recipe_body(""), "")
+
+
+class RecipeRendererTest(unittest.TestCase):
+
+    def test_rendering_is_memoized(self):
+        renderer = RecipeRenderer()
+        html = renderer.render_body(CANNED_RECIPES[0])
+        self.assertEqual(html, format_recipe_body(CANNED_RECIPES[0]))
+        self.assertIs(renderer.render_body(CANNED_RECIPES[0]), html)
+
+    def test_least_recently_used_rendering_is_dropped(self):
+        renderer = RecipeRenderer(maxsize=1)
+        first = renderer.render_body(CANNED_RECIPES[0])
+        renderer.render_body(CANNED_RECIPES[1])
+        self.assertIsNot(renderer.render_body(CANNED_RECIPES[0]), first)
+
+    def test_document_includes_the_stylesheet(self):
+        document = RecipeRenderer().render_document("Title")
+        self.assertTrue(document.startswith("<!DOCTYPE html>"))
+        self.assertIn("<style>", document)
+        self.assertIn("<h1>Title</h1>", document)
+
+    def test_legacy_records_pass_their_html_through(self):
+        self.assertEqual(render_recipe_html({"html_content": "<p>old</p>"}), "<p>old</p>")
+        self.assertEqual(render_recipe_html({"raw_text": "Title"}), "<h1>Title</h1>\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from ..metrics import API_WAIT_SECONDS
+from ..recipe_generator import GenerationCancelled, RequestScheduler, TimedRequest
+
+try:
+    from openai import APIStatusError
+except ImportError:
+    APIStatusError = None
+
+
+def api_error(status_code):
+    """An APIStatusError with the given status, without needing an HTTP response"""
+    error = APIStatusError.__new__(APIStatusError)
+    Exception.__init__(error, f"HTTP {status_code}")
+    error.status_code = status_code
+    error.code = None
+    error.response = None
+    return error
+
+
+def failing(status_code):
+    def func():
+        raise api_error(status_code)
+    return func
+
+
+@unittest.skipIf(APIStatusError is None, "openai is not installed")
+class CircuitBreakerTrialTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = RequestScheduler(max_retries=0, base_delay=0, failure_threshold=2, reset_timeout=0.05)
+        self.breaker = self.scheduler.circuit_breaker
+
+    def open_circuit(self):
+        """Trip the breaker with a burst of 503s and wait until a trial is allowed"""
+        for _ in range(2):
+            with self.assertRaises(APIStatusError):
+                self.scheduler.call(failing(503))
+        self.assertEqual(self.breaker.state, "open")
+        time.sleep(0.06)
+
+    def test_non_retryable_trial_is_released(self):
+        self.open_circuit()
+        with self.assertRaises(APIStatusError):
+            self.scheduler.call(failing(400))
+        self.assertEqual(self.breaker.state, "open")
+        self.assertEqual(self.scheduler.call(lambda: "ok"), "ok") # The next caller makes the trial
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_non_retryable_error_keeps_the_failure_count(self):
+        with self.assertRaises(APIStatusError):
+            self.scheduler.call(failing(503))
+        with self.assertRaises(APIStatusError):
+            self.scheduler.call(failing(400))
+        self.assertEqual(self.breaker.failures, 1)
+        with self.assertRaises(APIStatusError):
+            self.scheduler.call(failing(503))
+        self.assertEqual(self.breaker.state, "open")
+
+    def test_failed_trial_reopens_circuit(self):
+        self.open_circuit()
+        with self.assertRaises(APIStatusError):
+            self.scheduler.call(failing(503))
+        self.assertEqual(self.breaker.state, "open")
+
+    def test_trial_cancelled_during_admission_is_released(self):
+        self.open_circuit()
+        self.scheduler._paused_until = time.monotonic() + 10 # Forces an admission wait
+        cancel_event = threading.Event()
+        cancel_event.set()
+        with self.assertRaises(GenerationCancelled):
+            self.scheduler.call(lambda: "never sent", cancel_event=cancel_event)
+        self.assertEqual(self.breaker.state, "open")
+
+        # The next caller gets the trial straight away
+        self.scheduler._paused_until = 0.0
+        self.assertEqual(self.scheduler.call(lambda: "ok"), "ok")
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_async_trial_cancelled_during_admission_is_released(self):
+        self.open_circuit()
+
+        async def succeed():
+            return "ok"
+
+        async def scenario():
+            self.scheduler._paused_until = time.monotonic() + 10
+            task = asyncio.ensure_future(self.scheduler.acall(succeed))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.assertEqual(self.breaker.state, "open")
+
+            self.scheduler._paused_until = 0.0
+            self.assertEqual(await self.scheduler.acall(succeed), "ok")
+
+        asyncio.run(scenario())
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_async_non_retryable_trial_is_released(self):
+        self.open_circuit()
+
+        async def bad_request():
+            raise api_error(400)
+
+        async def succeed():
+            return "ok"
+
+        with self.assertRaises(APIStatusError):
+            asyncio.run(self.scheduler.acall(bad_request))
+        self.assertEqual(self.breaker.state, "open")
+        self.assertEqual(asyncio.run(self.scheduler.acall(succeed)), "ok")
+        self.assertEqual(self.breaker.state, "closed")
+
+
+class RequestTimingTest(unittest.TestCase):
+    """Request latency starts when the request is sent; waiting for admission is recorded on its own"""
+
+    def admission_waits(self):
+        summary = API_WAIT_SECONDS.summary(reason="admission")
+        return (summary["count"], summary["sum"]) if summary else (0, 0.0)
+
+    def test_admission_wait_is_not_request_latency(self):
+        scheduler = RequestScheduler(max_retries=0)
+        scheduler._paused_until = time.monotonic() + 0.2
+        count, total = self.admission_waits()
+
+        request = TimedRequest(lambda: "ok")
+        self.assertEqual(scheduler.call(request), "ok")
+
+        self.assertLess(request.elapsed(), 0.1)
+        new_count, new_total = self.admission_waits()
+        self.assertEqual(new_count, count + 1)
+        self.assertGreater(new_total - total, 0.1)
+
+    def test_async_admission_wait_is_not_request_latency(self):
+        scheduler = RequestScheduler(max_retries=0)
+        scheduler._paused_until = time.monotonic() + 0.2
+
+        async def succeed():
+            return "ok"
+
+        request = TimedRequest(succeed)
+        self.assertEqual(asyncio.run(scheduler.acall(request)), "ok")
+        self.assertLess(request.elapsed(), 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()
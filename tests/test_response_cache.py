@@ -0,0 +1,82 @@
+import tempfile
+import time
+import unittest
+from contextlib import closing
+from pathlib import Path
+
+from ..response_cache import ResponseCache
+
+
+class ResponseCacheKeyTest(unittest.TestCase):
+
+    def key(self, **overrides):
+        parts = dict(endpoint="openai", system_prompt="system", prompt="prompt", model="gpt-4",
+                     temperature=0.7, max_tokens=2000)
+        parts.update(overrides)
+        return ResponseCache.make_key(**parts)
+
+    def test_key_is_stable(self):
+        self.assertEqual(self.key(), self.key())
+
+    def test_every_part_changes_the_key(self):
+        for name, value in (("endpoint", "fake"), ("system_prompt", "other"), ("prompt", "other"),
+                            ("model", "gpt-4o"), ("temperature", 0.2), ("max_tokens", 1000)):
+            self.assertNotEqual(self.key(**{name: value}), self.key(), name)
+
+    def test_same_model_on_different_servers_is_not_shared(self):
+        self.assertNotEqual(self.key(endpoint="openai_compatible:http://a.local/v1"),
+                            self.key(endpoint="openai_compatible:http://b.local/v1"))
+
+
+class ResponseCacheStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_file = Path(self.temp_dir.name) / "response_cache.sqlite3"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_put_and_get(self):
+        cache = ResponseCache(self.cache_file)
+        cache.put("a", "recipe text", model="gpt-4")
+        self.assertEqual(cache.get("a"), "recipe text")
+        self.assertIsNone(cache.get("missing"))
+        self.assertEqual(ResponseCache(self.cache_file).get("a"), "recipe text")
+
+    def test_expired_entries_are_not_returned(self):
+        cache = ResponseCache(self.cache_file, ttl_seconds=1)
+        cache.put("a", "recipe text")
+        with closing(cache._connect()) as conn, conn:
+            conn.execute("UPDATE responses SET created_at = ?", (time.time() - 5,))
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResponseCache(self.cache_file, max_entries=2)
+        cache.put("a", "first")
+        time.sleep(0.01)
+        cache.put("b", "second")
+        time.sleep(0.01)
+        cache.get("a") # Now more recently used than "b"
+        time.sleep(0.01)
+        cache.put("c", "third")
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), ("first", None, "third"))
+
+    def test_size_limit(self):
+        cache = ResponseCache(self.cache_file, max_bytes=10)
+        cache.put("a", "x" * 8)
+        time.sleep(0.01)
+        cache.put("b", "y" * 8)
+        self.assertEqual(cache.stats(), {"entries": 1, "bytes": 8})
+        self.assertEqual(cache.get("b"), "y" * 8)
+
+    def test_clear(self):
+        cache = ResponseCache(self.cache_file)
+        cache.put("a", "recipe text")
+        self.assertTrue(cache.clear())
+        self.assertEqual(cache.stats(), {"entries": 0, "bytes": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from ..async_engine import AsyncRecipeEngine
+from ..backends import FakeBackend
+from ..metrics import REQUESTS_TOTAL
+from ..recipe_generator import RecipeGenerator
+from ..server import RecipeServer
+from ..settings_manager import SettingsManager
+
+
+class ClientDisconnectTest(unittest.TestCase):
+    """A client that hangs up mid-request cancels its generation"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.old_home = os.environ.get("HOME")
+        os.environ["HOME"] = self.temp_dir.name
+
+        self.settings = SettingsManager(save_delay=0)
+        self.settings.set_setting("cache_settings.enabled", False)
+        self.settings.set_setting("save_recipes", False)
+        # The client hangs up well before the first token, so nothing is written that could fail
+        generator = RecipeGenerator(self.settings, backend=FakeBackend(latency=1.0, tokens_per_second=200),
+                                    connect=False)
+        self.model = self.settings.get_setting("api_settings.model", "gpt-4")
+        self.server = RecipeServer(AsyncRecipeEngine(generator), port=0, workers=1)
+
+    def tearDown(self):
+        self.settings.flush()
+        if self.old_home is None:
+            del os.environ["HOME"]
+        else:
+            os.environ["HOME"] = self.old_home
+        self.temp_dir.cleanup()
+
+    async def wait_until(self, condition, timeout=2.0):
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        while not condition():
+            self.assertLess(loop.time(), deadline, "timed out")
+            await asyncio.sleep(0.01)
+
+    def disconnect_mid_request(self, path):
+        cancelled = REQUESTS_TOTAL.value(model=self.model, outcome="cancelled")
+
+        async def scenario():
+            await self.server.start()
+            try:
+                port = self.server._server.sockets[0].getsockname()[1]
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                body = json.dumps({"servings": 2}).encode("utf-8")
+                writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n"
+                             .encode("latin-1") + body)
+                await writer.drain()
+                await self.wait_until(lambda: self.server.active_jobs == 1)
+
+                writer.close()
+                await self.wait_until(lambda: self.server.active_jobs == 0, timeout=0.5)
+            finally:
+                await self.server.close()
+
+        asyncio.run(scenario())
+        self.assertEqual(REQUESTS_TOTAL.value(model=self.model, outcome="cancelled"), cancelled + 1)
+
+    def test_disconnect_cancels_recipe_request(self):
+        self.disconnect_mid_request("/recipes")
+
+    def test_disconnect_cancels_streamed_request(self):
+        self.disconnect_mid_request("/recipes/stream")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from ..settings_manager import SettingsManager
+
+
+class SettingsWriteBehindTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.old_home = os.environ.get("HOME")
+        os.environ["HOME"] = self.temp_dir.name
+        self.managers = []
+
+    def tearDown(self):
+        for manager in self.managers:
+            manager.flush()
+        if self.old_home is None:
+            del os.environ["HOME"]
+        else:
+            os.environ["HOME"] = self.old_home
+        self.temp_dir.cleanup()
+
+    def make_manager(self, save_delay):
+        manager = SettingsManager(save_delay=save_delay)
+        self.managers.append(manager)
+
+        # Count the writes that reach the disk
+        manager.writes = 0
+        save_settings = manager._save_settings
+
+        def counting_save(settings=None):
+            manager.writes += 1
+            save_settings(settings)
+
+        manager._save_settings = counting_save
+        return manager
+
+    def saved(self, manager):
+        with open(manager.settings_file) as f:
+            return json.load(f)
+
+    def test_defaults_are_written_on_first_run(self):
+        manager = self.make_manager(60)
+        self.assertEqual(self.saved(manager)["api_settings"]["model"], "gpt-4")
+
+    def test_changes_are_held_until_flush(self):
+        manager = self.make_manager(60)
+        manager.set_setting("theme", "light")
+        manager.set_setting("api_settings.model", "gpt-4o")
+        self.assertEqual(manager.get_setting("theme"), "light")
+        self.assertEqual(self.saved(manager)["theme"], "dark")
+
+        manager.flush()
+        saved = self.saved(manager)
+        self.assertEqual((saved["theme"], saved["api_settings"]["model"]), ("light", "gpt-4o"))
+        self.assertEqual(manager.writes, 1)
+        self.assertFalse(manager.settings_file.with_name("settings.json.tmp").exists())
+
+        manager.flush() # Nothing pending
+        self.assertEqual(manager.writes, 1)
+
+    def test_timer_writes_the_changes(self):
+        manager = self.make_manager(0.05)
+        for servings in range(1, 6):
+            manager.set_setting("default_servings", servings)
+
+        deadline = time.monotonic() + 5
+        while self.saved(manager)["default_servings"] != 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.saved(manager)["default_servings"], 5)
+        self.assertEqual(manager.writes, 1)
+
+    def test_batch_updates_write_once_on_exit(self):
+        manager = self.make_manager(0)
+        with manager.batch_updates():
+            with manager.batch_updates():
+                manager.set_setting("theme", "light")
+            manager.set_setting("default_servings", 6)
+            time.sleep(0.05) # Long enough for a zero-delay timer to have fired
+            self.assertEqual(manager.writes, 0)
+
+        self.assertEqual(manager.writes, 1)
+        saved = self.saved(manager)
+        self.assertEqual((saved["theme"], saved["default_servings"]), ("light", 6))
+
+    def test_flushed_settings_are_loaded_again(self):
+        manager = self.make_manager(60)
+        manager.set_setting("rate_limits.requests_per_minute", 500)
+        manager.flush()
+        self.assertEqual(self.make_manager(60).get_setting("rate_limits.requests_per_minute"), 500)
+
+    def test_corrupt_file_is_kept_aside(self):
+        manager = self.make_manager(60)
+        manager.settings_file.write_text("{not json")
+        reloaded = self.make_manager(60)
+        self.assertEqual(reloaded.get_setting("theme"), "dark")
+        self.assertEqual(manager.settings_file.with_name("settings.json.corrupt").read_text(), "{not json")
+
+
+if __name__ == "__main__":
+    unittest.main()
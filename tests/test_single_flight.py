@@ -0,0 +1,162 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from ..backends import FakeBackend
+from ..recipe_generator import (AsyncSingleFlight, GenerationCancelled, RecipeGenerator, SingleFlight,
+                                with_default_params)
+from ..settings_manager import SettingsManager
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def run_concurrently(self, flight, key, func, count):
+        results = [None] * count
+        errors = [None] * count
+
+        def call(index):
+            try:
+                results[index] = flight.do(key, func)
+            except Exception as e:
+                errors[index] = e
+
+        threads = [threading.Thread(target=call, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def test_concurrent_callers_share_one_call(self):
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.1)
+            return "recipe"
+
+        results, errors = self.run_concurrently(SingleFlight(), "key", slow, 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True])
+        self.assertEqual({result for result, _ in results}, {"recipe"})
+        self.assertEqual(errors, [None] * 4)
+
+    def test_different_keys_do_not_wait_for_each_other(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do("a", lambda: 1), (1, False))
+        self.assertEqual(flight.do("b", lambda: 2), (2, False))
+
+    def test_error_is_shared(self):
+        def failing():
+            time.sleep(0.1)
+            raise ValueError("boom")
+
+        results, errors = self.run_concurrently(SingleFlight(), "key", failing, 3)
+        self.assertTrue(all(isinstance(error, ValueError) for error in errors))
+
+    def test_waiter_takes_over_from_cancelled_leader(self):
+        flight = SingleFlight()
+        leader_started = threading.Event()
+
+        def cancelled_leader():
+            leader_started.set()
+            time.sleep(0.1)
+            raise GenerationCancelled("Recipe generation was cancelled.")
+
+        def leader():
+            with self.assertRaises(GenerationCancelled):
+                flight.do("key", cancelled_leader)
+
+        thread = threading.Thread(target=leader)
+        thread.start()
+        leader_started.wait()
+        self.assertEqual(flight.do("key", lambda: "recipe"), ("recipe", False))
+        thread.join()
+
+
+class AsyncSingleFlightTest(unittest.TestCase):
+
+    def test_concurrent_callers_share_one_call(self):
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "recipe"
+
+        async def scenario():
+            flight = AsyncSingleFlight()
+            return await asyncio.gather(*(flight.do("key", slow) for _ in range(3)))
+
+        results = asyncio.run(scenario())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [("recipe", False), ("recipe", True), ("recipe", True)])
+
+    def test_waiter_takes_over_from_cancelled_leader(self):
+        async def scenario():
+            flight = AsyncSingleFlight()
+
+            async def slow():
+                await asyncio.sleep(10)
+
+            async def quick():
+                return "recipe"
+
+            leader = asyncio.ensure_future(flight.do("key", slow))
+            await asyncio.sleep(0.01)
+            waiter = asyncio.ensure_future(flight.do("key", quick))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return await waiter
+
+        self.assertEqual(asyncio.run(scenario()), ("recipe", False))
+
+
+class CoalescingAcrossBackendsTest(unittest.TestCase):
+    """Generators sharing a flight table only share requests to the same endpoint"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.old_home = os.environ.get("HOME")
+        os.environ["HOME"] = self.temp_dir.name
+
+        self.settings = SettingsManager(save_delay=0)
+        self.settings.set_setting("cache_settings.enabled", False)
+        self.settings.set_setting("save_recipes", False)
+        self.settings.set_setting("api_settings.stream", False)
+
+    def tearDown(self):
+        self.settings.flush()
+        if self.old_home is None:
+            del os.environ["HOME"]
+        else:
+            os.environ["HOME"] = self.old_home
+        self.temp_dir.cleanup()
+
+    def test_flights_are_keyed_per_backend(self):
+        fake = FakeBackend(latency=0.1)
+        other = FakeBackend(latency=0.1, recipes=[fake.recipes[1].replace("Scallops", "Langoustines")])
+        other.name = "other"
+        first = RecipeGenerator(self.settings, backend=fake, connect=False)
+        second = RecipeGenerator(self.settings, backend=other, connect=False)
+        second.single_flight = first.single_flight
+        params = with_default_params({"servings": 2})
+
+        recipes = {}
+        threads = [threading.Thread(target=lambda name=name, generator=generator:
+                                    recipes.__setitem__(name, generator.generate_recipe(params)))
+                   for name, generator in (("first", first), ("second", second))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertNotEqual(recipes["first"]["raw_text"], recipes["second"]["raw_text"])
+        self.assertIn("Langoustines", recipes["second"]["raw_text"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import importlib.util
+import json
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+# The application package (this repository) and the directory it is imported from
+PACKAGE = __package__.rpartition(".")[0]
+PACKAGE_PARENT = Path(__file__).resolve().parents[2]
+
+# Generous: a cold import takes well under a second, pulling in the API stack takes several
+MAX_IMPORT_SECONDS = 5.0
+
+COLD_IMPORT = f"""
+import json, sys, time
+started = time.perf_counter()
+import {PACKAGE}.main
+print(json.dumps({{
+    "seconds": time.perf_counter() - started,
+    "loaded": [name for name in ("openai", "keyring", "httpx") if name in sys.modules]
+}}))
+"""
+
+
+@unittest.skipIf(importlib.util.find_spec("PyQt5") is None, "PyQt5 is not installed")
+class ColdStartupTest(unittest.TestCase):
+    """Importing the GUI must not load the API client or keyring stacks (they load after the window shows)"""
+
+    def test_cold_import_of_main(self):
+        completed = subprocess.run([sys.executable, "-c", COLD_IMPORT], cwd=PACKAGE_PARENT,
+                                   capture_output=True, text=True, timeout=60)
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+
+        self.assertEqual(result["loaded"], [])
+        self.assertLess(result["seconds"], MAX_IMPORT_SECONDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
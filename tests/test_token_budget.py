@@ -0,0 +1,64 @@
+import json
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+
+from ..token_budget import TokenBudget, TokenBudgetExceeded
+
+MESSAGES = [{"role": "user", "content": "A recipe, please"}]
+
+
+class TokenBudgetPersistenceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.usage_file = Path(self.temp_dir.name) / "token_usage.sqlite3"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def record(self, budget, prompt_tokens, completion_tokens):
+        estimate = budget.reserve(MESSAGES, "gpt-4", 100)
+        budget.record_usage(estimate, _Usage(prompt_tokens, completion_tokens))
+
+    def test_budgets_sharing_a_file_keep_each_others_totals(self):
+        # Two processes, each with its own budget object on the same usage file
+        first = TokenBudget(self.usage_file)
+        second = TokenBudget(self.usage_file)
+        self.record(first, 10, 20)
+        self.record(second, 1, 2)
+        self.record(first, 100, 200)
+
+        today = TokenBudget(self.usage_file).summary()["today"]
+        self.assertEqual(today, {"prompt_tokens": 111, "completion_tokens": 222, "requests": 3})
+        self.assertEqual(first.summary()["session"]["requests"], 2)
+
+    def test_daily_limit_counts_other_processes(self):
+        other = TokenBudget(self.usage_file)
+        budget = TokenBudget(self.usage_file, daily_limit=500)
+        budget.reserve(MESSAGES, "gpt-4", 100)
+        self.record(other, 200, 200)
+        with self.assertRaises(TokenBudgetExceeded):
+            budget.reserve(MESSAGES, "gpt-4", 100)
+
+    def test_legacy_usage_is_imported_once(self):
+        legacy_file = Path(self.temp_dir.name) / "token_usage.json"
+        day = date.today().isoformat()
+        with open(legacy_file, 'w') as f:
+            json.dump({"days": {day: {"prompt_tokens": 5, "completion_tokens": 7, "requests": 1}}}, f)
+
+        TokenBudget(self.usage_file, legacy_file=legacy_file)
+        self.assertFalse(legacy_file.exists())
+        today = TokenBudget(self.usage_file, legacy_file=legacy_file).summary()["today"]
+        self.assertEqual(today, {"prompt_tokens": 5, "completion_tokens": 7, "requests": 1})
+
+
+class _Usage:
+    def __init__(self, prompt_tokens, completion_tokens):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+
+if __name__ == "__main__":
+    unittest.main()
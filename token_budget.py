@@ -0,0 +1,266 @@
+# michelin_recipe_generator/token_budget.py
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import date, timedelta
+
+try:
+    import tiktoken
+except ImportError: # Optional; token counts fall back to an approximation
+    tiktoken = None
+
+
+# Chat formatting overhead per message and for priming the reply (OpenAI cookbook figures)
+_TOKENS_PER_MESSAGE = 3
+_TOKENS_PER_REPLY = 3
+
+# Days of usage kept in the usage database
+_USAGE_DAYS_KEPT = 90
+
+
+class TokenBudgetExceeded(Exception):
+    """Raised when a request would exceed a token budget or the prompt size limit"""
+    pass
+
+
+class TokenCounter:
+    """
+    Counts tokens with tiktoken when it is installed, or approximates them as one token per
+    four characters (close enough for English prose to budget against).
+    """
+
+    def __init__(self):
+        """Initialize the counter; encodings are loaded on first use per model"""
+        self._encodings = {}
+        self._lock = threading.Lock()
+
+    @property
+    def exact(self):
+        """True if counts come from tiktoken rather than the approximation"""
+        return tiktoken is not None
+
+    def _get_encoding(self, model):
+        """Get the tiktoken encoding for a model (None if tiktoken is unavailable)"""
+        if tiktoken is None:
+            return None
+        with self._lock:
+            if model not in self._encodings:
+                try:
+                    try:
+                        encoding = tiktoken.encoding_for_model(model)
+                    except KeyError:
+                        encoding = tiktoken.get_encoding("o200k_base") # Newer models not yet in tiktoken's table
+                except Exception as e:
+                    # Encodings are downloaded on first use, which can fail offline
+                    print(f"Error loading tiktoken encoding: {e}")
+                    encoding = None
+                self._encodings[model] = encoding
+            return self._encodings[model]
+
+    def count(self, text, model=None):
+        """Count the tokens in a piece of text"""
+        encoding = self._get_encoding(model)
+        if encoding is None:
+            return (len(text) + 3) // 4
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def count_messages(self, messages, model=None):
+        """Count the prompt tokens of a chat request, including message formatting overhead"""
+        tokens = _TOKENS_PER_REPLY
+        for message in messages:
+            tokens += _TOKENS_PER_MESSAGE + self.count(message.get("content") or "", model)
+        return tokens
+
+
+class TokenBudget:
+    """
+    Token accounting for every completion request.
+    Requests are estimated before dispatch (prompt tokens plus the completion allowance) and the
+    estimate is reserved against the session and daily budgets, so concurrent requests cannot
+    overshoot them together. When the response arrives the reservation is replaced by the real
+    usage. Daily totals are kept in SQLite and only ever incremented in place, so the daily
+    budget holds across restarts and is shared by every process using the same usage file.
+    A limit of 0 disables that check.
+    """
+
+    def __init__(self, usage_file, session_limit=0, daily_limit=0, max_prompt_tokens=0, legacy_file=None):
+        """Initialize the budget; totals from a legacy token_usage.json are imported on first use"""
+        self.usage_file = usage_file
+        self.legacy_file = legacy_file
+        self.session_limit = session_limit
+        self.daily_limit = daily_limit
+        self.max_prompt_tokens = max_prompt_tokens
+        self.counter = TokenCounter()
+        self.session_usage = {"prompt_tokens": 0, "completion_tokens": 0, "requests": 0}
+        self._reserved = 0
+        self._lock = threading.Lock()
+        self._create_schema()
+
+    @classmethod
+    def from_settings(cls, settings_manager):
+        """Create a budget configured from the token_budget settings"""
+        return cls(
+            settings_manager.get_token_usage_file(),
+            session_limit=settings_manager.get_setting("token_budget.session_limit", 0),
+            daily_limit=settings_manager.get_setting("token_budget.daily_limit", 0),
+            max_prompt_tokens=settings_manager.get_setting("token_budget.max_prompt_tokens", 0),
+            legacy_file=settings_manager.app_dir / "token_usage.json"
+        )
+
+    def _connect(self):
+        """Open a connection; one per operation keeps the budget safe to use from worker threads"""
+        return sqlite3.connect(str(self.usage_file), timeout=10)
+
+    def _create_schema(self):
+        """Create the usage table if needed, import the legacy totals and drop days no longer kept"""
+        cutoff = (date.today() - timedelta(days=_USAGE_DAYS_KEPT)).isoformat()
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS daily_usage ("
+                    " day TEXT PRIMARY KEY,"
+                    " prompt_tokens INTEGER NOT NULL DEFAULT 0,"
+                    " completion_tokens INTEGER NOT NULL DEFAULT 0,"
+                    " requests INTEGER NOT NULL DEFAULT 0)"
+                )
+                # A non-empty table means the legacy totals were imported already
+                if conn.execute("SELECT 1 FROM daily_usage LIMIT 1").fetchone() is None:
+                    for day, totals in self._load_legacy_usage().items():
+                        self._add_usage(conn, day, totals.get("prompt_tokens", 0),
+                                        totals.get("completion_tokens", 0), totals.get("requests", 0))
+                conn.execute("DELETE FROM daily_usage WHERE day < ?", (cutoff,))
+        except sqlite3.Error as e:
+            print(f"Error opening token usage: {e}")
+            return
+
+        if self.legacy_file and self.legacy_file.exists():
+            try:
+                os.remove(self.legacy_file)
+            except OSError as e:
+                print(f"Error removing legacy token usage: {e}")
+
+    def _load_legacy_usage(self):
+        """Load the per-day totals of the old token_usage.json, if there is one"""
+        if not self.legacy_file or not self.legacy_file.exists():
+            return {}
+        try:
+            with open(self.legacy_file, 'r') as f:
+                return json.load(f).get("days", {})
+        except (json.JSONDecodeError, IOError, AttributeError) as e:
+            print(f"Error loading token usage: {e}")
+            return {}
+
+    @staticmethod
+    def _add_usage(conn, day, prompt_tokens, completion_tokens, requests):
+        """Add to a day's totals in one statement, so concurrent writers never lose each other's counts"""
+        conn.execute(
+            "INSERT INTO daily_usage (day, prompt_tokens, completion_tokens, requests) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (day) DO UPDATE SET"
+            " prompt_tokens = prompt_tokens + excluded.prompt_tokens,"
+            " completion_tokens = completion_tokens + excluded.completion_tokens,"
+            " requests = requests + excluded.requests",
+            (day, prompt_tokens, completion_tokens, requests)
+        )
+
+    def _today(self):
+        """Get today's usage totals as recorded by every process"""
+        today = {"prompt_tokens": 0, "completion_tokens": 0, "requests": 0}
+        try:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT prompt_tokens, completion_tokens, requests FROM daily_usage WHERE day = ?",
+                    (date.today().isoformat(),)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading token usage: {e}")
+            return today
+        if row is not None:
+            today["prompt_tokens"], today["completion_tokens"], today["requests"] = row
+        return today
+
+    def estimate(self, messages, model, max_completion_tokens):
+        """
+        Estimate a request before sending it.
+        Returns {"model", "prompt_tokens", "max_completion_tokens", "total_tokens", "exact"}; total_tokens
+        is the worst case (the full completion allowance), which is what rate limits count too.
+        """
+        prompt_tokens = self.counter.count_messages(messages, model)
+        return {
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "max_completion_tokens": max_completion_tokens,
+            "total_tokens": prompt_tokens + max_completion_tokens,
+            "exact": self.counter.exact
+        }
+
+    def reserve(self, messages, model, max_completion_tokens):
+        """Estimate a request and reserve it against the budgets; raises TokenBudgetExceeded if it does not fit"""
+        estimate = self.estimate(messages, model, max_completion_tokens)
+        tokens = estimate["total_tokens"]
+
+        if self.max_prompt_tokens and estimate["prompt_tokens"] > self.max_prompt_tokens:
+            raise TokenBudgetExceeded(
+                f"Prompt is about {estimate['prompt_tokens']} tokens, over the {self.max_prompt_tokens} token limit."
+            )
+
+        with self._lock:
+            session_used = self.session_usage["prompt_tokens"] + self.session_usage["completion_tokens"]
+            if self.session_limit and session_used + self._reserved + tokens > self.session_limit:
+                raise TokenBudgetExceeded(
+                    f"Session token budget exhausted ({session_used} of {self.session_limit} tokens used; "
+                    f"this request needs up to {tokens})."
+                )
+            if self.daily_limit:
+                today = self._today()
+                today_used = today["prompt_tokens"] + today["completion_tokens"]
+                if today_used + self._reserved + tokens > self.daily_limit:
+                    raise TokenBudgetExceeded(
+                        f"Daily token budget exhausted ({today_used} of {self.daily_limit} tokens used; "
+                        f"this request needs up to {tokens})."
+                    )
+            self._reserved += tokens
+        return estimate
+
+    def release(self, estimate):
+        """Drop a reservation for a request that was never answered"""
+        with self._lock:
+            self._reserved = max(0, self._reserved - estimate["total_tokens"])
+
+    def record_usage(self, estimate, usage=None, completion_text=""):
+        """
+        Replace a reservation with the actual usage.
+        usage is the response's usage object; without one (e.g. a cancelled stream) the prompt
+        estimate and the tokens in completion_text are counted instead.
+        """
+        if usage is not None and getattr(usage, "prompt_tokens", None) is not None:
+            prompt_tokens = usage.prompt_tokens
+            completion_tokens = usage.completion_tokens or 0
+        else:
+            prompt_tokens = estimate["prompt_tokens"]
+            completion_tokens = self.counter.count(completion_text, estimate["model"])
+
+        with self._lock:
+            self._reserved = max(0, self._reserved - estimate["total_tokens"])
+            self.session_usage["prompt_tokens"] += prompt_tokens
+            self.session_usage["completion_tokens"] += completion_tokens
+            self.session_usage["requests"] += 1
+        try:
+            with closing(self._connect()) as conn, conn:
+                self._add_usage(conn, date.today().isoformat(), prompt_tokens, completion_tokens, 1)
+        except sqlite3.Error as e:
+            print(f"Error saving token usage: {e}")
+        return prompt_tokens, completion_tokens
+
+    def summary(self):
+        """Get the session and today's usage along with the configured limits"""
+        with self._lock:
+            return {
+                "session": dict(self.session_usage),
+                "today": self._today(),
+                "reserved": self._reserved,
+                "session_limit": self.session_limit,
+                "daily_limit": self.daily_limit
+            }